@@ -0,0 +1,281 @@
+import glob
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+from analitica import matriz_meses
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Holgura al crecer la matriz, para no reescribir el archivo en cada carga diaria
+BLOQUE_FILAS = 256
+BLOQUE_DIAS = 64
+
+
+def rutas_almacen(db_name):
+    """Prefijo de las matrices (<prefijo>.<version>.npy), índice .json y candado .lock, junto a la base"""
+    base = os.path.splitext(os.path.abspath(db_name))[0]
+    return f"{base}.series", f"{base}.series.json", f"{base}.series.lock"
+
+
+@contextmanager
+def bloqueo_archivo(ruta):
+    """Candado exclusivo entre procesos sobre un archivo; espera mientras otro proceso lo tenga"""
+    with open(ruta, 'a+b') as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue  # LK_LOCK se rinde tras 10 intentos: se sigue esperando
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _redondear(n, bloque):
+    return max(bloque, -(-n // bloque) * bloque)
+
+
+class AlmacenSeries:
+    """Ventas diarias por producto como matriz densa int32 (producto x día) en un .npy mapeado a memoria.
+
+    La fila de cada código y la columna de cada fecha (días desde fecha_inicio) se
+    guardan en un .json junto a la matriz, con la generación de datos que refleja y
+    el nombre del .npy vigente: el .json es el único punto de confirmación, así una
+    matriz reescrita solo se ve cuando su índice ya la nombra.
+    actualizar(db) aplica solo los (codigo, fecha) cambiados desde esa generación,
+    leyendo los totales absolutos de ventas_diarias, o reconstruye todo si el registro
+    de cambios ya no alcanza. Los archivos se comparten entre procesos (aplicación,
+    cli, api): actualizar() escribe con un candado de archivo y antes vuelve a abrir
+    el almacén si otro proceso lo cambió. Las consultas cortan la matriz sin ir a SQLite.
+    """
+
+    def __init__(self, db_name):
+        self.prefijo, self.ruta_indice, self.ruta_bloqueo = rutas_almacen(db_name)
+        self._lock = threading.RLock()
+        self._abrir()
+
+    def _vaciar(self):
+        self.matriz = None
+        self.archivo_matriz = None
+        self.version = 0
+        self.indice = {}
+        self.codigos = []
+        self.fecha_inicio = None
+        self.num_dias = 0
+        self.generacion = -1
+
+    def _firma_en_disco(self):
+        # El índice se reemplaza (os.replace) en cada escritura: cambia inodo y mtime
+        try:
+            estado = os.stat(self.ruta_indice)
+        except OSError:
+            return None
+        return estado.st_ino, estado.st_mtime_ns, estado.st_size
+
+    def _abrir(self):
+        # Carga el índice y la matriz que nombra; si faltan, están dañados o no
+        # concuerdan entre sí el almacén queda vacío y se reconstruye en actualizar()
+        self._vaciar()
+        self._firma = self._firma_en_disco()
+        try:
+            with open(self.ruta_indice, encoding='utf-8') as f:
+                meta = json.load(f)
+            archivo_matriz = meta['matriz']
+            matriz = np.load(os.path.join(os.path.dirname(self.ruta_indice), archivo_matriz), mmap_mode='r+')
+            codigos, num_dias, fecha_inicio = meta['codigos'], meta['num_dias'], meta['fecha_inicio']
+            version, generacion = meta['version'], meta['generacion']
+        except (OSError, ValueError, KeyError, TypeError):
+            return
+        if (matriz.dtype != np.int32 or matriz.ndim != 2 or len(codigos) > matriz.shape[0]
+                or num_dias > matriz.shape[1] or (fecha_inicio is None) != (num_dias == 0)):
+            return
+        self.matriz = matriz
+        self.archivo_matriz = archivo_matriz
+        self.version = version
+        self.codigos = codigos
+        self.indice = {codigo: i for i, codigo in enumerate(self.codigos)}
+        self.fecha_inicio = np.datetime64(fecha_inicio, 'D') if fecha_inicio else None
+        self.num_dias = num_dias
+        self.generacion = generacion
+
+    def _guardar_indice(self):
+        temporal = self.ruta_indice + '.tmp'
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump({
+                'matriz': self.archivo_matriz,
+                'version': self.version,
+                'codigos': self.codigos,
+                'fecha_inicio': str(self.fecha_inicio) if self.fecha_inicio is not None else None,
+                'num_dias': self.num_dias,
+                'generacion': self.generacion,
+            }, f)
+        os.replace(temporal, self.ruta_indice)
+        self._firma = self._firma_en_disco()
+
+    def _escribir_matriz(self, matriz):
+        # Al crear o crecer se escribe una versión nueva del .npy; el índice la nombra al guardarse
+        self.version += 1
+        ruta = f"{self.prefijo}.{self.version}.npy"
+        temporal = ruta + '.tmp.npy'
+        np.save(temporal, matriz)
+        os.replace(temporal, ruta)
+        self.matriz = np.load(ruta, mmap_mode='r+')
+        self.archivo_matriz = os.path.basename(ruta)
+
+    def _borrar_matrices_viejas(self):
+        # Versiones que el índice ya no nombra (y el .series.npy del formato anterior); en
+        # Windows un archivo aún mapeado por otro proceso no se puede borrar: queda para después
+        vigente = os.path.join(os.path.dirname(self.ruta_indice), self.archivo_matriz)
+        for ruta in glob.glob(f"{glob.escape(self.prefijo)}.*.npy") + [f"{self.prefijo}.npy"]:
+            if os.path.abspath(ruta) != os.path.abspath(vigente):
+                try:
+                    os.remove(ruta)
+                except OSError:
+                    pass
+
+    def actualizar(self, db):
+        """Pone la matriz al día con la base; devuelve True si hubo cambios"""
+        with self._lock, bloqueo_archivo(self.ruta_bloqueo):
+            # Otro proceso (u otra instancia) pudo reescribir el almacén: no escribir sobre
+            # una matriz que el índice ya no nombra
+            if self._firma_en_disco() != self._firma:
+                self._abrir()
+
+            generacion = db.generacion_datos()
+            if self.matriz is not None and generacion == self.generacion:
+                return False
+
+            cambios = None
+            if self.matriz is not None and generacion > self.generacion:
+                cambios = db.cambios_con_totales(self.generacion)
+            if cambios is None or any(codigo == '*' for codigo, _, _ in cambios):
+                self._reconstruir(db.ventas_diarias_desde('0000-00-00'))  # Todo el historial
+            else:
+                self._aplicar(cambios)
+            self.generacion = generacion
+            self._guardar_indice()
+            self._borrar_matrices_viejas()
+            return True
+
+    def _reconstruir(self, filas):
+        self.codigos, self.indice = [], {}
+        self.fecha_inicio, self.num_dias = None, 0
+        if not filas:
+            self._escribir_matriz(np.zeros((BLOQUE_FILAS, BLOQUE_DIAS), dtype=np.int32))
+            return
+        codigos, fechas, totales = zip(*filas)
+        self.codigos = sorted(set(codigos))
+        self.indice = {codigo: i for i, codigo in enumerate(self.codigos)}
+        dias = np.array(fechas, dtype='datetime64[D]')
+        self.fecha_inicio = dias.min()
+        self.num_dias = int((dias.max() - self.fecha_inicio).astype(int)) + 1
+
+        matriz = np.zeros((_redondear(len(self.codigos), BLOQUE_FILAS),
+                           _redondear(self.num_dias, BLOQUE_DIAS)), dtype=np.int32)
+        filas_matriz = np.fromiter((self.indice[c] for c in codigos), dtype=np.intp, count=len(filas))
+        matriz[filas_matriz, (dias - self.fecha_inicio).astype(np.intp)] = totales
+        self._escribir_matriz(matriz)
+
+    def _aplicar(self, cambios):
+        if not cambios:
+            return
+        codigos, fechas, totales = zip(*cambios)
+        dias = np.array(fechas, dtype='datetime64[D]')
+        self._asegurar_capacidad(codigos, dias.min(), dias.max())
+        filas_matriz = np.fromiter((self.indice[c] for c in codigos), dtype=np.intp, count=len(cambios))
+        self.matriz[filas_matriz, (dias - self.fecha_inicio).astype(np.intp)] = totales
+        self.matriz.flush()
+
+    def _asegurar_capacidad(self, codigos, fecha_min, fecha_max):
+        for codigo in codigos:
+            if codigo not in self.indice:
+                self.indice[codigo] = len(self.codigos)
+                self.codigos.append(codigo)
+
+        inicio = fecha_min if self.fecha_inicio is None else min(self.fecha_inicio, fecha_min)
+        desplazamiento = 0 if self.fecha_inicio is None else int((self.fecha_inicio - inicio).astype(int))
+        fin_actual = inicio + (desplazamiento + self.num_dias - 1) if self.num_dias else fecha_max
+        num_dias = int((max(fin_actual, fecha_max) - inicio).astype(int)) + 1
+
+        filas, columnas = self.matriz.shape
+        if len(self.codigos) > filas or num_dias > columnas or desplazamiento:
+            nueva = np.zeros((_redondear(len(self.codigos), BLOQUE_FILAS),
+                              _redondear(num_dias, BLOQUE_DIAS)), dtype=np.int32)
+            nueva[:filas, desplazamiento:desplazamiento + self.num_dias] = self.matriz[:, :self.num_dias]
+            self._escribir_matriz(nueva)
+        self.fecha_inicio, self.num_dias = inicio, num_dias
+
+    def _columnas(self, fecha_inicio, fecha_fin):
+        # Rango de columnas [desde, hasta) de dos fechas AAAA-MM-DD, recortado a la matriz
+        desde = int((np.datetime64(fecha_inicio, 'D') - self.fecha_inicio).astype(int))
+        hasta = int((np.datetime64(fecha_fin, 'D') - self.fecha_inicio).astype(int)) + 1
+        return max(desde, 0), min(max(hasta, 0), self.num_dias)
+
+    def ultima_fecha(self):
+        """Fecha AAAA-MM-DD de la última columna con ventas, o None si no hay datos"""
+        with self._lock:
+            if not self.num_dias:
+                return None
+            con_ventas = np.flatnonzero(self.matriz[:len(self.codigos), :self.num_dias].any(axis=0))
+            return str(self.fecha_inicio + int(con_ventas[-1])) if len(con_ventas) else None
+
+    def serie(self, codigo, fecha_inicio, fecha_fin):
+        """Lista [(fecha, total)] de los días con ventas de un producto entre dos fechas, ordenada"""
+        with self._lock:
+            if codigo not in self.indice or not self.num_dias:
+                return []
+            desde, hasta = self._columnas(fecha_inicio, fecha_fin)
+            valores = np.asarray(self.matriz[self.indice[codigo], desde:hasta])
+            dias = np.flatnonzero(valores)
+            fechas = (self.fecha_inicio + desde + dias).astype(str)
+            return list(zip(fechas.tolist(), valores[dias].tolist()))
+
+    def matriz_meses(self, codigo, meses):
+        """Matriz len(meses) x 31 de un producto (NaN en días sin ventas), ver analitica.matriz_meses"""
+        with self._lock:
+            if codigo not in self.indice or not self.num_dias:
+                return matriz_meses(np.zeros(0), None, meses)
+            serie = np.asarray(self.matriz[self.indice[codigo], :self.num_dias])
+            return matriz_meses(serie, self.fecha_inicio, meses)
+
+    def ventas(self, codigos, fecha_inicio, fecha_fin):
+        """Matriz float len(codigos) x días entre dos fechas y los días con alguna venta.
+
+        Devuelve (ventas, dia_con_datos); los códigos sin fila quedan en cero.
+        """
+        with self._lock:
+            num_columnas = int((np.datetime64(fecha_fin, 'D') - np.datetime64(fecha_inicio, 'D')).astype(int)) + 1
+            ventas = np.zeros((len(codigos), num_columnas))
+            dia_con_datos = np.zeros(num_columnas, dtype=bool)
+            if not self.num_dias:
+                return ventas, dia_con_datos
+            desde, hasta = self._columnas(fecha_inicio, fecha_fin)
+            if desde >= hasta:
+                return ventas, dia_con_datos
+            desplazamiento = int((np.datetime64(fecha_inicio, 'D') - self.fecha_inicio).astype(int))
+            destino = slice(desde - desplazamiento, hasta - desplazamiento)
+
+            posiciones = [(i, self.indice[codigo]) for i, codigo in enumerate(codigos) if codigo in self.indice]
+            if posiciones:
+                filas_salida, filas_matriz = map(list, zip(*posiciones))
+                ventas[filas_salida, destino] = self.matriz[filas_matriz, desde:hasta]
+            dia_con_datos[destino] = self.matriz[:len(self.codigos), desde:hasta].any(axis=0)
+            return ventas, dia_con_datos
@@ -0,0 +1,24 @@
+import numpy as np
+
+DIAS_MES = 31
+
+
+def matriz_meses(serie, fecha_inicio, meses):
+    """Corta una serie diaria densa en una matriz len(meses) x 31.
+
+    serie[d] son las ventas del día fecha_inicio + d. La fila i corresponde a
+    meses[i] (AAAA-MM) y la columna d al día d + 1; los días sin ventas o fuera
+    de la serie quedan en NaN para que no se grafiquen.
+    """
+    matriz = np.full((len(meses), DIAS_MES), np.nan)
+    if fecha_inicio is None:
+        return matriz
+    for i, mes in enumerate(meses):
+        primer_dia = np.datetime64(mes, 'M').astype('datetime64[D]')
+        dias_mes = int(((np.datetime64(mes, 'M') + 1).astype('datetime64[D]') - primer_dia).astype(int))
+        desde = int((primer_dia - fecha_inicio).astype(int))
+        inicio, fin = max(desde, 0), min(desde + dias_mes, len(serie))
+        if inicio < fin:
+            matriz[i, inicio - desde:fin - desde] = serie[inicio:fin]
+    matriz[matriz == 0] = np.nan
+    return matriz
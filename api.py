@@ -0,0 +1,312 @@
+"""Servicio HTTP local (asyncio, solo biblioteca estándar) sobre la base de ventas.
+
+Uso:
+    python -m api [--db ventas.db] [--host 127.0.0.1] [--port 8000] [--hilos 4]
+
+Rutas (todas responden JSON):
+    GET  /productos/<codigo>/serie?desde=AAAA-MM-DD&hasta=AAAA-MM-DD
+    GET  /productos/<codigo>/meses
+    GET  /productos/<codigo>/comparacion?meses=2025-01,2024-01
+    POST /recomendaciones                  cuerpo: inventario .xlsx (codigo, nombre, cantidad)
+    POST /ingesta?fecha=AAAA-MM-DD         cuerpo: ventas_DD.xlsx (Codigo, Nombre, Cantidad)
+    GET  /estadisticas                     aciertos y fallos de las cachés
+
+Ejemplo: curl --data-binary @ventas_15.xlsx 'http://127.0.0.1:8000/ingesta?fecha=2025-01-15'
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import os
+import re
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from openpyxl.utils.exceptions import InvalidFileException
+
+from almacen_series import AlmacenSeries
+from database import Database, CacheLRU, CONEXIONES_LECTURA
+from ingesta import leer_libro
+from pedidos import leer_inventario, calcular_recomendaciones, pedidos_a_realizar
+
+# Tamaño máximo del cuerpo de una petición (libros de ventas o inventario)
+MAX_CUERPO = 100 * 1024 * 1024
+# Respuestas JSON guardadas; se vacían cuando cambia la generación de datos
+CAPACIDAD_CACHE = 1024
+
+ESTADOS = {
+    200: 'OK',
+    400: 'Bad Request',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    413: 'Payload Too Large',
+    500: 'Internal Server Error',
+}
+
+
+class ErrorHTTP(Exception):
+    def __init__(self, estado, mensaje):
+        super().__init__(mensaje)
+        self.estado = estado
+
+
+def _json(valor):
+    # NaN no es JSON válido: los valores sin dato se envían como null
+    return json.dumps(valor, ensure_ascii=False, default=lambda o: o.item()).encode('utf-8')
+
+
+def _sin_nan(valor):
+    return None if isinstance(valor, float) and math.isnan(valor) else valor
+
+
+def _fecha(consulta, nombre):
+    try:
+        return date.fromisoformat(consulta[nombre][0]).isoformat()
+    except (KeyError, ValueError):
+        raise ErrorHTTP(400, f"El parámetro {nombre} debe ser una fecha AAAA-MM-DD")
+
+
+class ServicioVentas:
+    """Rutas de la API sobre una Database compartida y un AlmacenSeries.
+
+    Los manejadores son síncronos y corren en un ThreadPoolExecutor, así el bucle
+    asyncio solo lee y escribe sockets; las lecturas usan el pool de conexiones de
+    Database. Las respuestas GET (y las recomendaciones, por hash del inventario)
+    se guardan ya serializadas en una CacheLRU mientras no cambien la generación de
+    datos ni la versión del catálogo (parámetros, proveedores y prioridades).
+    """
+
+    def __init__(self, db_name, hilos=CONEXIONES_LECTURA, capacidad_cache=CAPACIDAD_CACHE):
+        self.db = Database(db_name, conexiones_lectura=hilos)
+        self.almacen = AlmacenSeries(db_name)
+        self.almacen.actualizar(self.db)
+        self.ejecutor = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix='api')
+        self._lock_cache = threading.Lock()
+        self._cache = CacheLRU(capacidad_cache)
+        self._version_cache = None
+        self.rutas = [
+            ('GET', re.compile(r'/productos/([^/]+)/serie'), self.serie),
+            ('GET', re.compile(r'/productos/([^/]+)/meses'), self.meses),
+            ('GET', re.compile(r'/productos/([^/]+)/comparacion'), self.comparacion),
+            ('POST', re.compile(r'/recomendaciones'), self.recomendaciones),
+            ('POST', re.compile(r'/ingesta'), self.ingesta),
+            ('GET', re.compile(r'/estadisticas'), self.estadisticas),
+        ]
+
+    def cerrar(self):
+        self.ejecutor.shutdown()
+        self.db.cerrar()
+
+    # --- Caché de respuestas ---
+
+    def _cacheada(self, clave, calcular):
+        # clave sigue el formato de CacheLRU: (tipo, codigo, ...)
+        version = (self.db.generacion_datos(), self.db.version_catalogo())
+        with self._lock_cache:
+            if version != self._version_cache:
+                self._cache.limpiar()
+                self._version_cache = version
+            encontrado, cuerpo = self._cache.obtener(clave)
+        if encontrado:
+            return cuerpo
+
+        self.almacen.actualizar(self.db)
+        cuerpo = _json(calcular())
+        with self._lock_cache:
+            if version == self._version_cache:
+                self._cache.guardar(clave, cuerpo)
+        return cuerpo
+
+    def estadisticas_cache(self):
+        with self._lock_cache:
+            return self._cache.estadisticas()
+
+    def estadisticas(self, _, consulta, cuerpo):
+        # Sin caché: respuestas de la API y consultas por producto de Database
+        return _json({'respuestas': self.estadisticas_cache(), 'consultas': self.db.estadisticas_cache()})
+
+    # --- Rutas ---
+
+    def serie(self, codigo, consulta, cuerpo):
+        desde, hasta = _fecha(consulta, 'desde'), _fecha(consulta, 'hasta')
+        if desde > hasta:
+            raise ErrorHTTP(400, "desde no puede ser mayor que hasta")
+
+        def calcular():
+            ventas = self.almacen.serie(codigo, desde, hasta)
+            return {'codigo': codigo, 'fechas': [f for f, _ in ventas], 'totales': [t for _, t in ventas]}
+        return self._cacheada(('serie', codigo, desde, hasta), calcular)
+
+    def meses(self, codigo, consulta, cuerpo):
+        return self._cacheada(('meses', codigo, None, None),
+                              lambda: {'codigo': codigo, 'meses': self.db.meses_producto(codigo)})
+
+    def comparacion(self, codigo, consulta, cuerpo):
+        meses = [mes for valor in consulta.get('meses', []) for mes in valor.split(',') if mes]
+        if not meses or not all(re.fullmatch(r'\d{4}-\d{2}', mes) for mes in meses):
+            raise ErrorHTTP(400, "El parámetro meses debe ser una lista AAAA-MM separada por comas")
+
+        def calcular():
+            # Una fila de 31 días por mes (null en los días sin ventas), ver analitica.matriz_meses
+            matriz = self.almacen.matriz_meses(codigo, meses)
+            return {'codigo': codigo,
+                    'meses': {mes: [_sin_nan(v) for v in fila.tolist()] for mes, fila in zip(meses, matriz)}}
+        return self._cacheada((('comparacion',) + tuple(meses), codigo, None, None), calcular)
+
+    def recomendaciones(self, _, consulta, cuerpo):
+        def calcular():
+            recomendaciones = calcular_recomendaciones(self.db, _leer_subido(cuerpo, leer_inventario), self.almacen)
+            return {
+                'recomendaciones': [{columna: _sin_nan(valor) for columna, valor in fila.items()}
+                                    for fila in recomendaciones.to_dict('records')],
+                'pedidos': pedidos_a_realizar(recomendaciones),
+            }
+        return self._cacheada(('recomendaciones', hashlib.sha256(cuerpo).hexdigest(), None, None), calcular)
+
+    def ingesta(self, _, consulta, cuerpo):
+        fecha_carga = _fecha(consulta, 'fecha')
+        # El libro subido ocupa en el manifiesto una ruta propia por día: volver a
+        # subirlo sin cambios se omite y uno distinto reemplaza las ventas del día
+        archivo = {'ruta': f"api/ventas_{fecha_carga}.xlsx", 'tamano': len(cuerpo), 'mtime': 0,
+                   'hash': hashlib.sha256(cuerpo).hexdigest()}
+        anterior = self.db.obtener_manifiesto().get(archivo['ruta'])
+        if anterior is not None and anterior[2] == archivo['hash']:
+            return _json({'fecha': fecha_carga, 'filas': 0, 'omitido': True})
+
+        df = _leer_subido(cuerpo, leer_libro)
+        if df is None:
+            raise ErrorHTTP(400, "El libro no tiene las columnas Codigo, Nombre y Cantidad")
+        filas, filas_por_segundo = self.db.insertar_ventas_bulk(df, fecha_carga, archivo=archivo)
+        self.almacen.actualizar(self.db)
+        return _json({'fecha': fecha_carga, 'filas': filas, 'omitido': False,
+                      'filas_por_segundo': round(filas_por_segundo)})
+
+    # --- HTTP ---
+
+    def despachar(self, metodo, objetivo, cuerpo):
+        """Ejecuta la ruta de una petición y devuelve (estado, cuerpo JSON)"""
+        partes = urlsplit(objetivo)
+        consulta = parse_qs(partes.query)
+        permitida = False
+        for metodo_ruta, patron, manejador in self.rutas:
+            coincidencia = patron.fullmatch(partes.path)
+            if coincidencia is None:
+                continue
+            permitida = True
+            if metodo_ruta != metodo:
+                continue
+            argumento = unquote(coincidencia.group(1)) if patron.groups else None
+            try:
+                return 200, manejador(argumento, consulta, cuerpo)
+            except ErrorHTTP as e:
+                return e.estado, _json({'error': str(e)})
+            except ValueError as e:
+                return 400, _json({'error': str(e)})
+            except Exception as e:
+                return 500, _json({'error': f"{type(e).__name__}: {e}"})
+        if permitida:
+            return 405, _json({'error': f"Método {metodo} no permitido en {partes.path}"})
+        return 404, _json({'error': f"Ruta no encontrada: {partes.path}"})
+
+    async def atender(self, reader, writer):
+        """Atiende una conexión HTTP/1.1 (con keep-alive) hasta que el cliente la cierra"""
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                linea = await reader.readline()
+                if not linea:
+                    break
+                try:
+                    metodo, objetivo, version = linea.decode('latin-1').split()
+                except ValueError:
+                    await _responder(writer, 400, _json({'error': "Línea de petición inválida"}), False)
+                    break
+
+                encabezados = {}
+                while True:
+                    encabezado = await reader.readline()
+                    if encabezado in (b'\r\n', b'\n', b''):
+                        break
+                    nombre, _, valor = encabezado.decode('latin-1').partition(':')
+                    encabezados[nombre.strip().lower()] = valor.strip()
+                mantener = (version == 'HTTP/1.1' and encabezados.get('connection', '').lower() != 'close')
+
+                try:
+                    largo = int(encabezados.get('content-length', 0) or 0)
+                except ValueError:
+                    largo = -1
+                if largo < 0:
+                    await _responder(writer, 400, _json({'error': "Content-Length inválido"}), False)
+                    break
+                if largo > MAX_CUERPO:
+                    await _responder(writer, 413, _json({'error': "Cuerpo demasiado grande"}), False)
+                    break
+                cuerpo = await reader.readexactly(largo) if largo else b''
+
+                estado, respuesta = await loop.run_in_executor(
+                    self.ejecutor, self.despachar, metodo.upper(), objetivo, cuerpo)
+                await _responder(writer, estado, respuesta, mantener)
+                if not mantener:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+async def _responder(writer, estado, cuerpo, mantener):
+    writer.write(
+        f"HTTP/1.1 {estado} {ESTADOS[estado]}\r\n"
+        f"Content-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(cuerpo)}\r\n"
+        f"Connection: {'keep-alive' if mantener else 'close'}\r\n\r\n".encode('latin-1') + cuerpo)
+    await writer.drain()
+
+
+def _leer_subido(cuerpo, leer):
+    # Los lectores de Excel trabajan sobre rutas: el cuerpo se escribe a un temporal
+    descriptor, ruta = tempfile.mkstemp(suffix='.xlsx')
+    try:
+        with os.fdopen(descriptor, 'wb') as f:
+            f.write(cuerpo)
+        return leer(ruta)
+    except (zipfile.BadZipFile, InvalidFileException):
+        raise ErrorHTTP(400, "El cuerpo no es un libro .xlsx válido")
+    finally:
+        os.remove(ruta)
+
+
+async def servir(servicio, host, port):
+    servidor = await asyncio.start_server(servicio.atender, host, port)
+    host, port = servidor.sockets[0].getsockname()[:2]
+    print(f"Escuchando en http://{host}:{port}", flush=True)
+    async with servidor:
+        await servidor.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m api', description="API HTTP de ventas y pedidos")
+    parser.add_argument('--db', default='ventas.db', help="Base de datos SQLite (por defecto ventas.db)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000, help="Puerto (0 = uno libre)")
+    parser.add_argument('--hilos', type=int, default=CONEXIONES_LECTURA,
+                        help="Hilos que atienden peticiones (y conexiones de lectura)")
+    args = parser.parse_args(argv)
+
+    servicio = ServicioVentas(args.db, hilos=args.hilos)
+    try:
+        asyncio.run(servir(servicio, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servicio.cerrar()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,121 @@
+"""Prueba de carga de la API HTTP (api.py) con clientes concurrentes en localhost.
+
+Crea una base temporal con tres meses de ventas sintéticas, levanta el servicio en
+un proceso aparte y lanza `clientes` conexiones keep-alive que hacen `peticiones`
+consultas cada una (series, meses y comparaciones de productos al azar). La misma
+tanda se repite dos veces: con la caché de respuestas fría y caliente.
+
+Uso: python -m benchmarks.bench_api [clientes] [peticiones_por_cliente] [filas_por_mes]
+"""
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from database import Database
+from benchmarks.datos_sinteticos import generar_mes
+
+MESES = ['2025-01', '2025-02', '2025-03']
+NUM_PRODUCTOS = 500
+
+
+def crear_base(db_name, filas_por_mes):
+    db = Database(db_name)
+    try:
+        for anio_mes in MESES:
+            for fecha_carga, df in generar_mes(filas_por_mes, dias=28, num_productos=NUM_PRODUCTOS,
+                                               anio_mes=anio_mes):
+                db.insertar_ventas_bulk(df, fecha_carga)
+    finally:
+        db.cerrar()
+
+
+def generar_peticiones(total, semilla=0):
+    # Mezcla de las consultas de gráficos sobre 50 productos (se repiten, como en las tiendas)
+    rng = random.Random(semilla)
+    peticiones = []
+    for _ in range(total):
+        codigo = f"SKU{rng.randrange(50):05d}"
+        tipo = rng.choice(['serie', 'meses', 'comparacion'])
+        if tipo == 'serie':
+            mes = rng.choice(MESES)
+            peticiones.append((tipo, f"/productos/{codigo}/serie?desde={mes}-01&hasta={mes}-28"))
+        elif tipo == 'meses':
+            peticiones.append((tipo, f"/productos/{codigo}/meses"))
+        else:
+            meses = ','.join(sorted(rng.sample(MESES, 2)))
+            peticiones.append((tipo, f"/productos/{codigo}/comparacion?meses={meses}"))
+    return peticiones
+
+
+async def cliente(host, port, peticiones, latencias):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for tipo, ruta in peticiones:
+            inicio = time.perf_counter()
+            writer.write(f"GET {ruta} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode())
+            await writer.drain()
+            estado = (await reader.readline()).split()[1]
+            largo = 0
+            while True:
+                linea = await reader.readline()
+                if linea == b'\r\n':
+                    break
+                nombre, _, valor = linea.decode('latin-1').partition(':')
+                if nombre.lower() == 'content-length':
+                    largo = int(valor)
+            await reader.readexactly(largo)
+            if estado != b'200':
+                raise RuntimeError(f"{ruta} respondió {estado.decode()}")
+            latencias.append((tipo, time.perf_counter() - inicio))
+    finally:
+        writer.close()
+
+
+async def tanda(host, port, clientes, peticiones_por_cliente):
+    latencias = []
+    peticiones = generar_peticiones(clientes * peticiones_por_cliente)
+    inicio = time.perf_counter()
+    await asyncio.gather(*(
+        cliente(host, port, peticiones[i::clientes], latencias) for i in range(clientes)
+    ))
+    return latencias, time.perf_counter() - inicio
+
+
+def reportar(nombre, latencias, duracion):
+    print(f"{nombre}: {len(latencias)} peticiones en {duracion:.2f} s ({len(latencias) / duracion:,.0f} pet/s)")
+    for tipo in ['serie', 'meses', 'comparacion', None]:
+        valores = np.array([t for tipo_pet, t in latencias if tipo is None or tipo_pet == tipo]) * 1000
+        if len(valores):
+            p50, p99 = np.percentile(valores, [50, 99])
+            print(f"  {tipo or 'todas':<12} p50 {p50:7.2f} ms   p99 {p99:7.2f} ms   máx {valores.max():7.2f} ms")
+
+
+if __name__ == "__main__":
+    clientes = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    peticiones_por_cliente = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    filas_por_mes = int(sys.argv[3]) if len(sys.argv) > 3 else 280_000
+
+    with tempfile.TemporaryDirectory() as directorio:
+        db_name = os.path.join(directorio, 'ventas.db')
+        print(f"Generando {len(MESES)} meses de {filas_por_mes} líneas de venta...")
+        crear_base(db_name, filas_por_mes)
+
+        raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        servidor = subprocess.Popen([sys.executable, '-m', 'api', '--db', db_name, '--port', '0'],
+                                    cwd=raiz, stdout=subprocess.PIPE, text=True)
+        try:
+            # "Escuchando en http://127.0.0.1:PUERTO"
+            direccion = servidor.stdout.readline().strip().rsplit('//', 1)[-1]
+            host, port = direccion.rsplit(':', 1)
+            print(f"{clientes} clientes x {peticiones_por_cliente} peticiones contra {direccion}")
+            for nombre in ['caché fría', 'caché caliente']:
+                reportar(nombre, *asyncio.run(tanda(host, int(port), clientes, peticiones_por_cliente)))
+        finally:
+            servidor.terminate()
+            servidor.wait()
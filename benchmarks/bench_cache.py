@@ -0,0 +1,40 @@
+"""Compara la re-ingesta de un año de carpetas leyendo Excel contra la caché Parquet.
+
+Uso: python -m benchmarks.bench_cache [filas_por_dia] [workers]
+"""
+import os
+import shutil
+import sys
+import tempfile
+
+import ingesta
+from ingesta import cargar_meses, directorio_cache
+from benchmarks.datos_sinteticos import escribir_anio
+
+
+def cargar_en_base_nueva(directorio, carpetas, nombre, workers, usar_cache):
+    # Cada corrida usa una base vacía para que el manifiesto no omita ningún libro
+    db_name = os.path.join(directorio, f"{nombre}.db")
+    resultado = cargar_meses(db_name, carpetas, workers=workers, usar_cache=usar_cache)
+    print(f"{nombre:<20} {resultado['archivos']:>5} libros  {resultado['filas']:>10} filas  "
+          f"{resultado['duracion']:8.2f} s")
+    return resultado['duracion']
+
+
+if __name__ == "__main__":
+    filas_por_dia = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else None
+
+    if not ingesta.CACHE_DISPONIBLE:
+        sys.exit("pyarrow no está instalado: la caché Parquet está desactivada")
+
+    with tempfile.TemporaryDirectory() as directorio:
+        print(f"Generando un año de carpetas con {filas_por_dia} filas por día...")
+        carpetas = escribir_anio(os.path.join(directorio, 'ventas'), 2024, filas_por_dia)
+
+        t_excel = cargar_en_base_nueva(directorio, carpetas, 'excel (sin caché)', workers, False)
+        shutil.rmtree(directorio_cache(os.path.join(directorio, 'x.db')), ignore_errors=True)
+        t_frio = cargar_en_base_nueva(directorio, carpetas, 'caché fría', workers, True)
+        t_caliente = cargar_en_base_nueva(directorio, carpetas, 'caché caliente', workers, True)
+
+    print(f"Caché caliente vs Excel: {t_excel / t_caliente:.1f}x")
@@ -0,0 +1,82 @@
+"""Compara tamaño y tiempo de recorrido de ventas antes y después de normalizarla (migración 7).
+
+Crea una base con el formato anterior (codigo, nombre y fecha_carga como texto en
+cada línea), la mide, la abre con Database para migrarla y la vuelve a medir.
+
+Uso: python -m benchmarks.bench_esquema [filas_totales]
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+from database import Database
+from benchmarks.datos_sinteticos import generar_mes
+
+RECORRIDO_ANTES = 'SELECT codigo, SUM(cantidad) FROM ventas GROUP BY codigo'
+RECORRIDO_DESPUES = '''
+SELECT p.codigo, v.total
+FROM (SELECT producto_id, SUM(cantidad) AS total FROM ventas GROUP BY producto_id) v
+JOIN productos p ON p.id = v.producto_id
+'''
+RECORRIDO_COMPLETO = 'SELECT SUM(cantidad) FROM ventas'
+
+
+def crear_base_anterior(db_name, mes):
+    # Esquema de ventas previo a la migración 7, con sus índices
+    conn = sqlite3.connect(db_name)
+    conn.execute('''
+    CREATE TABLE ventas (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        codigo TEXT NOT NULL,
+        nombre TEXT NOT NULL,
+        cantidad INTEGER NOT NULL,
+        fecha_carga TEXT NOT NULL
+    )
+    ''')
+    conn.execute('CREATE INDEX idx_fecha_carga ON ventas (fecha_carga)')
+    conn.execute('CREATE INDEX idx_ventas_codigo_fecha_cantidad ON ventas (codigo, fecha_carga, cantidad)')
+    with conn:
+        for fecha_carga, df in mes:
+            conn.executemany('INSERT INTO ventas (codigo, nombre, cantidad, fecha_carga) VALUES (?, ?, ?, ?)',
+                             zip(df['Codigo'].tolist(), df['Nombre'].tolist(), df['Cantidad'].tolist(),
+                                 [fecha_carga] * len(df)))
+    conn.close()
+
+
+def medir(db_name, nombre, recorrido):
+    conn = sqlite3.connect(db_name)
+    conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    conn.execute('VACUUM')
+    tamano = os.path.getsize(db_name)
+    tamano_ventas = conn.execute("SELECT SUM(pgsize) FROM dbstat WHERE name = 'ventas' "
+                                 "OR name IN (SELECT name FROM sqlite_master WHERE tbl_name = 'ventas')").fetchone()[0]
+    tiempos = {}
+    for etiqueta, query in (('agrupado por producto', recorrido), ('recorrido completo', RECORRIDO_COMPLETO)):
+        inicio = time.perf_counter()
+        conn.execute(query).fetchall()
+        tiempos[etiqueta] = time.perf_counter() - inicio
+    conn.close()
+    print(f"{nombre:<10} base {tamano / 1e6:8.1f} MB  ventas+índices {tamano_ventas / 1e6:8.1f} MB  " +
+          "  ".join(f"{etiqueta} {t * 1000:8.1f} ms" for etiqueta, t in tiempos.items()))
+    return tamano, tiempos
+
+
+if __name__ == "__main__":
+    filas_totales = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+
+    with tempfile.TemporaryDirectory() as directorio:
+        db_name = os.path.join(directorio, 'ventas.db')
+        print(f"Generando {filas_totales} líneas de venta con el esquema anterior...")
+        crear_base_anterior(db_name, generar_mes(filas_totales))
+        tamano_antes, tiempos_antes = medir(db_name, 'antes', RECORRIDO_ANTES)
+
+        inicio = time.perf_counter()
+        Database(db_name).cerrar()
+        print(f"Migración: {time.perf_counter() - inicio:.2f} s")
+        tamano_despues, tiempos_despues = medir(db_name, 'después', RECORRIDO_DESPUES)
+
+    print(f"Tamaño: {tamano_despues / tamano_antes:.0%} del original")
+    for etiqueta in tiempos_antes:
+        print(f"{etiqueta}: {tiempos_antes[etiqueta] / tiempos_despues[etiqueta]:.1f}x")
@@ -0,0 +1,55 @@
+"""Compara la inserción fila a fila con Database.insertar_ventas_bulk.
+
+Uso: python -m benchmarks.bench_ingesta [filas_totales]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from database import Database, dia_numero
+from benchmarks.datos_sinteticos import generar_mes
+
+
+def por_filas(db, mes):
+    # Ruta anterior de procesar_archivo: iterrows + un INSERT por línea, con el
+    # producto buscado por código en cada una
+    for _, df in mes:
+        nombres = dict(zip(df['Codigo'], df['Nombre']))
+        db.registrar_productos([(codigo, nombre, 1) for codigo, nombre in nombres.items()])
+    with db.transaccion() as conn:
+        for fecha_carga, df in mes:
+            dia = dia_numero(fecha_carga)
+            for _, row in df.iterrows():
+                producto_id = conn.execute('SELECT id FROM productos WHERE codigo = ?',
+                                           (row['Codigo'],)).fetchone()[0]
+                conn.execute('''
+                INSERT INTO ventas (producto_id, fecha, cantidad)
+                VALUES (?, ?, ?)
+                ''', (producto_id, dia, int(row['Cantidad'])))
+
+
+def bulk(db, mes):
+    for fecha_carga, df in mes:
+        db.insertar_ventas_bulk(df, fecha_carga)
+
+
+def medir(nombre, funcion, mes, filas):
+    with tempfile.TemporaryDirectory() as directorio:
+        db = Database(os.path.join(directorio, 'bench.db'))
+        inicio = time.perf_counter()
+        funcion(db, mes)
+        duracion = time.perf_counter() - inicio
+        db.cerrar()
+    print(f"{nombre:<10} {filas:>10} filas  {duracion:8.2f} s  {filas / duracion:12,.0f} filas/s")
+    return duracion
+
+
+if __name__ == "__main__":
+    filas_totales = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    mes = generar_mes(filas_totales)
+    filas = sum(len(df) for _, df in mes)
+
+    t_filas = medir('por filas', por_filas, mes, filas)
+    t_bulk = medir('bulk', bulk, mes, filas)
+    print(f"Aceleración: {t_filas / t_bulk:.1f}x")
@@ -0,0 +1,53 @@
+"""Mide el pronóstico de demanda vectorizado sobre una matriz producto x día.
+
+Compara pronostico.pronosticar_demanda contra el mismo cálculo producto a producto
+(extrapolado desde una muestra) y contra el promedio histórico que usaba antes el
+cálculo de pedidos, midiendo el error sobre los últimos días reservados.
+
+Uso: python -m benchmarks.bench_pronostico [productos] [dias]
+"""
+import sys
+import time
+
+import numpy as np
+
+from pronostico import pronosticar_demanda
+from pedidos import TIEMPO_ENTREGA
+from benchmarks.datos_sinteticos import generar_matriz_demanda
+
+FECHA_INICIO = '2023-01-02'  # Lunes, igual que la columna 0 de la matriz sintética
+MUESTRA_POR_PRODUCTO = 200
+
+
+def por_producto(matriz):
+    # Mismo pronóstico, pero llamando a NumPy una vez por fila
+    return np.array([pronosticar_demanda(fila[np.newaxis, :], FECHA_INICIO, TIEMPO_ENTREGA)[0]
+                     for fila in matriz])
+
+
+if __name__ == "__main__":
+    productos = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    dias = int(sys.argv[2]) if len(sys.argv) > 2 else 3 * 365
+
+    print(f"Generando {productos} productos x {dias} días...")
+    matriz = generar_matriz_demanda(productos, dias + TIEMPO_ENTREGA)
+    historia, reservado = matriz[:, :dias], matriz[:, dias:]
+
+    inicio = time.perf_counter()
+    pronostico = pronosticar_demanda(historia, FECHA_INICIO, TIEMPO_ENTREGA)
+    t_vectorizado = time.perf_counter() - inicio
+
+    muestra = historia[:MUESTRA_POR_PRODUCTO]
+    inicio = time.perf_counter()
+    por_producto(muestra)
+    t_por_producto = (time.perf_counter() - inicio) * productos / len(muestra)
+
+    real = reservado.mean(axis=1)
+    error_pronostico = np.abs(pronostico - real).mean()
+    error_promedio = np.abs(historia.mean(axis=1) - real).mean()
+
+    print(f"{'vectorizado':<22} {t_vectorizado:8.2f} s")
+    print(f"{'producto a producto':<22} {t_por_producto:8.2f} s (estimado con {len(muestra)} productos)")
+    print(f"Aceleración: {t_por_producto / t_vectorizado:.1f}x")
+    print(f"Error absoluto medio a {TIEMPO_ENTREGA} días: pronóstico {error_pronostico:.2f}, "
+          f"promedio histórico {error_promedio:.2f}")
@@ -0,0 +1,123 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+
+def generar_dia(filas, num_productos=500, semilla=0):
+    """Genera un DataFrame con el formato de ventas_DD.xlsx (Codigo, Nombre, Cantidad)"""
+    rng = np.random.default_rng(semilla)
+    indices = rng.integers(0, num_productos, size=filas)
+    codigos = np.array([f"SKU{i:05d}" for i in range(num_productos)])
+    nombres = np.array([f"Producto sintético {i}" for i in range(num_productos)])
+    return pd.DataFrame({
+        'Codigo': codigos[indices],
+        'Nombre': nombres[indices],
+        'Cantidad': rng.integers(1, 20, size=filas)
+    })
+
+
+def generar_mes(filas_totales, dias=30, num_productos=500, anio_mes='2025-01'):
+    """Devuelve una lista [(fecha_carga, DataFrame)] que suma filas_totales líneas de venta"""
+    por_dia = filas_totales // dias
+    return [
+        (f"{anio_mes}-{dia:02d}", generar_dia(por_dia, num_productos, semilla=dia))
+        for dia in range(1, dias + 1)
+    ]
+
+
+def escribir_mes(directorio_ventas, anio_mes, filas_por_dia, num_productos=500, dias=None):
+    """Escribe la carpeta AAAA-MM con un ventas_DD.xlsx por día y devuelve su ruta"""
+    import calendar
+    import openpyxl
+
+    anio, mes = map(int, anio_mes.split('-'))
+    dias = dias or calendar.monthrange(anio, mes)[1]
+    carpeta = os.path.join(directorio_ventas, anio_mes)
+    os.makedirs(carpeta, exist_ok=True)
+
+    for dia in range(1, dias + 1):
+        df = generar_dia(filas_por_dia, num_productos, semilla=anio * 10000 + mes * 100 + dia)
+        wb = openpyxl.Workbook(write_only=True)
+        hoja = wb.create_sheet()
+        hoja.append(['Codigo', 'Nombre', 'Cantidad'])
+        for fila in zip(df['Codigo'].tolist(), df['Nombre'].tolist(), df['Cantidad'].tolist()):
+            hoja.append(fila)
+        wb.save(os.path.join(carpeta, f"ventas_{dia:02d}.xlsx"))
+    return carpeta
+
+
+def escribir_anio(directorio_ventas, anio, filas_por_dia, num_productos=500):
+    """Escribe las 12 carpetas AAAA-MM de un año y devuelve sus rutas"""
+    return escribir_historia(directorio_ventas, f"{anio}-01", 12, filas_por_dia, num_productos)
+
+
+def escribir_historia(directorio_ventas, desde, meses, filas_por_dia, num_productos=500):
+    """Escribe `meses` carpetas AAAA-MM consecutivas a partir del mes `desde` y devuelve sus rutas"""
+    anio, mes = map(int, desde.split('-'))
+    carpetas = []
+    for i in range(meses):
+        anio_mes = f"{anio + (mes - 1 + i) // 12}-{(mes - 1 + i) % 12 + 1:02d}"
+        carpetas.append(escribir_mes(directorio_ventas, anio_mes, filas_por_dia, num_productos))
+    return carpetas
+
+
+def catalogo_sintetico(num_productos=500, semilla=0):
+    """Lista [(codigo, nombre, cantidad_por_caja)] con los mismos códigos y nombres que generar_dia"""
+    rng = np.random.default_rng(semilla)
+    cajas = rng.choice([6, 10, 12, 24, 36, 40, 60, 80], size=num_productos)
+    return [(f"SKU{i:05d}", f"Producto sintético {i}", int(cajas[i])) for i in range(num_productos)]
+
+
+def escribir_inventario(ruta, num_productos=500, semilla=0):
+    """Escribe un inventario .xlsx (codigo, nombre, cantidad) con todos los productos sintéticos"""
+    import openpyxl
+
+    rng = np.random.default_rng(semilla)
+    cantidades = rng.integers(0, 300, size=num_productos)
+    wb = openpyxl.Workbook(write_only=True)
+    hoja = wb.create_sheet()
+    hoja.append(['codigo', 'nombre', 'cantidad'])
+    for i in range(num_productos):
+        hoja.append([f"SKU{i:05d}", f"Producto sintético {i}", int(cantidades[i])])
+    wb.save(ruta)
+    return ruta
+
+
+def escribir_inventarios(directorio, sucursales, num_productos=500):
+    """Escribe inventario_<Sucursal>.xlsx para cada sucursal y devuelve {sucursal: ruta}"""
+    os.makedirs(directorio, exist_ok=True)
+    return {
+        sucursal: escribir_inventario(os.path.join(directorio, f"inventario_{sucursal}.xlsx"),
+                                      num_productos, semilla=i)
+        for i, sucursal in enumerate(sucursales)
+    }
+
+
+def generar_matriz_demanda(num_productos, dias, semilla=0):
+    """Matriz num_productos x dias de ventas diarias con tendencia, estacionalidad semanal y ruido Poisson"""
+    rng = np.random.default_rng(semilla)
+    base = rng.gamma(2.0, 5.0, size=(num_productos, 1))
+    tendencia = 1 + rng.normal(0, 0.3, size=(num_productos, 1)) * np.linspace(0, 1, dias)
+    semana = 1 + rng.uniform(0, 0.6, size=(num_productos, 7)) - 0.3
+    estacional = semana[:, np.arange(dias) % 7]
+    return rng.poisson(np.clip(base * tendencia * estacional, 0, None)).astype(float)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.datos_sinteticos',
+                                     description="Escribe carpetas AAAA-MM/ventas_DD.xlsx e inventarios sintéticos")
+    parser.add_argument('destino', help="Carpeta donde se crean ventas/ e inventarios/")
+    parser.add_argument('--desde', default='2024-01', help="Primer mes AAAA-MM (por defecto 2024-01)")
+    parser.add_argument('--meses', type=int, default=12, help="Meses de historia (por defecto 12)")
+    parser.add_argument('--productos', type=int, default=500, help="Cantidad de SKU (por defecto 500)")
+    parser.add_argument('--filas-por-dia', type=int, default=2000, help="Líneas de venta por día (por defecto 2000)")
+    parser.add_argument('--sucursales', nargs='*', default=['Arequipa'], help="Un inventario por sucursal")
+    args = parser.parse_args()
+
+    carpetas = escribir_historia(os.path.join(args.destino, 'ventas'), args.desde, args.meses,
+                                 args.filas_por_dia, args.productos)
+    inventarios = escribir_inventarios(os.path.join(args.destino, 'inventarios'), args.sucursales, args.productos)
+    print(f"{len(carpetas)} carpetas de mes y {len(inventarios)} inventarios en {args.destino}")
@@ -0,0 +1,206 @@
+"""Suite de benchmarks de las rutas críticas con datos sintéticos, con resultados en JSON.
+
+Genera carpetas AAAA-MM/ventas_DD.xlsx e inventarios para la configuración indicada
+y mide, como los usa la aplicación:
+    ingesta          cargar_meses de toda la historia en una base nueva (sin caché Parquet)
+    busqueda         buscar_datos: todas las páginas de paginas_busqueda_ventas de un día
+    rango            abrir_ventana_grafico: AlmacenSeries.actualizar + serie de 90 días
+    comparacion      meses disponibles + matriz meses x 31 de un producto
+    recomendaciones  leer el inventario y calcular_recomendaciones
+    sucursales       leer_inventarios y calcular_recomendaciones_sucursales
+
+Cada prueba se repite y se guarda la mediana. Con una línea base de la misma
+configuración, una mediana más lenta que (1 + tolerancia) veces la de la base se
+marca como regresión y el proceso termina con código 1.
+
+Uso:
+    python -m benchmarks.suite [--productos 500] [--meses 3] [--filas-por-dia 2000]
+                               [--repeticiones 3] [--salida resultados_benchmarks.json]
+                               [--linea-base benchmarks/linea_base.json] [--guardar-linea-base]
+                               [--tolerancia 0.25]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+from almacen_series import AlmacenSeries
+from database import Database
+from ingesta import cargar_meses
+from pedidos import leer_inventario, leer_inventarios, calcular_recomendaciones, calcular_recomendaciones_sucursales
+from benchmarks.datos_sinteticos import escribir_historia, escribir_inventarios, catalogo_sintetico
+
+LINEA_BASE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'linea_base.json')
+TOLERANCIA = 0.25
+SUCURSALES = ['Arequipa', 'Cusco', 'Lima']
+
+# Operaciones por repetición en las pruebas de consultas cortas
+BUSQUEDAS = ['sintético 1', 'SKU000', '7', 'producto 42', 'inexistente']
+CONSULTAS_RANGO = 50
+CONSULTAS_COMPARACION = 50
+TAMANO_PAGINA = 500  # El de main.py
+DIAS_RANGO = 90
+
+
+def medir(funcion, repeticiones, operaciones=1):
+    """Ejecuta funcion() `repeticiones` veces y resume sus tiempos en segundos"""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return {
+        'mediana_s': statistics.median(tiempos),
+        'min_s': min(tiempos),
+        'repeticiones': repeticiones,
+        'operaciones': operaciones,
+    }
+
+
+def ejecutar_suite(config, directorio):
+    ventas = os.path.join(directorio, 'ventas')
+    print(f"Generando {config['meses']} meses x {config['filas_por_dia']} filas/día, "
+          f"{config['productos']} productos...", flush=True)
+    carpetas = escribir_historia(ventas, config['desde'], config['meses'],
+                                 config['filas_por_dia'], config['productos'])
+    inventarios = escribir_inventarios(os.path.join(directorio, 'inventarios'), SUCURSALES, config['productos'])
+    resultados = {}
+
+    # Ingesta: cada repetición en una base vacía para que el manifiesto no omita libros
+    corridas = iter(range(config['repeticiones']))
+
+    def ingesta():
+        db_name = os.path.join(directorio, f"ingesta_{next(corridas)}.db")
+        cargar_meses(db_name, carpetas, usar_cache=False)
+    resultados['ingesta'] = medir(ingesta, config['repeticiones'], operaciones=len(carpetas))
+
+    db_name = os.path.join(directorio, 'ingesta_0.db')
+    db = Database(db_name)
+    try:
+        db.registrar_productos(catalogo_sintetico(config['productos']))
+        almacen = AlmacenSeries(db_name)
+        almacen.actualizar(db)
+
+        fecha_fin = date.fromisoformat(db.ultima_fecha_ventas())
+        rng = random.Random(0)
+        codigos = [f"SKU{rng.randrange(config['productos']):05d}" for _ in range(max(CONSULTAS_RANGO,
+                                                                                       CONSULTAS_COMPARACION))]
+
+        def busqueda():
+            for texto in BUSQUEDAS:
+                for _ in db.paginas_busqueda_ventas(texto, fecha_fin.isoformat(), TAMANO_PAGINA):
+                    pass
+        resultados['busqueda'] = medir(busqueda, config['repeticiones'], operaciones=len(BUSQUEDAS))
+
+        desde = (fecha_fin - timedelta(days=DIAS_RANGO - 1)).isoformat()
+
+        def rango():
+            for codigo in codigos[:CONSULTAS_RANGO]:
+                almacen.actualizar(db)
+                almacen.serie(codigo, desde, fecha_fin.isoformat())
+        resultados['rango'] = medir(rango, config['repeticiones'], operaciones=CONSULTAS_RANGO)
+
+        def comparacion():
+            for codigo in codigos[:CONSULTAS_COMPARACION]:
+                almacen.actualizar(db)
+                almacen.matriz_meses(codigo, db.meses_producto(codigo))
+        resultados['comparacion'] = medir(comparacion, config['repeticiones'], operaciones=CONSULTAS_COMPARACION)
+
+        ruta_inventario = inventarios[SUCURSALES[0]]
+        resultados['recomendaciones'] = medir(
+            lambda: calcular_recomendaciones(db, leer_inventario(ruta_inventario), almacen),
+            config['repeticiones'])
+        resultados['sucursales'] = medir(
+            lambda: calcular_recomendaciones_sucursales(db, leer_inventarios(inventarios), almacen),
+            config['repeticiones'], operaciones=len(inventarios))
+    finally:
+        db.cerrar()
+    return resultados
+
+
+def comparar(resultados, linea_base, tolerancia):
+    """Lista [(prueba, razón mediana actual / base)] y las pruebas que superan la tolerancia"""
+    razones, regresiones = [], []
+    for nombre, actual in resultados.items():
+        base = linea_base['resultados'].get(nombre)
+        if base is None or not base['mediana_s']:
+            continue
+        razon = actual['mediana_s'] / base['mediana_s']
+        razones.append((nombre, razon))
+        if razon > 1 + tolerancia:
+            regresiones.append(nombre)
+    return dict(razones), regresiones
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.suite', description="Benchmarks de las rutas críticas")
+    parser.add_argument('--productos', type=int, default=500, help="Cantidad de SKU (por defecto 500)")
+    parser.add_argument('--meses', type=int, default=3, help="Meses de historia (por defecto 3)")
+    parser.add_argument('--desde', default='2024-01', help="Primer mes AAAA-MM (por defecto 2024-01)")
+    parser.add_argument('--filas-por-dia', type=int, default=2000, help="Líneas de venta por día (por defecto 2000)")
+    parser.add_argument('--repeticiones', type=int, default=3, help="Repeticiones por prueba (por defecto 3)")
+    parser.add_argument('--salida', default='resultados_benchmarks.json', help="JSON con los resultados")
+    parser.add_argument('--linea-base', default=LINEA_BASE, help="JSON de referencia para detectar regresiones")
+    parser.add_argument('--guardar-linea-base', action='store_true', help="Guardar estos resultados como línea base")
+    parser.add_argument('--tolerancia', type=float, default=TOLERANCIA,
+                        help="Lentitud relativa admitida antes de marcar una regresión (por defecto 0.25)")
+    args = parser.parse_args(argv)
+
+    config = {
+        'productos': args.productos,
+        'meses': args.meses,
+        'desde': args.desde,
+        'filas_por_dia': args.filas_por_dia,
+        'repeticiones': args.repeticiones,
+    }
+    with tempfile.TemporaryDirectory() as directorio:
+        resultados = ejecutar_suite(config, directorio)
+
+    informe = {
+        'fecha': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'config': config,
+        'entorno': {'python': platform.python_version(), 'plataforma': platform.platform(),
+                    'cpus': os.cpu_count()},
+        'resultados': resultados,
+    }
+
+    linea_base = None
+    if os.path.exists(args.linea_base) and not args.guardar_linea_base:
+        with open(args.linea_base, encoding='utf-8') as f:
+            linea_base = json.load(f)
+        if linea_base['config'] != config:
+            print(f"La línea base {args.linea_base} usa otra configuración: no se compara")
+            linea_base = None
+
+    razones, regresiones = comparar(resultados, linea_base, args.tolerancia) if linea_base else ({}, [])
+    informe['regresiones'] = regresiones
+
+    print(f"\n{'Prueba':<16} {'Mediana':>10} {'Mínimo':>10} {'Por operación':>14} {'vs base':>9}")
+    for nombre, r in resultados.items():
+        razon = f"{razones[nombre]:.2f}x" if nombre in razones else '-'
+        marca = '  REGRESIÓN' if nombre in regresiones else ''
+        print(f"{nombre:<16} {r['mediana_s']:>9.3f}s {r['min_s']:>9.3f}s "
+              f"{r['mediana_s'] / r['operaciones'] * 1000:>11.2f} ms {razon:>9}{marca}")
+
+    with open(args.salida, 'w', encoding='utf-8') as f:
+        json.dump(informe, f, indent=2, ensure_ascii=False)
+    print(f"\nResultados guardados en {args.salida}")
+    if args.guardar_linea_base:
+        with open(args.linea_base, 'w', encoding='utf-8') as f:
+            json.dump(informe, f, indent=2, ensure_ascii=False)
+        print(f"Línea base guardada en {args.linea_base}")
+
+    if regresiones:
+        print(f"Regresiones (> {args.tolerancia:.0%} más lento): {', '.join(regresiones)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
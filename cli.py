@@ -0,0 +1,261 @@
+"""Interfaz de línea de comandos (sin tkinter ni matplotlib) para tareas programadas.
+
+Uso:
+    python -m cli ingest ventas/2025-01 ventas/2025-02 [--workers 4]
+    python -m cli recommend inventario/actual.xlsx [--salida recomendaciones.csv]
+    python -m cli order inventario/actual.xlsx plantilla.xlsx [--hoja Arequipa] [--salida orden.xlsx]
+    python -m cli order-branches plantilla.xlsx Arequipa=inv_aqp.xlsx inventario_Lima.xlsx [--salida orden.xlsx]
+    python -m cli supplier Proveedor [--tiempo-entrega 7] [--costo-pedido 30] [--costo-almacenamiento 69]
+    python -m cli product-params FB007 [--proveedor Proveedor] [--tiempo-entrega 10] [--limpiar costo-pedido]
+    python -m cli rebuild-rollup
+    python -m cli check-plans
+"""
+import argparse
+import sys
+
+from almacen_series import AlmacenSeries
+from database import Database
+from ingesta import cargar_meses, WORKERS_POR_DEFECTO
+from pedidos import (leer_inventario, calcular_recomendaciones, pedidos_a_realizar,
+                     rellenar_plantilla, nombre_orden_por_defecto, HOJA_POR_DEFECTO,
+                     leer_inventarios, calcular_recomendaciones_sucursales, rellenar_plantilla_sucursales,
+                     hojas_plantilla, hoja_de_inventario, rutas_por_hoja)
+
+
+def comando_ingest(args):
+    resultado = cargar_meses(args.db, args.carpetas, workers=args.workers, usar_cache=not args.sin_cache)
+    print(f"Procesados {resultado['archivos']} archivos ({resultado['omitidos']} sin cambios): "
+          f"{resultado['filas']} filas en {resultado['duracion']:.2f} s "
+          f"({resultado['filas_por_segundo']:,.0f} filas/s)")
+
+    # Poner al día la matriz de series para que gráficos y pedidos no esperen
+    db = Database(args.db)
+    try:
+        AlmacenSeries(args.db).actualizar(db)
+    finally:
+        db.cerrar()
+    return 0
+
+
+def _recomendaciones(args):
+    db = Database(args.db)
+    try:
+        return calcular_recomendaciones(db, leer_inventario(args.inventario), AlmacenSeries(args.db))
+    finally:
+        db.cerrar()
+
+
+def comando_recommend(args):
+    recomendaciones = _recomendaciones(args)
+
+    if args.salida:
+        if args.salida.endswith('.xlsx'):
+            recomendaciones.to_excel(args.salida, index=False)
+        else:
+            recomendaciones.to_csv(args.salida, index=False)
+        print(f"{len(recomendaciones)} recomendaciones guardadas en {args.salida}")
+        return 0
+
+    print(f"{'Código':<10} {'Producto':<40} {'Inv.':>6} {'Demanda':>9} {'Seguridad':>9} {'Reorden':>9} {'EOQ':>9} {'Cajas':>6}")
+    for rec in recomendaciones.itertuples(index=False):
+        print(f"{rec.codigo:<10} {str(rec.nombre)[:40]:<40} {rec.inventario_actual:>6} "
+              f"{rec.demanda_diaria:>9.2f} {rec.stock_seguridad:>9.2f} {rec.punto_reorden:>9.2f} {rec.eoq:>9.2f} "
+              f"{rec.cajas_a_pedir:>6}")
+    return 0
+
+
+def comando_order(args):
+    pedidos = pedidos_a_realizar(_recomendaciones(args))
+    if not pedidos:
+        print("No hay productos para pedir")
+        return 0
+
+    wb, productos_procesados, no_encontrados = rellenar_plantilla(pedidos, args.plantilla, args.hoja)
+    for pedido in no_encontrados:
+        print(f"Sin fila en la plantilla: {pedido['codigo']} {pedido['producto']} ({pedido['cajas']} cajas)",
+              file=sys.stderr)
+    if productos_procesados == 0:
+        print("No se encontraron coincidencias con la plantilla", file=sys.stderr)
+        return 1
+
+    salida = args.salida or f"{nombre_orden_por_defecto(args.hoja)}.xlsx"
+    wb.save(salida)
+    print(f"Orden generada con {productos_procesados} productos en {salida}")
+    return 0
+
+
+def comando_order_branches(args):
+    # Cada sucursal es HOJA=inventario.xlsx, o solo el inventario si su nombre incluye la hoja
+    hojas = hojas_plantilla(args.plantilla)
+    asignaciones = []
+    for sucursal in args.sucursales:
+        if '=' in sucursal:
+            hoja, ruta = sucursal.split('=', 1)
+        else:
+            hoja, ruta = hoja_de_inventario(sucursal, hojas), sucursal
+            if hoja is None:
+                print(f"No hay hoja en la plantilla para {sucursal}; use HOJA={sucursal}", file=sys.stderr)
+                return 1
+        asignaciones.append((hoja, ruta))
+    rutas = rutas_por_hoja(asignaciones)
+
+    inventarios = leer_inventarios(rutas, args.workers)
+    db = Database(args.db)
+    try:
+        recomendaciones = calcular_recomendaciones_sucursales(db, inventarios, AlmacenSeries(args.db))
+    finally:
+        db.cerrar()
+
+    pedidos = {hoja: pedidos_a_realizar(df) for hoja, df in recomendaciones.items()}
+    wb, resultados = rellenar_plantilla_sucursales(pedidos, args.plantilla)
+    for hoja, (procesados, no_encontrados) in resultados.items():
+        print(f"{hoja}: {procesados} productos")
+        for pedido in no_encontrados:
+            print(f"{hoja}: sin fila en la plantilla: {pedido['codigo']} {pedido['producto']} "
+                  f"({pedido['cajas']} cajas)", file=sys.stderr)
+
+    salida = args.salida or f"{nombre_orden_por_defecto('Sucursales')}.xlsx"
+    wb.save(salida)
+    print(f"Orden guardada en {salida}")
+    return 0
+
+
+def comando_rebuild_rollup(args):
+    db = Database(args.db)
+    try:
+        db.reconstruir_ventas_diarias()
+        filas = db.consultar_valor('SELECT COUNT(*) FROM ventas_diarias')
+    finally:
+        db.cerrar()
+    print(f"Resumen diario reconstruido: {filas} filas")
+    return 0
+
+
+def comando_check_plans(args):
+    db = Database(args.db)
+    try:
+        planes = db.planes_de_consulta()
+        sin_indice = db.consultas_sin_indice()
+    finally:
+        db.cerrar()
+
+    for nombre, detalles in planes.items():
+        print(f"{nombre}:")
+        for detalle in detalles:
+            print(f"    {detalle}")
+
+    if sin_indice:
+        for nombre, detalle in sin_indice:
+            print(f"Recorrido completo en {nombre}: {detalle}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def comando_supplier(args):
+    db = Database(args.db)
+    try:
+        db.guardar_proveedor(args.nombre, args.tiempo_entrega, args.costo_pedido, args.costo_almacenamiento,
+                             limpiar=_campos(args.limpiar))
+    finally:
+        db.cerrar()
+    print(f"Proveedor {args.nombre} guardado")
+    return 0
+
+
+def comando_product_params(args):
+    db = Database(args.db)
+    try:
+        actualizado = db.actualizar_parametros_producto(
+            args.codigo, args.proveedor, args.tiempo_entrega, args.costo_pedido, args.costo_almacenamiento,
+            limpiar=_campos(args.limpiar))
+    finally:
+        db.cerrar()
+    if not actualizado:
+        print(f"No existe el producto {args.codigo} o el proveedor {args.proveedor}", file=sys.stderr)
+        return 1
+    print(f"Parámetros de {args.codigo} actualizados")
+    return 0
+
+
+def _campos(opciones):
+    # 'tiempo-entrega' -> 'tiempo_entrega', como los parámetros de Database
+    return [opcion.replace('-', '_') for opcion in opciones]
+
+
+def _agregar_parametros_reposicion(subparser, limpiables=()):
+    subparser.add_argument('--tiempo-entrega', type=int, help="Días de entrega")
+    subparser.add_argument('--costo-pedido', type=float, help="Costo fijo por pedido")
+    subparser.add_argument('--costo-almacenamiento', type=float, help="Costo anual de almacenar una unidad")
+    subparser.add_argument('--limpiar', nargs='+', default=[],
+                           choices=list(limpiables) + ['tiempo-entrega', 'costo-pedido', 'costo-almacenamiento'],
+                           help="Dejar sin definir estos campos (los omitidos no cambian)")
+
+
+def crear_parser():
+    parser = argparse.ArgumentParser(prog="python -m cli", description="Gestión de ventas sin interfaz gráfica")
+    parser.add_argument('--db', default='ventas.db', help="Ruta de la base de datos (por defecto ventas.db)")
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+
+    p_ingest = subparsers.add_parser('ingest', help="Cargar carpetas de mes AAAA-MM")
+    p_ingest.add_argument('carpetas', nargs='+', help="Carpetas AAAA-MM con archivos ventas_DD.xlsx")
+    p_ingest.add_argument('--workers', type=int, default=WORKERS_POR_DEFECTO,
+                          help="Procesos para parsear libros (por defecto todos los núcleos)")
+    p_ingest.add_argument('--sin-cache', action='store_true',
+                          help="No leer ni escribir la caché Parquet de libros parseados")
+    p_ingest.set_defaults(funcion=comando_ingest)
+
+    p_recommend = subparsers.add_parser('recommend', help="Calcular recomendaciones de pedido")
+    p_recommend.add_argument('inventario', help="Excel de inventario (codigo, nombre, cantidad)")
+    p_recommend.add_argument('--salida', help="Guardar en .csv o .xlsx en lugar de imprimir")
+    p_recommend.set_defaults(funcion=comando_recommend)
+
+    p_order = subparsers.add_parser('order', help="Generar la orden de pedido desde una plantilla")
+    p_order.add_argument('inventario', help="Excel de inventario (codigo, nombre, cantidad)")
+    p_order.add_argument('plantilla', help="Plantilla de pedido .xlsx")
+    p_order.add_argument('--hoja', default=HOJA_POR_DEFECTO, help="Hoja de la plantilla a rellenar")
+    p_order.add_argument('--salida', help="Archivo .xlsx de salida")
+    p_order.set_defaults(funcion=comando_order)
+
+    p_branches = subparsers.add_parser('order-branches',
+                                       help="Generar la orden de varias sucursales en una sola plantilla")
+    p_branches.add_argument('plantilla', help="Plantilla de pedido .xlsx con una hoja por sucursal")
+    p_branches.add_argument('sucursales', nargs='+',
+                            help="HOJA=inventario.xlsx, o inventario.xlsx si el nombre incluye la hoja")
+    p_branches.add_argument('--workers', type=int, default=None,
+                            help="Procesos para leer inventarios (por defecto todos los núcleos)")
+    p_branches.add_argument('--salida', help="Archivo .xlsx de salida")
+    p_branches.set_defaults(funcion=comando_order_branches)
+
+    p_rollup = subparsers.add_parser('rebuild-rollup', help="Reconstruir el resumen diario ventas_diarias")
+    p_rollup.set_defaults(funcion=comando_rebuild_rollup)
+
+    p_planes = subparsers.add_parser('check-plans', help="Verificar que las consultas de la app usan índices")
+    p_planes.set_defaults(funcion=comando_check_plans)
+
+    p_supplier = subparsers.add_parser('supplier', help="Crear o actualizar un proveedor y sus parámetros por defecto")
+    p_supplier.add_argument('nombre', help="Nombre del proveedor")
+    _agregar_parametros_reposicion(p_supplier)
+    p_supplier.set_defaults(funcion=comando_supplier)
+
+    p_params = subparsers.add_parser('product-params',
+                                     help="Asignar proveedor y parámetros propios a un producto "
+                                          "(los no definidos se heredan del proveedor)")
+    p_params.add_argument('codigo', help="Código del producto")
+    p_params.add_argument('--proveedor', help="Nombre de un proveedor existente")
+    _agregar_parametros_reposicion(p_params, limpiables=['proveedor'])
+    p_params.set_defaults(funcion=comando_product_params)
+
+    return parser
+
+
+def main(argv=None):
+    args = crear_parser().parse_args(argv)
+    try:
+        return args.funcion(args)
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,309 @@
+import queue
+import re
 import sqlite3
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from datetime import date, timedelta
+
+# ventas.fecha se guarda como número de día (días desde 1970-01-01, igual que datetime64[D])
+EPOCA = date(1970, 1, 1)
+
+
+def dia_numero(fecha):
+    """'AAAA-MM-DD' -> número de día"""
+    return (date.fromisoformat(fecha) - EPOCA).days
+
+
+def fecha_de_dia(dia):
+    """Número de día -> 'AAAA-MM-DD'"""
+    return (EPOCA + timedelta(days=dia)).isoformat()
+
+# Consultas frecuentes de la aplicación. Se declaran aquí para que los métodos y la
+# verificación de planes (consultas_sin_indice) usen exactamente el mismo SQL.
+SQL_MESES_PRODUCTO = '''
+SELECT DISTINCT anio_mes
+FROM ventas_diarias
+WHERE codigo = ?
+ORDER BY anio_mes
+'''
+
+SQL_VENTAS_DIARIAS_DESDE = '''
+SELECT codigo, fecha, total
+FROM ventas_diarias
+WHERE fecha >= ?
+'''
+
+SQL_ULTIMA_FECHA_VENTAS = '''
+SELECT MAX(fecha) FROM ventas_diarias
+'''
+
+SQL_VENTAS_DEL_DIA = '''
+SELECT v.id, p.codigo, p.nombre, v.cantidad, date(v.fecha * 86400, 'unixepoch') AS fecha_carga
+FROM ventas v
+JOIN productos p ON p.id = v.producto_id
+WHERE v.fecha = ?
+'''
+
+SQL_BUSCAR_VENTAS = '''
+SELECT v.id, p.codigo, p.nombre, v.cantidad, date(v.fecha * 86400, 'unixepoch') AS fecha_carga
+FROM ventas v
+JOIN productos p ON p.id = v.producto_id
+WHERE v.fecha = ?
+  AND (v.producto_id IN (SELECT rowid FROM productos_fts WHERE productos_fts MATCH ?)
+       OR p.codigo LIKE ? ESCAPE '\\'
+       OR v.cantidad = ?)
+'''
+
+# Sufijo de SQL_VENTAS_DEL_DIA y SQL_BUSCAR_VENTAS para paginar por clave: la página
+# siguiente son las filas con id mayor que la última mostrada (idx_ventas_fecha ya las
+# entrega en orden de id dentro del día)
+SQL_PAGINA_POR_ID = '''
+  AND v.id > ?
+ORDER BY v.id
+LIMIT ?
+'''
+
+SQL_BUSCAR_PRODUCTOS = '''
+SELECT p.codigo, p.nombre, p.prioridad
+FROM productos_fts f
+JOIN productos p ON p.id = f.rowid
+WHERE productos_fts MATCH ?
+ORDER BY p.codigo
+'''
+
+SQL_LISTAR_PRODUCTOS = '''
+SELECT codigo, nombre, prioridad FROM productos ORDER BY codigo
+'''
+
+SQL_ESTADISTICAS_DEMANDA = '''
+SELECT p.codigo, p.cantidad_por_caja, p.prioridad, v.dias, v.total, v.suma_cuadrados
+FROM productos p
+JOIN (
+    SELECT codigo, COUNT(*) AS dias, SUM(total) AS total, SUM(total * total) AS suma_cuadrados
+    FROM ventas_diarias
+    GROUP BY codigo
+) v ON v.codigo = p.codigo
+WHERE p.auto_registrado = 0
+'''
+
+SQL_RECALCULAR_VENTAS_DIARIAS = '''
+SELECT p.codigo, date(v.fecha * 86400, 'unixepoch'), v.total
+FROM (
+    SELECT producto_id, fecha, SUM(cantidad) AS total
+    FROM ventas
+    GROUP BY producto_id, fecha
+) v
+JOIN productos p ON p.id = v.producto_id
+'''
+
+SQL_PARAMETROS_REPOSICION = '''
+SELECT p.codigo,
+       COALESCE(p.tiempo_entrega, pr.tiempo_entrega),
+       COALESCE(p.costo_pedido, pr.costo_pedido),
+       COALESCE(p.costo_almacenamiento, pr.costo_almacenamiento)
+FROM productos p
+LEFT JOIN proveedores pr ON pr.id = p.proveedor_id
+'''
+
+SQL_CAMBIOS_DESDE = '''
+SELECT codigo, fecha FROM cambios_ventas WHERE generacion > ?
+'''
+
+SQL_CAMBIOS_CON_TOTALES = '''
+SELECT c.codigo, c.fecha, COALESCE(v.total, 0)
+FROM cambios_ventas c
+LEFT JOIN ventas_diarias v ON v.codigo = c.codigo AND v.fecha = c.fecha
+WHERE c.generacion > ?
+'''
+
+SQL_ACTUALIZAR_PRIORIDAD = '''
+UPDATE productos SET prioridad = ? WHERE codigo = ?
+'''
+
+# Conexiones de solo lectura por Database y sentencias preparadas que guarda cada conexión
+CONEXIONES_LECTURA = 4
+SENTENCIAS_EN_CACHE = 256
+
+# Generaciones del registro de cambios que se conservan (las cachés más atrasadas se vacían)
+RETENER_GENERACIONES = 1000
+
+# Nombre -> (consulta, parámetros de ejemplo). Ninguna debe recorrer una tabla completa.
+CONSULTAS_INDEXADAS = {
+    'meses_producto': (SQL_MESES_PRODUCTO, ('FB007',)),
+    'ventas_diarias_desde': (SQL_VENTAS_DIARIAS_DESDE, ('2025-01-01',)),
+    'ultima_fecha_ventas': (SQL_ULTIMA_FECHA_VENTAS, ()),
+    'ventas_del_dia': (SQL_VENTAS_DEL_DIA, (20089,)),
+    'buscar_ventas': (SQL_BUSCAR_VENTAS, (20089, '"fb"*', 'FB%', None)),
+    'pagina_ventas_del_dia': (SQL_VENTAS_DEL_DIA + SQL_PAGINA_POR_ID, (20089, 0, 500)),
+    'pagina_buscar_ventas': (SQL_BUSCAR_VENTAS + SQL_PAGINA_POR_ID, (20089, '"fb"*', 'FB%', None, 0, 500)),
+    'buscar_productos': (SQL_BUSCAR_PRODUCTOS, ('"cafe"*',)),
+    'actualizar_prioridad': (SQL_ACTUALIZAR_PRIORIDAD, ('alta', 'FB007')),
+    'cambios_desde': (SQL_CAMBIOS_DESDE, (0,)),
+    'cambios_con_totales': (SQL_CAMBIOS_CON_TOTALES, (0,)),
+    'reemplazar_dia': ('DELETE FROM ventas WHERE fecha = ?', (20089,)),
+    'reemplazar_resumen_dia': ('DELETE FROM ventas_diarias WHERE fecha = ?', ('2025-01-01',)),
+}
+
+# Consultas que leen una tabla entera a propósito, con los recorridos (SCAN) que se esperan
+# en su plan: por un índice de cobertura o en el orden de un índice o de la clave primaria.
+# Otro recorrido, u ordenar en una tabla temporal, cuenta como consulta sin índice.
+LECTURAS_COMPLETAS = {
+    # ventas_diarias es WITHOUT ROWID: se recorre su clave (codigo, fecha), ya agrupada por codigo
+    'estadisticas_demanda': (SQL_ESTADISTICAS_DEMANDA, (), ['SCAN ventas_diarias', 'SCAN v']),
+    'listar_productos': (SQL_LISTAR_PRODUCTOS, (), ['SCAN productos USING INDEX sqlite_autoindex_productos_1']),
+    # Usa todas las columnas de cada producto: ningún índice evita leer la tabla
+    'parametros_reposicion': (SQL_PARAMETROS_REPOSICION, (), ['SCAN p']),
+    'recalcular_ventas_diarias': (SQL_RECALCULAR_VENTAS_DIARIAS, (), [
+        'SCAN ventas USING COVERING INDEX idx_ventas_producto_fecha_cantidad', 'SCAN v']),
+}
+
+
+class CacheLRU:
+    """Caché LRU de resultados de consultas por producto.
+
+    Las claves son tuplas (tipo, codigo, ...); cuando cambian ventas de un producto se
+    invalidan todas sus entradas.
+    """
+
+    def __init__(self, capacidad=256):
+        self.capacidad = capacidad
+        self._entradas = OrderedDict()
+        self._claves_por_codigo = defaultdict(set)
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+        self.invalidaciones = 0
+
+    def obtener(self, clave):
+        if clave in self._entradas:
+            self._entradas.move_to_end(clave)
+            self.aciertos += 1
+            return True, self._entradas[clave]
+        self.fallos += 1
+        return False, None
+
+    def guardar(self, clave, valor):
+        self._entradas[clave] = valor
+        self._entradas.move_to_end(clave)
+        self._claves_por_codigo[clave[1]].add(clave)
+        while len(self._entradas) > self.capacidad:
+            antigua, _ = self._entradas.popitem(last=False)
+            self._claves_por_codigo[antigua[1]].discard(antigua)
+            self.desalojos += 1
+
+    def invalidar(self, codigo):
+        for clave in self._claves_por_codigo.pop(codigo, ()):
+            del self._entradas[clave]
+            self.invalidaciones += 1
+
+    def limpiar(self):
+        self.invalidaciones += len(self._entradas)
+        self._entradas.clear()
+        self._claves_por_codigo.clear()
+
+    def estadisticas(self):
+        consultas = self.aciertos + self.fallos
+        return {
+            'entradas': len(self._entradas),
+            'capacidad': self.capacidad,
+            'aciertos': self.aciertos,
+            'fallos': self.fallos,
+            'tasa_aciertos': self.aciertos / consultas if consultas else 0.0,
+            'desalojos': self.desalojos,
+            'invalidaciones': self.invalidaciones,
+        }
+
 
 class Database:
-    def __init__(self, db_name='ventas.db'):
-        self.conn = sqlite3.connect(db_name)
-        self.cursor = self.conn.cursor()
+    """Acceso a ventas.db seguro entre hilos.
+
+    Las escrituras van por una única conexión (self.conn), serializadas con un candado
+    y siempre dentro de transaccion(). Las lecturas toman una conexión de solo lectura
+    de un pool; con WAL no esperan a una carga en curso y ven el último commit.
+    Cada conexión reutiliza las sentencias preparadas de las consultas SQL_*.
+    """
+
+    def __init__(self, db_name='ventas.db', capacidad_cache=256, conexiones_lectura=CONEXIONES_LECTURA):
+        self.db_name = db_name
+        self._lock_escritura = threading.RLock()
+        self.conn = sqlite3.connect(db_name, check_same_thread=False, cached_statements=SENTENCIAS_EN_CACHE)
+        # WAL + synchronous NORMAL: las cargas masivas no esperan un fsync por transacción
+        # y los lectores no se bloquean mientras se escribe
+        self.conn.execute('PRAGMA journal_mode = WAL')
+        self._configurar_conexion(self.conn)
         self._crear_tablas()
 
+        # Pool de lectura (una base en memoria no se puede volver a abrir: se lee por self.conn)
+        self._en_memoria = db_name in ('', ':memory:')
+        self._lectores = queue.LifoQueue()
+        self._lectores_abiertos = []
+        self._cupos_lectores = threading.Semaphore(0 if self._en_memoria else conexiones_lectura)
+
+        # Caché de consultas por producto (meses_producto); se invalida siguiendo la generación de datos
+        self._lock_cache = threading.Lock()
+        self._cache = CacheLRU(capacidad_cache)
+        self._generacion_cache = self.generacion_datos()
+
+        # Diccionario codigo -> productos.id para la ingesta (se carga al primer uso)
+        self._ids_producto = None
+
+    @staticmethod
+    def _configurar_conexion(conn):
+        conn.execute('PRAGMA synchronous = NORMAL')
+        conn.execute('PRAGMA temp_store = MEMORY')
+        conn.execute('PRAGMA cache_size = -64000')  # ~64 MB
+
+    def _abrir_lector(self):
+        uri = Path(self.db_name).resolve().as_uri() + '?mode=ro'
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False, cached_statements=SENTENCIAS_EN_CACHE)
+        self._configurar_conexion(conn)
+        self._lectores_abiertos.append(conn)
+        return conn
+
+    @contextmanager
+    def lectura(self):
+        """Conexión de solo lectura del pool mientras dura el bloque with"""
+        if self._en_memoria:
+            with self._lock_escritura:
+                yield self.conn
+            return
+        try:
+            conn = self._lectores.get_nowait()
+        except queue.Empty:
+            # Se abren conexiones hasta el máximo; después se espera a que se libere una
+            if self._cupos_lectores.acquire(blocking=False):
+                conn = self._abrir_lector()
+            else:
+                conn = self._lectores.get()
+        try:
+            yield conn
+        finally:
+            self._lectores.put(conn)
+
+    @contextmanager
+    def transaccion(self):
+        """Transacción de escritura: commit al salir del bloque with, rollback si hay una excepción"""
+        with self._lock_escritura:
+            with self.conn:
+                yield self.conn
+
+    def consultar(self, query, params=()):
+        """Todas las filas de una consulta de lectura"""
+        with self.lectura() as conn:
+            return conn.execute(query, params).fetchall()
+
+    def consultar_valor(self, query, params=()):
+        """Primera columna de la primera fila de una consulta de lectura (None si no hay filas)"""
+        with self.lectura() as conn:
+            fila = conn.execute(query, params).fetchone()
+        return fila[0] if fila is not None else None
+
     def _crear_tablas(self):
         # Crear la tabla productos si no existe
-        self.cursor.execute('''
+        self.conn.execute('''
         CREATE TABLE IF NOT EXISTS productos (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             codigo TEXT NOT NULL UNIQUE,
@@ -19,8 +314,7 @@ class Database:
         ''')
 
         # Insertar datos de ejemplo en la tabla productos (solo si está vacía)
-        self.cursor.execute('SELECT COUNT(*) FROM productos')
-        if self.cursor.fetchone()[0] == 0:
+        if self.conn.execute('SELECT COUNT(*) FROM productos').fetchone()[0] == 0:
             productos_ejemplo = [
                 ('FB007', 'DXN Morinzhi', 36),
                 ('FB027', 'DXN Morinzyme', 36),
@@ -66,13 +360,13 @@ class Database:
             ]
             
             # Usar executemany para insertar todos los productos
-            self.cursor.executemany('''
+            self.conn.executemany('''
             INSERT INTO productos (codigo, nombre, cantidad_por_caja)
             VALUES (?, ?, ?)
             ''', productos_ejemplo)
 
         # Crear la tabla ventas si no existe
-        self.cursor.execute('''
+        self.conn.execute('''
         CREATE TABLE IF NOT EXISTS ventas (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             codigo TEXT NOT NULL,
@@ -82,24 +376,608 @@ class Database:
         )
         ''')
 
-        # Crear índices para optimizar consultas
-        self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_fecha_carga ON ventas (fecha_carga)')
-        self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_codigo ON ventas (codigo)')
+        # Manifiesto de libros ya cargados (permite omitir archivos sin cambios)
+        self.conn.execute('''
+        CREATE TABLE IF NOT EXISTS archivos_cargados (
+            ruta TEXT PRIMARY KEY,
+            tamano INTEGER NOT NULL,
+            mtime INTEGER NOT NULL,
+            hash TEXT NOT NULL,
+            fecha_carga TEXT NOT NULL,
+            filas INTEGER NOT NULL,
+            cargado_en TEXT NOT NULL
+        )
+        ''')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS version_esquema (version INTEGER NOT NULL)')
         self.conn.commit()
 
+        self._aplicar_migraciones()
+
+    def _aplicar_migraciones(self):
+        # Cada migración se aplica una sola vez, en orden, dentro de su propia transacción
+        migraciones = [
+            self._migracion_resumen_diario,
+            self._migracion_indice_cobertura,
+            self._migracion_busqueda_texto,
+            self._migracion_registro_cambios,
+            self._migracion_parametros_reposicion,
+            self._migracion_anio_mes,
+            self._migracion_ventas_normalizadas,
+            self._migracion_version_catalogo,
+        ]
+
+        version_actual = self.conn.execute('SELECT MAX(version) FROM version_esquema').fetchone()[0] or 0
+
+        for version, migracion in enumerate(migraciones, start=1):
+            if version <= version_actual:
+                continue
+            self.conn.execute('BEGIN')
+            try:
+                migracion()
+                self.conn.execute('DELETE FROM version_esquema')
+                self.conn.execute('INSERT INTO version_esquema (version) VALUES (?)', (version,))
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
+
+    def version_esquema(self):
+        return self.consultar_valor('SELECT MAX(version) FROM version_esquema') or 0
+
+    def _migracion_resumen_diario(self):
+        # 1: resumen diario por producto (se mantiene en cada carga), poblado desde ventas
+        self.conn.execute('''
+        CREATE TABLE IF NOT EXISTS ventas_diarias (
+            codigo TEXT NOT NULL,
+            fecha TEXT NOT NULL,
+            total INTEGER NOT NULL,
+            PRIMARY KEY (codigo, fecha)
+        ) WITHOUT ROWID
+        ''')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_ventas_diarias_fecha ON ventas_diarias (fecha)')
+        # Con el formato de ventas de esta versión (codigo y fecha_carga en cada línea)
+        self.conn.execute('''
+        INSERT INTO ventas_diarias (codigo, fecha, total)
+        SELECT codigo, fecha_carga, SUM(cantidad)
+        FROM ventas
+        GROUP BY codigo, fecha_carga
+        ''')
+
+    def _migracion_indice_cobertura(self):
+        # 2: índice de cobertura para codigo = ? AND fecha_carga BETWEEN ? AND ? sumando cantidad;
+        # reemplaza a idx_codigo, que es un prefijo suyo
+        self.conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_ventas_codigo_fecha_cantidad
+        ON ventas (codigo, fecha_carga, cantidad)
+        ''')
+        self.conn.execute('DROP INDEX IF EXISTS idx_codigo')
+
+    def _migracion_busqueda_texto(self):
+        # 3: índice FTS5 sobre código/nombre de productos, sincronizado con triggers
+        self.conn.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS productos_fts USING fts5(
+            codigo, nombre,
+            content='productos', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3'
+        )
+        ''')
+        self.conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS productos_fts_ai AFTER INSERT ON productos BEGIN
+            INSERT INTO productos_fts (rowid, codigo, nombre) VALUES (new.id, new.codigo, new.nombre);
+        END
+        ''')
+        self.conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS productos_fts_ad AFTER DELETE ON productos BEGIN
+            INSERT INTO productos_fts (productos_fts, rowid, codigo, nombre)
+            VALUES ('delete', old.id, old.codigo, old.nombre);
+        END
+        ''')
+        self.conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS productos_fts_au AFTER UPDATE OF codigo, nombre ON productos BEGIN
+            INSERT INTO productos_fts (productos_fts, rowid, codigo, nombre)
+            VALUES ('delete', old.id, old.codigo, old.nombre);
+            INSERT INTO productos_fts (rowid, codigo, nombre) VALUES (new.id, new.codigo, new.nombre);
+        END
+        ''')
+        self.conn.execute("INSERT INTO productos_fts (productos_fts) VALUES ('rebuild')")
+
+    def _migracion_registro_cambios(self):
+        # 4: registro de (codigo, fecha) modificados por cada carga; la generación es un
+        # contador creciente que permite a las cachés invalidar solo lo que cambió
+        self.conn.execute('''
+        CREATE TABLE IF NOT EXISTS cambios_ventas (
+            generacion INTEGER NOT NULL,
+            codigo TEXT NOT NULL,
+            fecha TEXT NOT NULL,
+            PRIMARY KEY (generacion, codigo, fecha)
+        ) WITHOUT ROWID
+        ''')
+
+    def _migracion_parametros_reposicion(self):
+        # 5: proveedores con tiempo de entrega y costos por defecto, y columnas en productos
+        # para asignar proveedor y sobrescribir sus parámetros (NULL = heredar)
+        self.conn.execute('''
+        CREATE TABLE IF NOT EXISTS proveedores (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nombre TEXT NOT NULL UNIQUE,
+            tiempo_entrega INTEGER,
+            costo_pedido REAL,
+            costo_almacenamiento REAL
+        )
+        ''')
+        self.conn.execute('ALTER TABLE productos ADD COLUMN proveedor_id INTEGER REFERENCES proveedores (id)')
+        self.conn.execute('ALTER TABLE productos ADD COLUMN tiempo_entrega INTEGER')
+        self.conn.execute('ALTER TABLE productos ADD COLUMN costo_pedido REAL')
+        self.conn.execute('ALTER TABLE productos ADD COLUMN costo_almacenamiento REAL')
+
+    def _migracion_anio_mes(self):
+        # 6: mes AAAA-MM del resumen diario como columna generada e indexada, para listar y
+        # filtrar meses con búsquedas en el índice en lugar de calcular substr(fecha) fila por fila
+        self.conn.execute('''
+        ALTER TABLE ventas_diarias ADD COLUMN anio_mes TEXT
+        GENERATED ALWAYS AS (substr(fecha, 1, 7)) VIRTUAL
+        ''')
+        self.conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_ventas_diarias_codigo_mes ON ventas_diarias (codigo, anio_mes)
+        ''')
+
+    def _migracion_ventas_normalizadas(self):
+        # 7: ventas guarda producto_id y el número de día en lugar de repetir codigo, nombre
+        # y la fecha como texto en cada línea. Los códigos vendidos que no están en productos
+        # se registran como auto_registrado (sin cantidad_por_caja real, no entran en pedidos)
+        self.conn.execute('ALTER TABLE productos ADD COLUMN auto_registrado INTEGER NOT NULL DEFAULT 0')
+        self.conn.execute('''
+        INSERT INTO productos (codigo, nombre, cantidad_por_caja, auto_registrado)
+        SELECT codigo, MAX(nombre), 1, 1
+        FROM ventas
+        WHERE codigo NOT IN (SELECT codigo FROM productos)
+        GROUP BY codigo
+        ''')
+        self.conn.execute('''
+        CREATE TABLE ventas_normalizadas (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            producto_id INTEGER NOT NULL REFERENCES productos (id),
+            fecha INTEGER NOT NULL,
+            cantidad INTEGER NOT NULL
+        )
+        ''')
+        self.conn.execute('''
+        INSERT INTO ventas_normalizadas (id, producto_id, fecha, cantidad)
+        SELECT v.id, p.id, CAST(julianday(v.fecha_carga) - 2440587.5 AS INTEGER), v.cantidad
+        FROM ventas v
+        JOIN productos p ON p.codigo = v.codigo
+        ORDER BY v.id
+        ''')
+        # La tabla anterior se descarta con sus índices (idx_fecha_carga e
+        # idx_ventas_codigo_fecha_cantidad, de la migración 2); idx_ventas_producto_fecha_cantidad
+        # toma el lugar de este último para las lecturas agrupadas por producto y día
+        self.conn.execute('DROP TABLE ventas')
+        self.conn.execute('ALTER TABLE ventas_normalizadas RENAME TO ventas')
+        self.conn.execute('CREATE INDEX idx_ventas_fecha ON ventas (fecha)')
+        self.conn.execute('CREATE INDEX idx_ventas_producto_fecha_cantidad ON ventas (producto_id, fecha, cantidad)')
+
+    def _migracion_version_catalogo(self):
+        # 8: contador que aumenta con cada cambio de productos, proveedores o prioridades,
+        # para que las cachés que dependen del catálogo (no de las ventas) se invaliden
+        self.conn.execute('CREATE TABLE IF NOT EXISTS version_catalogo (version INTEGER NOT NULL)')
+        self.conn.execute('INSERT INTO version_catalogo (version) VALUES (0)')
+
     def ejecutar_consulta(self, query, params=None):
-        if params:
-            self.cursor.execute(query, params)
-        else:
-            self.cursor.execute(query)
-        return self.cursor.fetchall()
+        """Ejecuta una sentencia en una transacción de escritura y devuelve sus filas"""
+        with self.transaccion() as conn:
+            return conn.execute(query, params or ()).fetchall()
 
     def insertar_venta(self, codigo, nombre, cantidad, fecha_carga):
-        self.cursor.execute('''
-        INSERT INTO ventas (codigo, nombre, cantidad, fecha_carga)
-        VALUES (?, ?, ?, ?)
-        ''', (codigo, nombre, cantidad, fecha_carga))
-        self.conn.commit()
+        try:
+            with self.transaccion():
+                codigo = str(codigo)
+                producto_id = self._ids_productos({codigo: nombre})[codigo]
+                self.conn.execute('''
+                INSERT INTO ventas (producto_id, fecha, cantidad)
+                VALUES (?, ?, ?)
+                ''', (producto_id, dia_numero(fecha_carga), cantidad))
+                self._sumar_ventas_diarias([(codigo, fecha_carga, cantidad)])
+                self._registrar_cambios([(codigo, fecha_carga)])
+        except Exception:
+            self._ids_producto = None  # Pudo incluir ids de productos revertidos
+            raise
+
+    def _ids_productos(self, nombres):
+        # nombres: {codigo: nombre}. Devuelve {codigo: id} usando el diccionario en memoria;
+        # los códigos nuevos se registran en productos como auto_registrado. Debe llamarse
+        # dentro de la transacción de escritura (si se revierte, se descarta el diccionario)
+        if self._ids_producto is None:
+            self._ids_producto = dict(self.conn.execute('SELECT codigo, id FROM productos'))
+        nuevos = [codigo for codigo in nombres if codigo not in self._ids_producto]
+        if nuevos:
+            self.conn.executemany('''
+            INSERT INTO productos (codigo, nombre, cantidad_por_caja, auto_registrado)
+            VALUES (?, ?, 1, 1)
+            ON CONFLICT (codigo) DO NOTHING
+            ''', ((codigo, nombres[codigo] or codigo) for codigo in nuevos))
+            # Otra conexión pudo registrarlos antes: se leen los ids de todos los nuevos
+            for inicio in range(0, len(nuevos), 500):
+                grupo = nuevos[inicio:inicio + 500]
+                self._ids_producto.update(self.conn.execute(
+                    f"SELECT codigo, id FROM productos WHERE codigo IN ({', '.join('?' * len(grupo))})", grupo))
+        return self._ids_producto
+
+    def _sumar_ventas_diarias(self, totales):
+        # totales: iterable de (codigo, fecha, total); se suma a lo ya acumulado ese día
+        self.conn.executemany('''
+        INSERT INTO ventas_diarias (codigo, fecha, total)
+        VALUES (?, ?, ?)
+        ON CONFLICT (codigo, fecha) DO UPDATE SET total = total + excluded.total
+        ''', totales)
+
+    def _registrar_cambios(self, cambios):
+        # Debe llamarse dentro de la transacción de escritura (después de algún INSERT/DELETE),
+        # así la nueva generación se calcula con el bloqueo de escritura tomado
+        generacion = self.conn.execute(
+            'SELECT COALESCE(MAX(generacion), 0) + 1 FROM cambios_ventas').fetchone()[0]
+        self.conn.executemany('''
+        INSERT OR IGNORE INTO cambios_ventas (generacion, codigo, fecha) VALUES (?, ?, ?)
+        ''', ((generacion, codigo, fecha) for codigo, fecha in cambios))
+        self.conn.execute('DELETE FROM cambios_ventas WHERE generacion <= ?',
+                          (generacion - RETENER_GENERACIONES,))
+
+    def _registrar_cambio_catalogo(self):
+        # Dentro de la transacción que modifica productos o proveedores
+        self.conn.execute('UPDATE version_catalogo SET version = version + 1')
+
+    def version_catalogo(self):
+        """Contador que aumenta con cada cambio de parámetros, proveedores o prioridades"""
+        return self.consultar_valor('SELECT version FROM version_catalogo')
+
+    def generacion_datos(self):
+        """Contador que aumenta con cada carga que modifica ventas (compartido por todas las conexiones)"""
+        return self.consultar_valor('SELECT COALESCE(MAX(generacion), 0) FROM cambios_ventas')
+
+    def cambios_con_totales(self, generacion):
+        """Lista [(codigo, fecha, total actual)] de lo cambiado después de una generación.
+
+        Devuelve None si el registro ya no cubre esa generación (hay que releer todo).
+        El código '*' indica una reconstrucción completa.
+        """
+        with self.lectura() as conn:
+            with conn:  # Una sola instantánea para el mínimo y los cambios
+                conn.execute('BEGIN')
+                minima = conn.execute('SELECT MIN(generacion) FROM cambios_ventas').fetchone()[0]
+                if minima is None or minima > generacion + 1:
+                    return None
+                return conn.execute(SQL_CAMBIOS_CON_TOTALES, (generacion,)).fetchall()
+
+    def _sincronizar_cache(self):
+        # Invalida solo las entradas afectadas por las cargas posteriores a la última vista
+        generacion = self.generacion_datos()
+        if generacion == self._generacion_cache:
+            return
+
+        minima = self.consultar_valor('SELECT MIN(generacion) FROM cambios_ventas')
+        if minima is None or minima > self._generacion_cache + 1 or generacion < self._generacion_cache:
+            self._cache.limpiar()  # El registro ya no cubre lo que falta (o la base se reemplazó)
+        else:
+            codigos = {codigo for codigo, _ in self.consultar(SQL_CAMBIOS_DESDE, (self._generacion_cache,))}
+            if '*' in codigos:
+                self._cache.limpiar()
+            else:
+                for codigo in codigos:
+                    self._cache.invalidar(codigo)
+        self._generacion_cache = generacion
+
+    def _consulta_cacheada(self, clave, consultar):
+        with self._lock_cache:
+            self._sincronizar_cache()
+            encontrado, valor = self._cache.obtener(clave)
+            generacion = self._generacion_cache
+        if not encontrado:
+            valor = consultar()
+            with self._lock_cache:
+                # Si entretanto se sincronizó otra carga, el valor leído pudo quedar viejo
+                if generacion == self._generacion_cache:
+                    self._cache.guardar(clave, valor)
+        return valor
+
+    def estadisticas_cache(self):
+        """Aciertos, fallos, desalojos e invalidaciones de la caché de consultas por producto"""
+        with self._lock_cache:
+            estadisticas = self._cache.estadisticas()
+            estadisticas['generacion'] = self._generacion_cache
+        return estadisticas
+
+    def reconstruir_ventas_diarias(self):
+        """Recalcula el resumen diario completo a partir de ventas (bases existentes o reparaciones)"""
+        with self.transaccion():
+            self._recalcular_ventas_diarias()
+            self._registrar_cambios([('*', '*')])  # Invalida todas las cachés
+
+    def _recalcular_ventas_diarias(self):
+        self.conn.execute('DELETE FROM ventas_diarias')
+        self.conn.execute(f'INSERT INTO ventas_diarias (codigo, fecha, total) {SQL_RECALCULAR_VENTAS_DIARIAS}')
+
+    def insertar_ventas_bulk(self, dataframe, fecha_carga, archivo=None):
+        """Inserta todas las filas de un DataFrame (Codigo, Nombre, Cantidad) en una sola transacción.
+
+        Si se indica archivo (dict con ruta, tamano, mtime y hash), las ventas de ese día
+        se reemplazan y el manifiesto se actualiza dentro de la misma transacción.
+        Devuelve una tupla (filas_insertadas, filas_por_segundo).
+        """
+        # Tomar las columnas como listas nativas de Python (evita iterrows y tipos numpy)
+        filas = list(zip(
+            dataframe['Codigo'].tolist(),
+            dataframe['Nombre'].tolist(),
+            dataframe['Cantidad'].tolist()
+        ))
+        return self.insertar_ventas_lotes([filas], fecha_carga, archivo)
+
+    def insertar_ventas_lotes(self, lotes, fecha_carga, archivo=None):
+        """Como insertar_ventas_bulk, pero consume un iterable de lotes [(codigo, nombre, cantidad), ...].
+
+        Cada lote se inserta en cuanto llega, así la memoria depende del tamaño del
+        lote y no del archivo. Si el iterable lanza una excepción la transacción se revierte.
+        """
+        inicio = time.perf_counter()
+        total_filas = 0
+        totales = defaultdict(int)
+        dia = dia_numero(fecha_carga)
+
+        try:
+            with self.transaccion():
+                codigos_reemplazados = []
+                if archivo is not None:
+                    self.conn.execute('DELETE FROM ventas WHERE fecha = ?', (dia,))
+                    codigos_reemplazados = [fila[0] for fila in self.conn.execute(
+                        'SELECT codigo FROM ventas_diarias WHERE fecha = ?', (fecha_carga,))]
+                    self.conn.execute('DELETE FROM ventas_diarias WHERE fecha = ?', (fecha_carga,))
+
+                for lote in lotes:
+                    # Los códigos se guardan como texto (un código numérico del Excel llega como int)
+                    lote = [(str(codigo), nombre, cantidad) for codigo, nombre, cantidad in lote]
+                    ids = self._ids_productos({codigo: nombre for codigo, nombre, _ in lote})
+                    self.conn.executemany('''
+                    INSERT INTO ventas (producto_id, fecha, cantidad)
+                    VALUES (?, ?, ?)
+                    ''', [(ids[codigo], dia, cantidad) for codigo, _, cantidad in lote])
+                    for codigo, _, cantidad in lote:
+                        totales[codigo] += cantidad
+                    total_filas += len(lote)
+
+                # Actualizar el resumen diario en la misma transacción
+                self._sumar_ventas_diarias(
+                    (codigo, fecha_carga, total) for codigo, total in totales.items()
+                )
+                self._registrar_cambios(
+                    (codigo, fecha_carga) for codigo in set(codigos_reemplazados).union(totales)
+                )
+
+                if archivo is not None:
+                    self.conn.execute('''
+                    INSERT OR REPLACE INTO archivos_cargados
+                        (ruta, tamano, mtime, hash, fecha_carga, filas, cargado_en)
+                    VALUES (?, ?, ?, ?, ?, ?, datetime('now', 'localtime'))
+                    ''', (archivo['ruta'], archivo['tamano'], archivo['mtime'], archivo['hash'],
+                          fecha_carga, total_filas))
+        except Exception:
+            self._ids_producto = None  # Pudo incluir ids de productos revertidos
+            raise
+
+        duracion = time.perf_counter() - inicio
+        filas_por_segundo = total_filas / duracion if duracion > 0 else float('inf')
+        return total_filas, filas_por_segundo
+
+    def estadisticas_demanda(self):
+        """Días con ventas, total y suma de cuadrados por código, unidos a productos, en una sola pasada.
+
+        Omite los productos auto_registrado (sin cantidad_por_caja real).
+        """
+        return self.consultar(SQL_ESTADISTICAS_DEMANDA)
+
+    def meses_producto(self, codigo):
+        """Meses (AAAA-MM) con ventas de un producto (con caché)"""
+        def consultar():
+            return [row[0] for row in self.consultar(SQL_MESES_PRODUCTO, (codigo,))]
+        return self._consulta_cacheada(('meses', codigo), consultar)
+
+    def ventas_diarias_desde(self, fecha_inicio):
+        """Lista [(codigo, fecha, total)] de todos los productos desde una fecha, para el pronóstico"""
+        return self.consultar(SQL_VENTAS_DIARIAS_DESDE, (fecha_inicio,))
+
+    def ultima_fecha_ventas(self):
+        """Fecha (AAAA-MM-DD) más reciente con ventas, o None si la base está vacía"""
+        return self.consultar_valor(SQL_ULTIMA_FECHA_VENTAS)
+
+    def ventas_del_dia(self, fecha_carga):
+        """Todas las líneas de venta (id, codigo, nombre, cantidad, fecha_carga) de un día"""
+        return self.consultar(SQL_VENTAS_DEL_DIA, (dia_numero(fecha_carga),))
+
+    def paginas_ventas_del_dia(self, fecha_carga, tamano_pagina):
+        """Como ventas_del_dia, pero entrega las filas en listas de tamano_pagina a medida que se piden"""
+        return self._paginar(SQL_VENTAS_DEL_DIA, (dia_numero(fecha_carga),), tamano_pagina)
+
+    def buscar_ventas(self, busqueda, fecha_carga):
+        """Líneas de un día cuyo producto coincide con la búsqueda por palabras/prefijos.
+
+        Coincide si el nombre o código del producto contiene palabras que empiezan por
+        los términos buscados, si el código empieza por el texto o si la cantidad es igual.
+        """
+        return self.consultar(*self._consulta_busqueda_ventas(busqueda, fecha_carga))
+
+    def paginas_busqueda_ventas(self, busqueda, fecha_carga, tamano_pagina):
+        """Como buscar_ventas, pero entrega las filas por páginas"""
+        query, params = self._consulta_busqueda_ventas(busqueda, fecha_carga)
+        return self._paginar(query, params, tamano_pagina)
+
+    def _consulta_busqueda_ventas(self, busqueda, fecha_carga):
+        consulta_fts = self._consulta_fts(busqueda)
+        if consulta_fts is None:
+            return SQL_VENTAS_DEL_DIA, (dia_numero(fecha_carga),)
+
+        busqueda = busqueda.strip()
+        prefijo_codigo = re.sub(r'([\\%_])', r'\\\1', busqueda) + '%'
+        cantidad = int(busqueda) if busqueda.isdecimal() else None  # isdigit acepta "²", que int() no
+        return SQL_BUSCAR_VENTAS, (dia_numero(fecha_carga), consulta_fts, prefijo_codigo, cantidad)
+
+    def _paginar(self, query, params, tamano_pagina):
+        # Una consulta corta por página (id > último id mostrado) que devuelve su conexión
+        # al pool en seguida: una búsqueda recorrida a medias no retiene una transacción
+        # de lectura abierta, y cada página se lee con los datos de ese momento
+        query = query + SQL_PAGINA_POR_ID
+        ultimo_id = 0
+        while True:
+            pagina = self.consultar(query, (*params, ultimo_id, tamano_pagina))
+            if pagina:
+                yield pagina
+            if len(pagina) < tamano_pagina:
+                break
+            ultimo_id = pagina[-1][0]
+
+    def buscar_productos(self, busqueda):
+        """Productos (codigo, nombre, prioridad) cuyo código o nombre coincide por palabras/prefijos"""
+        consulta_fts = self._consulta_fts(busqueda)
+        if consulta_fts is None:
+            return self.consultar(SQL_LISTAR_PRODUCTOS)
+        return self.consultar(SQL_BUSCAR_PRODUCTOS, (consulta_fts,))
+
+    @staticmethod
+    def _consulta_fts(busqueda):
+        # "cafe lingz" -> '"cafe"* "lingz"*' (todas las palabras, cada una como prefijo)
+        terminos = re.findall(r'\w+', busqueda or '')
+        if not terminos:
+            return None
+        return ' '.join(f'"{termino}"*' for termino in terminos)
+
+    def actualizar_prioridad(self, codigo, prioridad):
+        with self.transaccion():
+            self.conn.execute(SQL_ACTUALIZAR_PRIORIDAD, (prioridad, codigo))
+            self._registrar_cambio_catalogo()
+
+    def registrar_productos(self, productos):
+        """Crea o actualiza productos [(codigo, nombre, cantidad_por_caja)] del catálogo.
+
+        Un código que la ingesta había auto_registrado pasa a ser un producto normal.
+        """
+        with self.transaccion():
+            self.conn.executemany('''
+            INSERT INTO productos (codigo, nombre, cantidad_por_caja)
+            VALUES (?, ?, ?)
+            ON CONFLICT (codigo) DO UPDATE SET
+                nombre = excluded.nombre,
+                cantidad_por_caja = excluded.cantidad_por_caja,
+                auto_registrado = 0
+            ''', productos)
+            self._registrar_cambio_catalogo()
+
+    def parametros_reposicion(self):
+        """Lista [(codigo, tiempo_entrega, costo_pedido, costo_almacenamiento)] de todos los productos.
+
+        Cada valor es el del producto o, si no lo tiene, el de su proveedor; None si ninguno lo define.
+        """
+        return self.consultar(SQL_PARAMETROS_REPOSICION)
+
+    @staticmethod
+    def _asignaciones(valores, limpiar):
+        # valores: {columna: valor}; las columnas con None no se tocan y las de limpiar
+        # vuelven a NULL. Devuelve ('col = ?, ...', [valores]) para un UPDATE parcial
+        desconocidas = set(limpiar) - set(valores)
+        if desconocidas:
+            raise ValueError(f"No se puede limpiar: {', '.join(sorted(desconocidas))}")
+        repetidas = [columna for columna in limpiar if valores[columna] is not None]
+        if repetidas:
+            raise ValueError(f"Se pidió asignar y limpiar a la vez: {', '.join(repetidas)}")
+        columnas = [columna for columna, valor in valores.items() if valor is not None or columna in limpiar]
+        return ', '.join(f'{columna} = ?' for columna in columnas), [valores[columna] for columna in columnas]
+
+    def guardar_proveedor(self, nombre, tiempo_entrega=None, costo_pedido=None, costo_almacenamiento=None,
+                          limpiar=()):
+        """Crea o actualiza un proveedor con sus parámetros por defecto y devuelve su id.
+
+        Solo cambian los parámetros pasados; los nombrados en limpiar quedan sin definir.
+        """
+        asignaciones, valores = self._asignaciones({
+            'tiempo_entrega': tiempo_entrega,
+            'costo_pedido': costo_pedido,
+            'costo_almacenamiento': costo_almacenamiento,
+        }, limpiar)
+        with self.transaccion():
+            self.conn.execute('INSERT OR IGNORE INTO proveedores (nombre) VALUES (?)', (nombre,))
+            if asignaciones:
+                self.conn.execute(f'UPDATE proveedores SET {asignaciones} WHERE nombre = ?', valores + [nombre])
+            self._registrar_cambio_catalogo()
+            return self.conn.execute('SELECT id FROM proveedores WHERE nombre = ?', (nombre,)).fetchone()[0]
+
+    def actualizar_parametros_producto(self, codigo, proveedor=None, tiempo_entrega=None,
+                                       costo_pedido=None, costo_almacenamiento=None, limpiar=()):
+        """Asigna proveedor y parámetros propios a un producto.
+
+        Solo cambian los pasados; los nombrados en limpiar ('proveedor', 'tiempo_entrega', ...)
+        vuelven a NULL, es decir, a heredarse. Devuelve False si el código o el proveedor no existen.
+        """
+        with self.transaccion():
+            proveedor_id = None
+            if proveedor is not None:
+                fila = self.conn.execute('SELECT id FROM proveedores WHERE nombre = ?', (proveedor,)).fetchone()
+                if fila is None:
+                    return False
+                proveedor_id = fila[0]
+            asignaciones, valores = self._asignaciones({
+                'proveedor_id': proveedor_id,
+                'tiempo_entrega': tiempo_entrega,
+                'costo_pedido': costo_pedido,
+                'costo_almacenamiento': costo_almacenamiento,
+            }, ['proveedor_id' if campo == 'proveedor' else campo for campo in limpiar])
+            if not asignaciones:
+                return self.conn.execute('SELECT 1 FROM productos WHERE codigo = ?', (codigo,)).fetchone() is not None
+            actualizados = self.conn.execute(f'UPDATE productos SET {asignaciones} WHERE codigo = ?',
+                                             valores + [codigo]).rowcount
+            self._registrar_cambio_catalogo()
+        return actualizados > 0
+
+    def planes_de_consulta(self):
+        """Devuelve {nombre: [detalle, ...]} con el EXPLAIN QUERY PLAN de cada consulta de la app"""
+        consultas = {nombre: (query, params) for nombre, (query, params) in CONSULTAS_INDEXADAS.items()}
+        consultas.update((nombre, (query, params)) for nombre, (query, params, _) in LECTURAS_COMPLETAS.items())
+        planes = {}
+        for nombre, (query, params) in consultas.items():
+            planes[nombre] = [fila[3] for fila in self.consultar(f'EXPLAIN QUERY PLAN {query}', params)]
+        return planes
+
+    def consultas_sin_indice(self):
+        """Consultas de la app cuyo plan recorre una tabla completa (lista vacía = todo indexado).
+
+        En LECTURAS_COMPLETAS solo se admiten los recorridos declarados y ninguna tabla temporal.
+        """
+        sin_indice = []
+        for nombre, detalles in self.planes_de_consulta().items():
+            if nombre in LECTURAS_COMPLETAS:
+                esperados = LECTURAS_COMPLETAS[nombre][2]
+                sin_indice.extend(
+                    (nombre, detalle) for detalle in detalles
+                    if (detalle.startswith('SCAN ') and detalle not in esperados) or 'TEMP B-TREE' in detalle
+                )
+            else:
+                sin_indice.extend(
+                    (nombre, detalle) for detalle in detalles
+                    if detalle.startswith('SCAN ')
+                    and 'CONSTANT ROW' not in detalle
+                    and 'VIRTUAL TABLE' not in detalle
+                )
+        return sin_indice
+
+    def obtener_manifiesto(self):
+        """Devuelve {ruta: (tamano, mtime, hash)} de los libros ya cargados"""
+        filas = self.consultar('SELECT ruta, tamano, mtime, hash FROM archivos_cargados')
+        return {ruta: (tamano, mtime, hash_) for ruta, tamano, mtime, hash_ in filas}
+
+    def actualizar_firma_archivo(self, ruta, tamano, mtime):
+        """Actualiza tamaño/mtime de un libro cuyo contenido no cambió (mismo hash)"""
+        with self.transaccion():
+            self.conn.execute('''
+            UPDATE archivos_cargados SET tamano = ?, mtime = ? WHERE ruta = ?
+            ''', (tamano, mtime, ruta))
 
     def cerrar(self):
+        for conn in self._lectores_abiertos:
+            conn.close()
+        self._lectores_abiertos.clear()
         self.conn.close()
\ No newline at end of file
@@ -0,0 +1,252 @@
+import hashlib
+import importlib.util
+import os
+import re
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from database import Database
+from lector_excel import leer_por_lotes, ColumnasInvalidas
+
+COLUMNAS_VENTAS = ['Codigo', 'Nombre', 'Cantidad']
+
+# Número de procesos que parsean libros en paralelo (None = todos los núcleos)
+WORKERS_POR_DEFECTO = None
+
+# Libros más grandes que esto no pasan por el pool: el escritor los lee por lotes
+UMBRAL_STREAMING = 50 * 1024 * 1024
+
+# Caché Parquet de libros ya parseados (requiere pyarrow; sin él se parsea siempre el Excel)
+CACHE_DISPONIBLE = importlib.util.find_spec('pyarrow') is not None
+
+
+def validar_carpeta_mes(carpeta_mes):
+    """Devuelve (año, mes) a partir del nombre de la carpeta (ej: "ventas/2023-11" -> ('2023', '11'))"""
+    nombre_carpeta = os.path.basename(os.path.normpath(carpeta_mes))
+    if not re.match(r'\d{4}-\d{2}', nombre_carpeta):
+        raise ValueError(f"Formato de carpeta incorrecto ({nombre_carpeta}). Debe ser AAAA-MM")
+    año, mes = nombre_carpeta.split('-')
+    return año, mes
+
+
+def archivos_del_mes(carpeta_mes):
+    """Lista (ruta_archivo, fecha_carga) para cada ventas_DD.xlsx de la carpeta"""
+    año, mes = validar_carpeta_mes(carpeta_mes)
+    archivos = []
+    for archivo in sorted(os.listdir(carpeta_mes)):
+        if archivo.endswith('.xlsx'):
+            # Extraer día del nombre del archivo (ej: "ventas_15.xlsx" -> 15)
+            match = re.search(r'(\d{1,2})\.xlsx$', archivo)
+            if not match:
+                continue
+
+            dia = match.group(1).zfill(2)
+            archivos.append((os.path.join(carpeta_mes, archivo), f"{año}-{mes}-{dia}"))
+    return archivos
+
+
+def leer_libro(ruta_archivo):
+    """Parsea un libro de ventas. Devuelve None si no tiene las columnas requeridas.
+
+    Se ejecuta dentro de los procesos del pool, por eso es una función de módulo.
+    """
+    try:
+        filas = [fila for lote in leer_por_lotes(ruta_archivo, COLUMNAS_VENTAS) for fila in lote]
+    except ColumnasInvalidas:
+        return None
+    return pd.DataFrame.from_records(filas, columns=COLUMNAS_VENTAS)
+
+
+def hash_archivo(ruta_archivo, tamano_bloque=1 << 20):
+    """SHA-256 del contenido del archivo"""
+    h = hashlib.sha256()
+    with open(ruta_archivo, 'rb') as f:
+        for bloque in iter(lambda: f.read(tamano_bloque), b''):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def directorio_cache(db_name):
+    """Carpeta de la caché Parquet, junto a la base de datos"""
+    return os.path.join(os.path.dirname(os.path.abspath(db_name)), '.cache_ventas')
+
+
+def leer_libro_con_cache(ruta_archivo, hash_contenido, directorio):
+    """Como leer_libro, pero usa/guarda una copia Parquet del libro identificada por su hash.
+
+    Una copia ilegible (truncada, de otra versión) se borra y el libro se vuelve a parsear.
+    """
+    ruta_cache = os.path.join(directorio, f"{hash_contenido}.parquet")
+    if os.path.exists(ruta_cache):
+        try:
+            return pd.read_parquet(ruta_cache)
+        except (OSError, ValueError):
+            try:
+                os.remove(ruta_cache)
+            except FileNotFoundError:
+                pass  # Otro proceso ya la borró
+
+    df = leer_libro(ruta_archivo)
+    if df is not None:
+        os.makedirs(directorio, exist_ok=True)
+        temporal = f"{ruta_cache}.{os.getpid()}.tmp"
+        try:
+            df.to_parquet(temporal, index=False)
+            os.replace(temporal, ruta_cache)
+        except (ValueError, TypeError):
+            pass  # Sin caché para este libro: pyarrow no convierte la columna (ej: tipos mezclados)
+        finally:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+    return df
+
+
+def _procesar_archivo(ruta_archivo, hash_conocido, directorio=None):
+    # Calcula el hash en el proceso hijo y solo parsea si el contenido cambió
+    hash_actual = hash_archivo(ruta_archivo)
+    if hash_actual == hash_conocido:
+        return hash_actual, None, True
+    if directorio is not None:
+        return hash_actual, leer_libro_con_cache(ruta_archivo, hash_actual, directorio), False
+    return hash_actual, leer_libro(ruta_archivo), False
+
+
+def _escritor(db, cola, resultado):
+    # Único hilo que escribe en la carga: consume la cola (fecha_carga, DataFrame o None
+    # para leer por lotes, archivo del manifiesto) con la conexión de escritura de db.
+    # Tras un error la cola se sigue vaciando hasta el None final, para que el productor
+    # nunca se bloquee en cola.put
+    while True:
+        item = cola.get()
+        if item is None:
+            break
+        if 'error' in resultado:
+            continue
+
+        fecha_carga, df, archivo = item
+        try:
+            if fecha_carga is None:
+                # Contenido sin cambios: solo se actualiza tamaño/mtime en el manifiesto
+                db.actualizar_firma_archivo(archivo['ruta'], archivo['tamano'], archivo['mtime'])
+                continue
+            if df is None:
+                # Libro grande: leerlo por lotes directamente hacia la base de datos
+                lotes = leer_por_lotes(archivo['ruta'], COLUMNAS_VENTAS)
+                filas, _ = db.insertar_ventas_lotes(lotes, fecha_carga, archivo=archivo)
+            else:
+                filas, _ = db.insertar_ventas_bulk(df, fecha_carga, archivo=archivo)
+            resultado['filas'] += filas
+            resultado['archivos'] += 1
+        except ColumnasInvalidas:
+            continue  # Igual que en el pool: el libro sin columnas requeridas se omite
+        except Exception as e:
+            resultado['error'] = e
+
+
+def cargar_meses(db, carpetas_mes, workers=WORKERS_POR_DEFECTO, progreso=None, cancelado=None,
+                 usar_cache=True):
+    """Carga una o varias carpetas AAAA-MM parseando los libros en un pool de procesos.
+
+    Solo se parsean los libros nuevos o modificados según el manifiesto
+    (ruta, tamaño, mtime y hash); un libro modificado reemplaza las ventas de su día.
+    Los DataFrames se envían a un único hilo escritor, que escribe con la conexión de
+    escritura de db. db es la Database de la aplicación (así la carga se serializa con
+    sus demás escrituras) o la ruta de una base, que se abre y se cierra aquí.
+
+    Con usar_cache (y pyarrow instalado) cada libro parseado se guarda en Parquet según
+    su hash, y al recargarlo en otra base se lee esa copia en lugar del Excel.
+
+    progreso(hechos, total, mensaje) se llama tras cada libro; si cancelado() devuelve
+    True se descartan los libros pendientes (los ya escritos quedan en el manifiesto).
+    Devuelve un dict con archivos, omitidos, filas, cancelado, duracion y filas_por_segundo.
+    """
+    inicio = time.perf_counter()
+    resultado = {'archivos': 0, 'omitidos': 0, 'filas': 0, 'cancelado': False}
+
+    propia = not isinstance(db, Database)
+    if propia:
+        db = Database(db)
+    try:
+        manifiesto = db.obtener_manifiesto()
+
+        # Descartar sin abrirlos los libros cuyo tamaño y mtime no cambiaron
+        pendientes = []
+        grandes = []
+        for carpeta_mes in carpetas_mes:
+            for ruta, fecha_carga in archivos_del_mes(carpeta_mes):
+                ruta = os.path.abspath(ruta)
+                estado = os.stat(ruta)
+                anterior = manifiesto.get(ruta)
+                if anterior and anterior[0] == estado.st_size and anterior[1] == estado.st_mtime_ns:
+                    resultado['omitidos'] += 1
+                    continue
+                archivo = {'ruta': ruta, 'tamano': estado.st_size, 'mtime': estado.st_mtime_ns}
+                if estado.st_size > UMBRAL_STREAMING:
+                    grandes.append((archivo, fecha_carga, anterior[2] if anterior else None))
+                else:
+                    pendientes.append((archivo, fecha_carga, anterior[2] if anterior else None))
+
+        if pendientes or grandes:
+            workers = workers or os.cpu_count() or 1
+            cola = queue.Queue(maxsize=workers * 2)
+            hilo_escritor = threading.Thread(target=_escritor, args=(db, cola, resultado), daemon=True)
+            hilo_escritor.start()
+
+            try:
+                directorio = directorio_cache(db.db_name) if usar_cache and CACHE_DISPONIBLE else None
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    futuros = {
+                        pool.submit(_procesar_archivo, archivo['ruta'], hash_conocido, directorio): (archivo, fecha_carga)
+                        for archivo, fecha_carga, hash_conocido in pendientes
+                    }
+
+                    # Mientras el pool parsea, los libros grandes se hashean aquí y el escritor los lee por lotes
+                    for hechos, (archivo, fecha_carga, hash_conocido) in enumerate(grandes, start=1):
+                        if cancelado is not None and cancelado():
+                            resultado['cancelado'] = True
+                            break
+                        archivo['hash'] = hash_archivo(archivo['ruta'])
+                        if archivo['hash'] == hash_conocido:
+                            cola.put((None, None, archivo))
+                            resultado['omitidos'] += 1
+                        else:
+                            cola.put((fecha_carga, None, archivo))
+                        if progreso is not None:
+                            progreso(hechos, len(grandes) + len(pendientes), os.path.basename(archivo['ruta']))
+
+                    for hechos, futuro in enumerate(as_completed(futuros), start=len(grandes) + 1):
+                        if resultado['cancelado'] or (cancelado is not None and cancelado()):
+                            for pendiente in futuros:
+                                pendiente.cancel()
+                            resultado['cancelado'] = True
+                            break
+
+                        archivo, fecha_carga = futuros[futuro]
+                        archivo['hash'], df, sin_cambios = futuro.result()
+                        if sin_cambios:
+                            # Solo cambió el mtime (ej: copiado de nuevo): actualizar la firma
+                            cola.put((None, None, archivo))
+                            resultado['omitidos'] += 1
+                        elif df is not None:
+                            cola.put((fecha_carga, df, archivo))
+
+                        if progreso is not None:
+                            progreso(hechos, len(grandes) + len(futuros), os.path.basename(archivo['ruta']))
+            finally:
+                cola.put(None)
+                hilo_escritor.join()
+    finally:
+        if propia:
+            db.cerrar()
+
+    if 'error' in resultado:
+        raise resultado['error']
+
+    duracion = time.perf_counter() - inicio
+    resultado['duracion'] = duracion
+    resultado['filas_por_segundo'] = resultado['filas'] / duracion if duracion > 0 else 0
+    return resultado
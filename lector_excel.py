@@ -0,0 +1,41 @@
+import openpyxl
+
+# Filas por lote al leer libros grandes
+TAMANO_LOTE = 50_000
+
+
+class ColumnasInvalidas(ValueError):
+    pass
+
+
+def leer_por_lotes(ruta_archivo, columnas, tamano_lote=TAMANO_LOTE):
+    """Lee la primera hoja de un .xlsx en modo streaming y entrega lotes de tuplas.
+
+    El encabezado (primera fila) se valida una sola vez: si falta alguna de las
+    columnas se lanza ColumnasInvalidas al pedir el primer lote. Cada tupla trae
+    los valores en el orden de `columnas`; las filas vacías se omiten. La memoria
+    usada depende de tamano_lote, no del tamaño del archivo.
+    """
+    wb = openpyxl.load_workbook(ruta_archivo, read_only=True, data_only=True)
+    try:
+        filas = wb.worksheets[0].iter_rows(values_only=True)
+
+        encabezado = list(next(filas, None) or ())
+        faltantes = [col for col in columnas if col not in encabezado]
+        if faltantes:
+            raise ColumnasInvalidas(f"Faltan las columnas {', '.join(faltantes)} en {ruta_archivo}")
+        indices = [encabezado.index(col) for col in columnas]
+
+        lote = []
+        for fila in filas:
+            valores = tuple(fila[i] if i < len(fila) else None for i in indices)
+            if all(valor is None for valor in valores):
+                continue
+            lote.append(valores)
+            if len(lote) >= tamano_lote:
+                yield lote
+                lote = []
+        if lote:
+            yield lote
+    finally:
+        wb.close()
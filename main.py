@@ -1,18 +1,24 @@
 import os
-import openpyxl
-import pandas as pd
 import tkinter as tk
 from tkinter import Tk, ttk, Frame, Label, Button, Entry, messagebox, filedialog, BooleanVar, Checkbutton, StringVar, Radiobutton
 from tkcalendar import DateEntry
 from database import Database
+from trabajos import TrabajadorBD
+from almacen_series import AlmacenSeries
+from ingesta import cargar_meses, WORKERS_POR_DEFECTO
+from pedidos import (leer_inventario, calcular_recomendaciones, pedidos_a_realizar,
+                     rellenar_plantilla, nombre_orden_por_defecto, HOJA_POR_DEFECTO,
+                     leer_inventarios, calcular_recomendaciones_sucursales, rellenar_plantilla_sucursales,
+                     hojas_plantilla, hoja_de_inventario, rutas_por_hoja)
 from datetime import datetime
 import matplotlib.pyplot as plt 
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import matplotlib.dates as mdates
-from math import sqrt, ceil
-import re
 import numpy as np
 
+# Filas de la tabla principal que se leen e insertan de una vez
+TAMANO_PAGINA = 500
+
 
 class AppVentas:
     def __init__(self, root):
@@ -20,6 +26,11 @@ class AppVentas:
         self.root.title("Gestión de Ventas")
         self.root.geometry("1500x800")
         self.db = Database()
+        self.trabajador = TrabajadorBD(self.root, self.db)
+        # Series diarias por producto en memoria para gráficos y pedidos; se pone al día en segundo plano
+        self.almacen = AlmacenSeries(self.db.db_name)
+        self.trabajador.enviar(lambda db, trabajo: self.almacen.actualizar(db))
+        self.workers_carga = WORKERS_POR_DEFECTO
         self._crear_interfaz()
 
     def _crear_interfaz(self):
@@ -63,6 +74,10 @@ class AppVentas:
         self.btn_cargar_inventario = Button(frame_controles, text="Cargar Inventario y Calcular Pedidos", command=self.cargar_inventario_y_calcular_pedidos)
         self.btn_cargar_inventario.pack(side="left", padx=10)
 
+        # Botón para generar la orden de varias sucursales en una sola plantilla
+        self.btn_orden_sucursales = Button(frame_controles, text="Orden Multi-sucursal", command=self.generar_orden_sucursales)
+        self.btn_orden_sucursales.pack(side="left", padx=10)
+
         # Tabla para mostrar los datos
         self.frame_tabla = Frame(self.root)
         self.frame_tabla.pack(fill="both", expand=True, padx=10, pady=10)
@@ -77,7 +92,21 @@ class AppVentas:
         # Barra de desplazamiento
         self.scrollbar = ttk.Scrollbar(self.frame_tabla, orient="vertical", command=self.tabla.yview)
         self.scrollbar.pack(side="right", fill="y")
-        self.tabla.configure(yscrollcommand=self.scrollbar.set)
+        self.tabla.configure(yscrollcommand=self._al_desplazar_tabla)
+
+        # Las filas se cargan por páginas a medida que el usuario se desplaza
+        self._paginas_tabla = None
+
+        # Barra de estado para trabajos en segundo plano
+        frame_progreso = Frame(self.root)
+        frame_progreso.pack(fill="x", padx=10, pady=(0, 10))
+        self.barra_progreso = ttk.Progressbar(frame_progreso, orient="horizontal", length=300, mode="determinate")
+        self.barra_progreso.pack(side="left")
+        self.label_progreso = Label(frame_progreso, text="")
+        self.label_progreso.pack(side="left", padx=10)
+        self.btn_cancelar = Button(frame_progreso, text="Cancelar", command=self.cancelar_trabajo, state="disabled")
+        self.btn_cancelar.pack(side="left")
+        self._trabajo_actual = None
 
         # Boton de cambio de prioridad
         self.btn_prioridades = Button(frame_controles, text="Gestionar Prioridades", command=self.gestionar_prioridades,)
@@ -100,91 +129,98 @@ class AppVentas:
         if not carpeta_mes:
             return
 
-        try:
-            # Extraer año y mes del nombre de la carpeta (ej: "ventas/2023-11" -> 2023-11)
-            nombre_carpeta = os.path.basename(carpeta_mes)
-            if not re.match(r'\d{4}-\d{2}', nombre_carpeta):
-                raise ValueError("Formato de carpeta incorrecto. Debe ser AAAA-MM")
-
-            año, mes = nombre_carpeta.split('-')
-            
-            # Procesar cada archivo Excel en la carpeta
-            archivos_procesados = 0
-            for archivo in os.listdir(carpeta_mes):
-                if archivo.endswith('.xlsx'):
-                    # Extraer día del nombre del archivo (ej: "ventas_15.xlsx" -> 15)
-                    match = re.search(r'(\d{1,2})\.xlsx$', archivo)
-                    if not match:
-                        continue
-                    
-                    dia = match.group(1).zfill(2)
-                    fecha_carga = f"{año}-{mes}-{dia}"
-                    ruta_archivo = os.path.join(carpeta_mes, archivo)
-
-                    # Procesar el archivo Excel
-                    df = pd.read_excel(ruta_archivo)
-                    
-                    # Verificar columnas requeridas
-                    if not all(col in df.columns for col in ['Codigo', 'Nombre', 'Cantidad']):
-                        continue
-
-                    # Insertar datos en la base de datos
-                    for _, row in df.iterrows():
-                        self.db.cursor.execute('''
-                        INSERT INTO ventas (codigo, nombre, cantidad, fecha_carga)
-                        VALUES (?, ?, ?, ?)
-                        ''', (row['Codigo'], row['Nombre'], row['Cantidad'], fecha_carga))
-                    
-                    archivos_procesados += 1
-
-            self.db.conn.commit()
-            messagebox.showinfo("Éxito", 
-                f"Procesados {archivos_procesados} archivos de {nombre_carpeta}")
+        nombre_carpeta = os.path.basename(carpeta_mes)
+
+        # Parsear los libros en paralelo y escribirlos fuera del hilo de la interfaz
+        def cargar(db, trabajo):
+            resultado = cargar_meses(db, [carpeta_mes], workers=self.workers_carga,
+                                     progreso=trabajo.reportar_progreso, cancelado=trabajo.cancelado)
+            self.almacen.actualizar(db)
+            return resultado
+
+        def al_terminar(resultado):
+            self._finalizar_trabajo()
+            estado = "Carga cancelada" if resultado['cancelado'] else "Éxito"
+            messagebox.showinfo(estado, 
+                f"Procesados {resultado['archivos']} archivos de {nombre_carpeta} "
+                f"({resultado['omitidos']} sin cambios)\n"
+                f"{resultado['filas']} filas en {resultado['duracion']:.2f} s "
+                f"({resultado['filas_por_segundo']:,.0f} filas/s)")
             self.actualizar_tabla()
 
-        except Exception as e:
+        def al_error(e):
+            self._finalizar_trabajo()
             messagebox.showerror("Error", f"Error al procesar archivos: {str(e)}")
 
-    def actualizar_tabla(self):
-        # Limpiar la tabla actual
-        for row in self.tabla.get_children():
-            self.tabla.delete(row)
+        trabajo = self.trabajador.enviar(cargar, al_terminar=al_terminar, al_error=al_error,
+                                         al_progreso=self._actualizar_progreso, al_cancelar=self._finalizar_trabajo)
+        self._iniciar_trabajo(trabajo, f"Cargando {nombre_carpeta}...")
+
+    def _iniciar_trabajo(self, trabajo, mensaje):
+        self._trabajo_actual = trabajo
+        self.barra_progreso.configure(value=0)
+        self.label_progreso.configure(text=mensaje)
+        self.btn_cancelar.configure(state="normal")
 
+    def _actualizar_progreso(self, hechos, total, mensaje=''):
+        self.barra_progreso.configure(maximum=max(total, 1), value=hechos)
+        self.label_progreso.configure(text=f"{hechos}/{total} {mensaje}")
+
+    def _finalizar_trabajo(self):
+        self._trabajo_actual = None
+        self.barra_progreso.configure(value=0)
+        self.label_progreso.configure(text="")
+        self.btn_cancelar.configure(state="disabled")
+
+    def cancelar_trabajo(self):
+        if self._trabajo_actual is not None:
+            self._trabajo_actual.cancelar()
+            self.label_progreso.configure(text="Cancelando...")
+
+    def actualizar_tabla(self):
         # Obtener la fecha seleccionada
         fecha_seleccionada = self.cal_fecha.get_date().strftime("%Y-%m-%d")
 
-        # Obtener los datos de la base de datos para la fecha seleccionada
-        self.db.cursor.execute('''
-        SELECT * FROM ventas WHERE fecha_carga = ?
-        ''', (fecha_seleccionada,))
-        rows = self.db.cursor.fetchall()
-
-        # Insertar los datos en la tabla
-        for row in rows:
-            self.tabla.insert("", "end", values=row)
+        # Obtener los datos de la base de datos para la fecha seleccionada (por páginas)
+        self._mostrar_paginas(self.db.paginas_ventas_del_dia(fecha_seleccionada, TAMANO_PAGINA))
 
     def buscar_datos(self):
         # Obtener el valor de búsqueda
         busqueda = self.entry_busqueda.get()
 
-        # Limpiar la tabla actual
-        for row in self.tabla.get_children():
-            self.tabla.delete(row)
-
         # Obtener la fecha seleccionada
         fecha_seleccionada = self.cal_fecha.get_date().strftime("%Y-%m-%d")
 
-        # Buscar en la base de datos para la fecha seleccionada
-        self.db.cursor.execute('''
-        SELECT * FROM ventas 
-        WHERE (codigo LIKE ? OR nombre LIKE ? OR cantidad LIKE ?) AND fecha_carga = ?
-        ''', (f"%{busqueda}%", f"%{busqueda}%", f"%{busqueda}%", fecha_seleccionada))
-        rows = self.db.cursor.fetchall()
+        # Buscar en la base de datos para la fecha seleccionada (por páginas)
+        self._mostrar_paginas(self.db.paginas_busqueda_ventas(busqueda, fecha_seleccionada, TAMANO_PAGINA))
 
-        # Insertar los resultados en la tabla
-        for row in rows:
+    def _mostrar_paginas(self, paginas):
+        # Limpiar la tabla actual en una sola llamada
+        if self._paginas_tabla is not None:
+            self._paginas_tabla.close()
+        self.tabla.delete(*self.tabla.get_children())
+        self.tabla.yview_moveto(0)
+
+        # Insertar solo la primera página; el resto se pide al desplazarse
+        self._paginas_tabla = paginas
+        self._cargar_siguiente_pagina()
+
+    def _cargar_siguiente_pagina(self):
+        if self._paginas_tabla is None:
+            return
+        pagina = next(self._paginas_tabla, None)
+        if pagina is None:
+            self._paginas_tabla = None
+            return
+        for row in pagina:
             self.tabla.insert("", "end", values=row)
 
+    def _al_desplazar_tabla(self, primero, ultimo):
+        self.scrollbar.set(primero, ultimo)
+        # Cerca del final de lo cargado (o la página no llena la vista): pedir la siguiente
+        if self._paginas_tabla is not None and float(ultimo) >= 0.9:
+            self.tabla.after_idle(self._cargar_siguiente_pagina)
+
     def abrir_ventana_grafico(self):
         # Crear una nueva ventana para seleccionar el rango de fechas
         ventana_rango_fechas = tk.Toplevel(self.root)
@@ -219,16 +255,18 @@ class AppVentas:
                 messagebox.showerror("Error", "Por favor, ingresa el nombre del producto.")
                 return
 
-            # Consultar las ventas del producto en el rango de fechas seleccionado
-            self.db.cursor.execute('''
-            SELECT fecha_carga, SUM(cantidad) as total_cantidad
-            FROM ventas
-            WHERE codigo = ? AND fecha_carga BETWEEN ? AND ?
-            GROUP BY fecha_carga
-            ORDER BY fecha_carga
-            ''', (producto, fecha_inicio, fecha_fin))
-            ventas_rango = self.db.cursor.fetchall()
+            # Cortar las ventas del producto en el rango desde la matriz de series (en segundo plano)
+            def consultar_rango(db, trabajo):
+                self.almacen.actualizar(db)
+                return self.almacen.serie(producto, fecha_inicio, fecha_fin)
+
+            self.trabajador.enviar(
+                consultar_rango,
+                al_terminar=lambda ventas_rango: dibujar_grafico(producto, fecha_inicio, fecha_fin, ventas_rango),
+                al_error=lambda e: messagebox.showerror("Error", f"Error al consultar ventas: {str(e)}")
+            )
 
+        def dibujar_grafico(producto, fecha_inicio, fecha_fin, ventas_rango):
             if not ventas_rango:
                 messagebox.showinfo("Información", f"No hay datos de ventas para el producto: {producto} en el rango de fechas seleccionado.")
                 return
@@ -268,37 +306,34 @@ class AppVentas:
         ventana_rango_fechas.mainloop()
 
     def generar_grafico_comparativo_meses(self):
-        # Crear ventana para selección de meses (usando Toplevel en lugar de Tk)
-        ventana_seleccion_meses = tk.Toplevel(self.root)
-        ventana_seleccion_meses.title("Selección de Meses para Comparación")
-        ventana_seleccion_meses.geometry("400x400")
-        
         # Obtener el nombre del producto a analizar
         producto = self.entry_producto.get()
-        
+
         if not producto:
             messagebox.showerror("Error", "Por favor, ingresa el nombre del producto.")
-            ventana_seleccion_meses.destroy()
             return
-        
-        # Frame para los checkboxes de meses
-        frame_meses = tk.Frame(ventana_seleccion_meses)
-        frame_meses.pack(pady=10)
-        
-        # Obtener todos los meses disponibles para el producto
-        self.db.cursor.execute('''
-        SELECT DISTINCT strftime('%Y-%m', fecha_carga) as mes
-        FROM ventas
-        WHERE codigo = ?
-        ORDER BY mes
-        ''', (producto,))
-        meses_disponibles = [row[0] for row in self.db.cursor.fetchall()]
-        
+
+        # Meses disponibles del producto (índice codigo, anio_mes de ventas_diarias), en segundo plano
+        self.trabajador.enviar(
+            lambda db, trabajo: db.meses_producto(producto),
+            al_terminar=lambda meses: self._seleccionar_meses_comparacion(producto, meses),
+            al_error=lambda e: messagebox.showerror("Error", f"Error al consultar meses: {str(e)}")
+        )
+
+    def _seleccionar_meses_comparacion(self, producto, meses_disponibles):
         if not meses_disponibles:
             messagebox.showinfo("Información", f"No hay datos de ventas para el producto: {producto}.")
-            ventana_seleccion_meses.destroy()
             return
-        
+
+        # Crear ventana para selección de meses (usando Toplevel en lugar de Tk)
+        ventana_seleccion_meses = tk.Toplevel(self.root)
+        ventana_seleccion_meses.title("Selección de Meses para Comparación")
+        ventana_seleccion_meses.geometry("400x400")
+
+        # Frame para los checkboxes de meses
+        frame_meses = tk.Frame(ventana_seleccion_meses)
+        frame_meses.pack(pady=10)
+
         # Variables para los checkboxes (como atributo de la ventana)
         ventana_seleccion_meses.vars_meses = {mes: tk.BooleanVar(value=False) for mes in meses_disponibles}
 
@@ -337,74 +372,34 @@ class AppVentas:
                 messagebox.showerror("Error", "Selecciona al menos 2 meses para comparar.")
                 return
             
-            # Resto del código permanece igual...
-            # [Aquí iría el resto de tu función generar_comparacion()]
-            
             # Obtener año de referencia si se especificó
             anio_referencia = entry_anio.get().strip()
-            
-            # Consultar datos para cada mes seleccionado
-            datos_meses = {}
-            
-            for mes in meses_seleccionados:
-                # Construir rango de fechas (todo el mes)
-                fecha_inicio = f"{mes}-01"
-                
-                # Calcular fecha fin (versión simplificada)
-                if anio_referencia:
-                    mes_num = mes.split('-')[1]
-                    fecha_inicio = f"{anio_referencia}-{mes_num}-01"
-
-                def es_bisiesto(year):
-                    """Determina si un año es bisiesto"""
-                    return year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
-                
-                year, month = map(int, fecha_inicio.split('-')[:2])
-                
-                # Determinar último día del mes
-                if month == 2:  # Febrero
-                    last_day = 29 if es_bisiesto(year) else 28
-                elif month in [4, 6, 9, 11]:  # Abril, Junio, Septiembre, Noviembre
-                    last_day = 30
-                else:  # Resto de meses
-                    last_day = 31
-                
-                fecha_fin = f"{year}-{month:02d}-{last_day:02d}"
-                
-                # Consultar datos
-                self.db.cursor.execute('''
-                SELECT fecha_carga, SUM(cantidad) as total_cantidad
-                FROM ventas
-                WHERE codigo = ? AND fecha_carga BETWEEN ? AND ?
-                GROUP BY fecha_carga
-                ORDER BY fecha_carga
-                ''', (producto, fecha_inicio, fecha_fin))
-                
-                ventas_mes = self.db.cursor.fetchall()
-                
-                if ventas_mes:
-                    # Normalizar fechas para que todas aparezcan como si fueran del mismo año
-                    fechas = []
-                    cantidades = []
-                    
-                    for venta in ventas_mes:
-                        fecha = venta[0]
-                        cantidad = venta[1]
-                        
-                        # Si hay año de referencia, cambiar el año en las fechas
-                        if anio_referencia:
-                            # Mantener mes y día original, cambiar año
-                            fecha_obj = datetime.datetime.strptime(fecha, "%Y-%m-%d")
-                            fecha_normalizada = fecha_obj.replace(year=int(anio_referencia)).strftime("%Y-%m-%d")
-                        else:
-                            # Usar fecha original
-                            fecha_normalizada = fecha
-                        
-                        fechas.append(fecha_normalizada)
-                        cantidades.append(cantidad)
-                    
-                    datos_meses[mes] = (fechas, cantidades)
-            
+            if anio_referencia and not (anio_referencia.isdigit() and len(anio_referencia) == 4):
+                messagebox.showerror("Error", "El año de referencia debe tener 4 dígitos (ej: 2024).")
+                return
+
+            # Con año de referencia, cada mes seleccionado se toma de ese año
+            meses_consulta = [
+                f"{anio_referencia}-{mes.split('-')[1]}" if anio_referencia else mes
+                for mes in meses_seleccionados
+            ]
+
+            # Todos los meses se cortan de la matriz de series (en segundo plano), como meses x 31
+            def consultar_meses(db, trabajo):
+                self.almacen.actualizar(db)
+                return self.almacen.matriz_meses(producto, meses_consulta)
+
+            self.trabajador.enviar(
+                consultar_meses,
+                al_terminar=lambda matriz: dibujar_comparacion(meses_seleccionados, matriz, anio_referencia),
+                al_error=lambda e: messagebox.showerror("Error", f"Error al consultar ventas: {str(e)}")
+            )
+
+        def dibujar_comparacion(meses_seleccionados, matriz, anio_referencia):
+            # Meses seleccionados con al menos un día con ventas
+            con_datos = ~np.isnan(matriz).all(axis=1)
+            datos_meses = {mes: fila for mes, fila, hay in zip(meses_seleccionados, matriz, con_datos) if hay}
+
             if not datos_meses:
                 messagebox.showinfo("Información", "No hay datos para los meses seleccionados.")
                 ventana_seleccion_meses.destroy()
@@ -421,12 +416,11 @@ class AppVentas:
             # Generar colores distintos para cada mes
             colors = plt.cm.tab10(np.linspace(0, 1, len(datos_meses)))
             
-            # Graficar cada mes
-            for (mes, color), (fechas, cantidades) in zip(zip(datos_meses.keys(), colors), datos_meses.values()):
-                # Extraer días del mes (1-31)
-                dias = [int(f.split('-')[2]) for f in fechas]
+            # Graficar cada mes (días 1-31 con ventas)
+            for (mes, fila), color in zip(datos_meses.items(), colors):
+                dias = np.flatnonzero(~np.isnan(fila)) + 1
                 
-                ax.plot(dias, cantidades, 'o-', color=color, label=mes, markersize=8)
+                ax.plot(dias, fila[dias - 1], 'o-', color=color, label=mes, markersize=8)
             
             # Configurar el gráfico
             titulo = f"Comparativo de Ventas - {producto}"
@@ -483,15 +477,37 @@ class AppVentas:
             if not archivo:
                 return
 
-            # Leer el archivo de Excel
-            df = pd.read_excel(archivo)
+            # Leer el inventario y calcular en segundo plano
+            def calcular(db, trabajo):
+                trabajo.reportar_progreso(0, 2, "Leyendo inventario...")
+                df = leer_inventario(archivo)
+                trabajo.verificar_cancelacion()
+                trabajo.reportar_progreso(1, 2, "Calculando recomendaciones...")
+                recomendaciones = calcular_recomendaciones(db, df, self.almacen)
+                trabajo.reportar_progreso(2, 2, "Listo")
+                return recomendaciones
+
+            def al_terminar(recomendaciones):
+                self._finalizar_trabajo()
+                self._mostrar_recomendaciones(recomendaciones)
+
+            def al_error(e):
+                self._finalizar_trabajo()
+                if isinstance(e, ValueError):
+                    messagebox.showerror("Error", str(e))  # Columnas requeridas faltantes
+                else:
+                    messagebox.showerror("Error", f"Error al procesar inventario: {str(e)}")
+
+            trabajo = self.trabajador.enviar(calcular, al_terminar=al_terminar, al_error=al_error,
+                                             al_progreso=self._actualizar_progreso,
+                                             al_cancelar=self._finalizar_trabajo)
+            self._iniciar_trabajo(trabajo, "Calculando pedidos...")
 
-            # Verificar columnas requeridas
-            columnas_requeridas = ['codigo', 'nombre', 'cantidad']
-            if not all(col in df.columns for col in columnas_requeridas):
-                messagebox.showerror("Error", "El archivo de Excel no tiene las columnas requeridas.")
-                return
+        except Exception as e:
+            messagebox.showerror("Error", f"Error al procesar inventario: {str(e)}")
 
+    def _mostrar_recomendaciones(self, recomendaciones):
+        try:
             # Crear ventana para recomendaciones
             ventana_recomendaciones = tk.Toplevel(self.root)
             ventana_recomendaciones.title("Recomendaciones de Pedidos")
@@ -499,84 +515,28 @@ class AppVentas:
 
             # Crear tabla de recomendaciones
             columnas = ("Producto", "Inventario Actual", "Demanda Promedio Diaria", 
-                    "Punto de Reorden", "Cantidad a Pedir (EOQ)", "Cajas a Pedir")
+                    "Stock de Seguridad", "Punto de Reorden", "Cantidad a Pedir (EOQ)", "Cajas a Pedir")
             tabla_recomendaciones = ttk.Treeview(ventana_recomendaciones, columns=columnas, show="headings")
             for col in columnas:
                 tabla_recomendaciones.heading(col, text=col)
             tabla_recomendaciones.pack(fill="both", expand=True)
 
-            # Parámetros configurables
-            TIEMPO_ENTREGA = 5
-            COSTO_PEDIDO = 30
-            COSTO_ALMACENAMIENTO = 69
-            BUFFER_PRIORIDAD = {
-                'alta': 1.2,   # 20% sobre el punto de reorden
-                'media': 1.1,  # 10% sobre el punto de reorden
-                'baja': 1.0    # Sin buffer
-            }
-
-            # Procesar cada producto
-            for index, row in df.iterrows():
-                codigo = row['codigo']
-                nombre = row['nombre']
-                inventario_actual = row['cantidad']
-
-                # Obtener datos del producto
-                self.db.cursor.execute('''
-                SELECT cantidad_por_caja, prioridad FROM productos WHERE codigo = ?
-                ''', (codigo,))
-                resultado = self.db.cursor.fetchone()
-                
-                if not resultado:
-                    continue  # Si no existe en productos, saltar
-                    
-                cantidad_por_caja, prioridad = resultado
-                prioridad = prioridad.lower() if prioridad else 'baja'
-
-                # Obtener ventas históricas
-                self.db.cursor.execute('''
-                SELECT SUM(cantidad) FROM ventas WHERE codigo = ?
-                GROUP BY fecha_carga
-                ''', (codigo,))
-                ventas = [v[0] for v in self.db.cursor.fetchall()]
-                
-                if not ventas:
-                    continue
-
-                # Cálculos principales
-                demanda_diaria = sum(ventas) / len(ventas)
-                punto_reorden = demanda_diaria * TIEMPO_ENTREGA
-                eoq = sqrt((2 * demanda_diaria * 365 * COSTO_PEDIDO) / COSTO_ALMACENAMIENTO)
-                
-                # Aplicar buffer según prioridad
-                buffer = BUFFER_PRIORIDAD.get(prioridad, 1.0)
-                punto_efectivo = punto_reorden * buffer
-
-                # Calcular cajas a pedir
-                cajas_a_pedir = 0
-                if inventario_actual < punto_efectivo:
-                    if inventario_actual < punto_reorden:
-                        cantidad_necesaria = (punto_reorden - inventario_actual) + eoq
-                    else:
-                        cantidad_necesaria = eoq
-                    
-                    cajas_a_pedir = max(0, ceil(cantidad_necesaria / cantidad_por_caja) - 1)
-
-                # Insertar en tabla
+            for rec in recomendaciones.itertuples(index=False):
                 tabla_recomendaciones.insert("", "end", values=(
-                    nombre,
-                    inventario_actual,
-                    round(demanda_diaria, 2),
-                    round(punto_reorden, 2),
-                    round(eoq, 2),
-                    cajas_a_pedir
+                    rec.nombre,
+                    rec.inventario_actual,
+                    round(rec.demanda_diaria, 2),
+                    round(rec.stock_seguridad, 2),
+                    round(rec.punto_reorden, 2),
+                    round(rec.eoq, 2),
+                    rec.cajas_a_pedir
                 ))
 
             # Botón de exportación
             btn_exportar = tk.Button(
                 ventana_recomendaciones,
                 text="Generar Orden Automática",
-                command=lambda: self.generar_orden_desde_plantilla(tabla_recomendaciones),
+                command=lambda: self.generar_orden_desde_plantilla(recomendaciones),
                 bg="#4CAF50",
                 fg="white"
             )
@@ -585,17 +545,10 @@ class AppVentas:
         except Exception as e:
             messagebox.showerror("Error", f"Error al procesar inventario: {str(e)}")
 
-    def generar_orden_desde_plantilla(self, tabla_recomendaciones):
+    def generar_orden_desde_plantilla(self, recomendaciones):
         try:
             # 1. Obtener productos a pedir (cajas > 0)
-            pedidos = []
-            for item in tabla_recomendaciones.get_children():
-                valores = tabla_recomendaciones.item(item)['values']
-                if valores[5] > 0:  # Cajas a Pedir > 0
-                    pedidos.append({
-                        'producto': valores[0],  # Nombre
-                        'cajas': valores[5]      # Cantidad
-                    })
+            pedidos = pedidos_a_realizar(recomendaciones)
 
             if not pedidos:
                 messagebox.showinfo("Info", "No hay productos para pedir")
@@ -609,50 +562,106 @@ class AppVentas:
             if not plantilla_path:
                 return
 
-            # 3. Cargar plantilla
-            wb = openpyxl.load_workbook(plantilla_path)
-            
-            # 4. Seleccionar hoja específica (ajusta el nombre)
-            centroS = "Arequipa"
-            hoja_pedidos = wb[centroS]  # Nombre exacto de tu hoja
-            
-            # 5. Configuración de columnas (ajustar según tu plantilla)
-            COL_PRODUCTO = 2   # Columna B
-            COL_CANTIDAD = 8   # Columna G
-            FILA_INICIO = 4    # Fila donde empiezan los productos
+            # 3. Cargar plantilla y rellenar la hoja de la sucursal
+            centroS = HOJA_POR_DEFECTO
+            wb, productos_procesados, no_encontrados = rellenar_plantilla(pedidos, plantilla_path, centroS)
 
-            # 6. Rellenar datos
-            productos_procesados = 0
-            
-            for fila in hoja_pedidos.iter_rows(min_row=FILA_INICIO):
-                celda_producto = fila[COL_PRODUCTO - 1]
-                if celda_producto.value:
-                    # Buscar coincidencia (insensible a mayúsculas/espacios)
-                    producto_plantilla = str(celda_producto.value).strip().lower()
-                    
-                    for pedido in pedidos:
-                        if pedido['producto'].strip().lower() in producto_plantilla:
-                            fila[COL_CANTIDAD - 1].value = pedido['cajas']
-                            productos_procesados += 1
-                            break
-
-            # 7. Guardar
+            # 4. Guardar
             if productos_procesados > 0:
                 archivo_salida = filedialog.asksaveasfilename(
                     defaultextension=".xlsx",
-                    initialfile=f"Orden_Pedido_{centroS}{datetime.now().strftime('%Y-%m-%d')}",
+                    initialfile=nombre_orden_por_defecto(centroS),
                     filetypes=[("Excel files", "*.xlsx")]
                 )
                 
                 if archivo_salida:
                     wb.save(archivo_salida)
                     messagebox.showinfo("Éxito", f"Orden generada con {productos_procesados} productos\nGuardada en:\n{archivo_salida}")
+                    if no_encontrados:
+                        messagebox.showwarning(
+                            "Productos sin fila en la plantilla",
+                            "\n".join(f"{p['codigo']} - {p['producto']}: {p['cajas']} cajas" for p in no_encontrados)
+                        )
             else:
                 messagebox.showwarning("Advertencia", "No se encontraron coincidencias con la plantilla")
 
         except Exception as e:
             messagebox.showerror("Error", f"Error al generar orden:\n{str(e)}")
 
+    def generar_orden_sucursales(self):
+        try:
+            plantilla_path = filedialog.askopenfilename(
+                title="Seleccionar plantilla de pedido",
+                filetypes=[("Excel files", "*.xlsx")]
+            )
+            if not plantilla_path:
+                return
+            archivos = filedialog.askopenfilenames(
+                initialdir=os.path.join(os.getcwd(), 'inventario'),
+                title="Selecciona los inventarios (el nombre del archivo debe incluir la sucursal)",
+                filetypes=(("Excel files", "*.xlsx"), ("All files", "*.*"))
+            )
+            if not archivos:
+                return
+
+            # Cada inventario va a la hoja cuyo nombre aparece en el nombre del archivo
+            hojas = hojas_plantilla(plantilla_path)
+            asignaciones, sin_hoja = [], []
+            for archivo in archivos:
+                hoja = hoja_de_inventario(archivo, hojas)
+                if hoja is None:
+                    sin_hoja.append(os.path.basename(archivo))
+                else:
+                    asignaciones.append((hoja, archivo))
+            if sin_hoja:
+                messagebox.showerror("Error", "No hay hoja en la plantilla para:\n" + "\n".join(sin_hoja))
+                return
+            try:
+                rutas = rutas_por_hoja(asignaciones)
+            except ValueError as e:
+                messagebox.showerror("Error", str(e))
+                return
+
+            def generar(db, trabajo):
+                trabajo.reportar_progreso(0, 3, "Leyendo inventarios...")
+                inventarios = leer_inventarios(rutas, self.workers_carga)
+                trabajo.verificar_cancelacion()
+                trabajo.reportar_progreso(1, 3, "Calculando recomendaciones...")
+                recomendaciones = calcular_recomendaciones_sucursales(db, inventarios, self.almacen)
+                trabajo.verificar_cancelacion()
+                trabajo.reportar_progreso(2, 3, "Rellenando plantilla...")
+                pedidos = {hoja: pedidos_a_realizar(df) for hoja, df in recomendaciones.items()}
+                return rellenar_plantilla_sucursales(pedidos, plantilla_path)
+
+            def al_terminar(resultado):
+                self._finalizar_trabajo()
+                wb, resultados = resultado
+                archivo_salida = filedialog.asksaveasfilename(
+                    defaultextension=".xlsx",
+                    initialfile=nombre_orden_por_defecto("Sucursales"),
+                    filetypes=[("Excel files", "*.xlsx")]
+                )
+                if not archivo_salida:
+                    return
+                wb.save(archivo_salida)
+                resumen = "\n".join(
+                    f"{hoja}: {procesados} productos" + (f", {len(no_encontrados)} sin fila" if no_encontrados else "")
+                    for hoja, (procesados, no_encontrados) in resultados.items()
+                )
+                messagebox.showinfo("Éxito", f"Orden generada\n{resumen}\nGuardada en:\n{archivo_salida}")
+
+            def al_error(e):
+                self._finalizar_trabajo()
+                messagebox.showerror("Error", f"Error al generar orden:\n{str(e)}")
+
+            trabajo = self.trabajador.enviar(generar, al_terminar=al_terminar, al_error=al_error,
+                                             al_progreso=self._actualizar_progreso,
+                                             al_cancelar=self._finalizar_trabajo)
+            self._iniciar_trabajo(trabajo, "Generando orden multi-sucursal...")
+
+        except Exception as e:
+            messagebox.showerror("Error", f"Error al generar orden:\n{str(e)}")
+
     def gestionar_prioridades(self):
         try:
             # Crear ventana
@@ -721,16 +730,8 @@ class AppVentas:
             # Obtener término de búsqueda
             busqueda = self.entry_buscar_prioridad.get().strip()
             
-            # Consultar productos
-            query = '''
-            SELECT codigo, nombre, prioridad 
-            FROM productos
-            WHERE codigo LIKE ? OR nombre LIKE ?
-            ORDER BY codigo
-            '''
-            params = (f"%{busqueda}%", f"%{busqueda}%")
-            
-            productos = self.db.ejecutar_consulta(query, params)
+            # Consultar productos (índice de texto completo)
+            productos = self.db.buscar_productos(busqueda)
             
             # Llenar tabla
             for prod in productos:
@@ -752,18 +753,16 @@ class AppVentas:
             codigo = item['values'][0]
             nueva_prioridad = self.opcion_prioridad.get()
             
-            # Actualizar en BD
-            self.db.cursor.execute('''
-            UPDATE productos 
-            SET prioridad = ?
-            WHERE codigo = ?
-            ''', (nueva_prioridad, codigo))
-            self.db.conn.commit()
-            
-            # Actualizar lista
-            self.actualizar_lista_prioridades()
-            messagebox.showinfo("Éxito", f"Prioridad actualizada para {item['values'][1]}")
-            
+            # Actualizar en BD fuera del hilo de Tk (espera si hay una carga escribiendo)
+            def al_terminar(_):
+                self.actualizar_lista_prioridades()
+                messagebox.showinfo("Éxito", f"Prioridad actualizada para {item['values'][1]}")
+
+            self.trabajador.enviar(
+                lambda db, trabajo: db.actualizar_prioridad(codigo, nueva_prioridad),
+                al_terminar=al_terminar,
+                al_error=lambda e: messagebox.showerror("Error", f"No se pudo actualizar: {str(e)}"))
+
         except Exception as e:
             messagebox.showerror("Error", f"No se pudo actualizar: {str(e)}")
 
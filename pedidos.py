@@ -0,0 +1,249 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from statistics import NormalDist
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+from lector_excel import leer_por_lotes, ColumnasInvalidas
+from plantilla import IndicePedidos, normalizar
+from pronostico import demanda_pronosticada
+
+COLUMNAS_INVENTARIO = ['codigo', 'nombre', 'cantidad']
+
+# Parámetros por defecto; cada producto puede sobrescribirlos o heredarlos de su
+# proveedor (tablas productos/proveedores, ver Database.parametros_reposicion)
+TIEMPO_ENTREGA = 5
+COSTO_PEDIDO = 30
+COSTO_ALMACENAMIENTO = 69
+# Nivel de servicio objetivo (probabilidad de no quedarse sin stock durante el
+# tiempo de entrega) según productos.prioridad; sin prioridad cuenta como 'baja'
+NIVEL_SERVICIO = {
+    'alta': 0.98,
+    'media': 0.95,
+    'baja': 0.90
+}
+
+# Configuración de la plantilla de pedido (ajustar según tu plantilla)
+HOJA_POR_DEFECTO = "Arequipa"
+COL_PRODUCTO = 2   # Columna B
+COL_CODIGO = None  # Columna con el código del producto, si la plantilla la tiene
+COL_CANTIDAD = 8   # Columna G
+FILA_INICIO = 4    # Fila donde empiezan los productos
+
+
+def leer_inventario(ruta_archivo):
+    """Lee el Excel de inventario actual (por lotes) y valida sus columnas"""
+    try:
+        filas = [fila for lote in leer_por_lotes(ruta_archivo, COLUMNAS_INVENTARIO) for fila in lote]
+    except ColumnasInvalidas:
+        raise ValueError("El archivo de Excel no tiene las columnas requeridas.")
+    return pd.DataFrame.from_records(filas, columns=COLUMNAS_INVENTARIO)
+
+
+def factores_servicio():
+    """Factor z de la normal estándar para el nivel de servicio de cada prioridad"""
+    normal = NormalDist()
+    return {prioridad: normal.inv_cdf(nivel) for prioridad, nivel in NIVEL_SERVICIO.items()}
+
+
+def catalogo_demanda(db, codigos, almacen=None):
+    """Demanda pronosticada, desviación y parámetros de reposición de los códigos indicados.
+
+    Hace las consultas y el pronóstico una sola vez para que varias sucursales
+    compartan el resultado. Con un AlmacenSeries la historia sale de su matriz.
+    Los códigos sin registro en productos o sin ventas se omiten.
+    """
+    estadisticas = pd.DataFrame(
+        db.estadisticas_demanda(),
+        columns=['codigo', 'cantidad_por_caja', 'prioridad', 'dias', 'total', 'suma_cuadrados']
+    )
+    # Parámetros de reposición de todo el catálogo en una sola consulta
+    parametros = pd.DataFrame(
+        db.parametros_reposicion(),
+        columns=['codigo', 'tiempo_entrega', 'costo_pedido', 'costo_almacenamiento']
+    )
+    catalogo = estadisticas[estadisticas['codigo'].isin(set(codigos))].merge(parametros, on='codigo', how='left')
+
+    catalogo['tiempo_entrega'] = catalogo['tiempo_entrega'].fillna(TIEMPO_ENTREGA).astype(float)
+    catalogo['costo_pedido'] = catalogo['costo_pedido'].fillna(COSTO_PEDIDO).astype(float)
+    catalogo['costo_almacenamiento'] = catalogo['costo_almacenamiento'].fillna(COSTO_ALMACENAMIENTO).astype(float)
+
+    # Demanda pronosticada para el tiempo de entrega; si un producto no tiene
+    # historia reciente se usan su promedio y varianza históricos
+    dias = catalogo['dias'].to_numpy(dtype=float)
+    demanda_historica = catalogo['total'].to_numpy(dtype=float) / dias
+    varianza_historica = np.divide(
+        catalogo['suma_cuadrados'].to_numpy(dtype=float) - dias * demanda_historica ** 2, dias - 1,
+        out=np.zeros_like(dias), where=dias > 1)
+    demanda_diaria, desviacion = demanda_pronosticada(
+        db, catalogo['codigo'].tolist(), catalogo['tiempo_entrega'].to_numpy(), almacen=almacen)
+    catalogo['demanda_diaria'] = np.where(np.isnan(demanda_diaria), demanda_historica, demanda_diaria)
+    catalogo['desviacion'] = np.where(np.isnan(desviacion), np.sqrt(np.maximum(varianza_historica, 0)), desviacion)
+    return catalogo.drop(columns=['dias', 'total', 'suma_cuadrados'])
+
+
+def recomendar(catalogo, df_inventario):
+    """Punto de reorden, EOQ y cajas a pedir de un inventario con un catálogo ya calculado"""
+    inventario = df_inventario[COLUMNAS_INVENTARIO].rename(columns={'cantidad': 'inventario_actual'})
+    inventario['codigo'] = inventario['codigo'].astype(str)
+    df = inventario.merge(catalogo, on='codigo', how='inner')
+
+    inventario_actual = df['inventario_actual'].to_numpy(dtype=float)
+    cantidad_por_caja = df['cantidad_por_caja'].to_numpy(dtype=float)
+    tiempo_entrega = df['tiempo_entrega'].to_numpy(dtype=float)
+    demanda_diaria = df['demanda_diaria'].to_numpy(dtype=float)
+
+    # Stock de seguridad = z(nivel de servicio de la prioridad) * σ diaria * √tiempo de entrega
+    factores_z = factores_servicio()
+    prioridad = df['prioridad'].fillna('baja').str.lower()
+    z = prioridad.map(factores_z).fillna(factores_z['baja']).to_numpy(dtype=float)
+    stock_seguridad = z * df['desviacion'].to_numpy(dtype=float) * np.sqrt(tiempo_entrega)
+    punto_reorden = demanda_diaria * tiempo_entrega + stock_seguridad
+    eoq = np.sqrt((2 * demanda_diaria * 365 * df['costo_pedido'].to_numpy(dtype=float))
+                  / df['costo_almacenamiento'].to_numpy(dtype=float))
+
+    # Calcular cajas a pedir
+    cantidad_necesaria = (punto_reorden - inventario_actual) + eoq
+    cajas_a_pedir = np.where(inventario_actual < punto_reorden,
+                             np.maximum(0, np.ceil(cantidad_necesaria / cantidad_por_caja) - 1), 0)
+
+    df['stock_seguridad'] = stock_seguridad
+    df['punto_reorden'] = punto_reorden
+    df['eoq'] = eoq
+    df['cajas_a_pedir'] = cajas_a_pedir.astype(int)
+    return df[['codigo', 'nombre', 'inventario_actual', 'demanda_diaria',
+               'stock_seguridad', 'punto_reorden', 'eoq', 'cajas_a_pedir']]
+
+
+def calcular_recomendaciones(db, df_inventario, almacen=None):
+    """Calcula demanda, punto de reorden, EOQ y cajas a pedir para todo el inventario a la vez.
+
+    Devuelve un DataFrame con una fila por producto del inventario; los productos
+    sin registro en productos o sin ventas se omiten.
+    """
+    catalogo = catalogo_demanda(db, df_inventario['codigo'].astype(str), almacen)
+    return recomendar(catalogo, df_inventario)
+
+
+def leer_inventarios(rutas, workers=None):
+    """Lee en paralelo (un proceso por libro) los inventarios {hoja: ruta} y devuelve {hoja: DataFrame}"""
+    if len(rutas) <= 1:
+        return {hoja: leer_inventario(ruta) for hoja, ruta in rutas.items()}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futuros = {hoja: pool.submit(leer_inventario, ruta) for hoja, ruta in rutas.items()}
+        return {hoja: futuro.result() for hoja, futuro in futuros.items()}
+
+
+def calcular_recomendaciones_sucursales(db, inventarios, almacen=None):
+    """Recomendaciones de varias sucursales {hoja: DataFrame de inventario} -> {hoja: recomendaciones}.
+
+    El pronóstico y los parámetros se calculan una vez para la unión de los códigos.
+    """
+    codigos = set()
+    for df in inventarios.values():
+        codigos.update(df['codigo'].astype(str))
+    catalogo = catalogo_demanda(db, codigos, almacen)
+    return {hoja: recomendar(catalogo, df) for hoja, df in inventarios.items()}
+
+
+def pedidos_a_realizar(recomendaciones):
+    """Filtra los productos con cajas a pedir > 0"""
+    a_pedir = recomendaciones[recomendaciones['cajas_a_pedir'] > 0]
+    return [
+        {'codigo': codigo, 'producto': nombre, 'cajas': int(cajas)}
+        for codigo, nombre, cajas in zip(a_pedir['codigo'], a_pedir['nombre'], a_pedir['cajas_a_pedir'])
+    ]
+
+
+def _rellenar_hoja(hoja_pedidos, pedidos):
+    # Una pasada por las filas de la hoja, leyendo solo las columnas necesarias; la
+    # asignación se hace con todas las celdas a la vista (exactas antes que aproximadas)
+    ultima_columna = max(COL_PRODUCTO, COL_CANTIDAD, COL_CODIGO or 0)
+    filas, celdas = [], []
+    for fila in hoja_pedidos.iter_rows(min_row=FILA_INICIO, max_col=ultima_columna):
+        if fila[COL_PRODUCTO - 1].value:
+            filas.append(fila)
+            celdas.append((fila[COL_PRODUCTO - 1].value, fila[COL_CODIGO - 1].value if COL_CODIGO else None))
+
+    asignacion = IndicePedidos(pedidos).asignar(celdas)
+    for posicion, i in asignacion.items():
+        filas[posicion][COL_CANTIDAD - 1].value = pedidos[i]['cajas']
+
+    encontrados = set(asignacion.values())
+    no_encontrados = [pedido for i, pedido in enumerate(pedidos) if i not in encontrados]
+    return len(asignacion), no_encontrados
+
+
+def rellenar_plantilla(pedidos, plantilla_path, hoja=HOJA_POR_DEFECTO):
+    """Carga la plantilla y escribe las cajas de cada pedido en la hoja indicada.
+
+    Las filas se ubican con un IndicePedidos (código, nombre normalizado o palabras en
+    común, cada pedido en una sola fila) en una sola pasada por la hoja. Devuelve (workbook, productos_procesados,
+    no_encontrados), donde no_encontrados son los pedidos sin fila en la plantilla;
+    el llamador decide dónde guardarlo.
+    """
+    wb = openpyxl.load_workbook(plantilla_path)
+    hoja_pedidos = wb[hoja]  # Nombre exacto de la hoja
+    productos_procesados, no_encontrados = _rellenar_hoja(hoja_pedidos, pedidos)
+    return wb, productos_procesados, no_encontrados
+
+
+def rellenar_plantilla_sucursales(pedidos_por_hoja, plantilla_path):
+    """Rellena varias hojas {hoja: pedidos} de la misma plantilla con una sola carga.
+
+    Devuelve (workbook, {hoja: (productos_procesados, no_encontrados)}). Lanza
+    ValueError si alguna hoja no existe en la plantilla.
+    """
+    wb = openpyxl.load_workbook(plantilla_path)
+    faltantes = [hoja for hoja in pedidos_por_hoja if hoja not in wb.sheetnames]
+    if faltantes:
+        raise ValueError(f"La plantilla no tiene las hojas: {', '.join(faltantes)}")
+    resultados = {hoja: _rellenar_hoja(wb[hoja], pedidos) for hoja, pedidos in pedidos_por_hoja.items()}
+    return wb, resultados
+
+
+def nombre_orden_por_defecto(hoja=HOJA_POR_DEFECTO):
+    return f"Orden_Pedido_{hoja}{datetime.now().strftime('%Y-%m-%d')}"
+
+
+def hojas_plantilla(plantilla_path):
+    """Nombres de las hojas de una plantilla, sin cargar su contenido"""
+    wb = openpyxl.load_workbook(plantilla_path, read_only=True)
+    try:
+        return wb.sheetnames
+    finally:
+        wb.close()
+
+
+def hoja_de_inventario(ruta_inventario, hojas):
+    """Hoja de la plantilla cuyo nombre aparece en el nombre del archivo de inventario, o None.
+
+    Si varias coinciden gana la de nombre más largo ("Lima Norte" antes que "Lima").
+    """
+    nombre = _clave_hoja(os.path.splitext(os.path.basename(ruta_inventario))[0])
+    for hoja in sorted(hojas, key=lambda h: len(_clave_hoja(h)), reverse=True):
+        if _clave_hoja(hoja) and _clave_hoja(hoja) in nombre:
+            return hoja
+    return None
+
+
+def rutas_por_hoja(asignaciones):
+    """Convierte [(hoja, ruta de inventario)] en {hoja: ruta}.
+
+    Lanza ValueError si una hoja recibe más de un inventario, con los archivos en conflicto.
+    """
+    por_hoja = {}
+    for hoja, ruta in asignaciones:
+        por_hoja.setdefault(hoja, []).append(ruta)
+    repetidas = {hoja: rutas for hoja, rutas in por_hoja.items() if len(rutas) > 1}
+    if repetidas:
+        raise ValueError("Varios inventarios para la misma hoja:\n" + "\n".join(
+            f"{hoja}: {', '.join(os.path.basename(ruta) for ruta in rutas)}" for hoja, rutas in repetidas.items()))
+    return {hoja: rutas[0] for hoja, rutas in por_hoja.items()}
+
+
+def _clave_hoja(texto):
+    return normalizar(texto).replace(' ', '')
@@ -0,0 +1,137 @@
+import re
+import unicodedata
+from collections import defaultdict
+
+# Fracción mínima de las palabras de un pedido que debe aparecer en la celda de la
+# plantilla para aceptar una coincidencia aproximada
+UMBRAL_TOKENS = 0.8
+# Pedidos revisados como máximo por celda en la búsqueda aproximada
+MAX_CANDIDATOS = 500
+
+
+def normalizar(texto):
+    """Minúsculas, sin tildes y con cualquier separador reducido a un espacio"""
+    descompuesto = unicodedata.normalize('NFKD', str(texto))
+    sin_tildes = ''.join(c for c in descompuesto if not unicodedata.combining(c))
+    return ' '.join(re.findall(r'[a-z0-9]+', sin_tildes.lower()))
+
+
+def _clave(texto):
+    # Clave exacta insensible a tildes, mayúsculas y espacios
+    return normalizar(texto).replace(' ', '')
+
+
+class IndicePedidos:
+    """Índice de pedidos para ubicar las filas de la plantilla sin recorrer todos los pedidos.
+
+    Asigna primero por código (la celda o una de sus palabras es el código), luego por
+    nombre exacto normalizado y, por último, por palabras en común: gana el pedido con
+    más palabras presentes en la celda, si cubre al menos UMBRAL_TOKENS de las suyas.
+    """
+
+    def __init__(self, pedidos):
+        self.pedidos = list(pedidos)
+        self.por_codigo = {}
+        self.por_nombre = {}
+        self.por_token = defaultdict(set)
+        self.tokens_pedido = []
+        for i, pedido in enumerate(self.pedidos):
+            if pedido.get('codigo'):
+                self.por_codigo.setdefault(_clave(pedido['codigo']), i)
+            self.por_nombre.setdefault(_clave(pedido['producto']), i)
+            tokens = set(normalizar(pedido['producto']).split())
+            self.tokens_pedido.append(tokens)
+            for token in tokens:
+                self.por_token[token].add(i)
+
+    def asignar(self, celdas):
+        """Asigna pedidos a las celdas [(texto, codigo o None)] de una hoja.
+
+        Devuelve {posición de la celda: índice del pedido}: cada pedido va a una sola
+        celda y cada celda recibe un solo pedido. Las coincidencias exactas de toda la
+        hoja se asignan antes que las aproximadas, y estas solo usan pedidos y celdas
+        libres; si el mejor puntaje está empatado el pedido queda sin fila.
+        """
+        celdas = [(normalizar(texto), codigo) for texto, codigo in celdas]
+        asignacion, usados = {}, set()
+
+        def asignar_exacta(posicion, i):
+            if i is not None and i not in usados and posicion not in asignacion:
+                asignacion[posicion] = i
+                usados.add(i)
+
+        for posicion, (normalizado, codigo) in enumerate(celdas):
+            asignar_exacta(posicion, self._buscar_por_codigo(normalizado, codigo))
+        for posicion, (normalizado, _) in enumerate(celdas):
+            asignar_exacta(posicion, self.por_nombre.get(normalizado.replace(' ', '')))
+
+        # Cada celda libre propone su mejor pedido libre (si no hay empate) y cada pedido
+        # se queda con la celda de mayor puntaje (si no hay empate)
+        propuestas = defaultdict(list)
+        for posicion, (normalizado, _) in enumerate(celdas):
+            if posicion in asignacion:
+                continue
+            puntaje, mejores = self._buscar_por_tokens(set(normalizado.split()), usados)
+            if len(mejores) == 1:
+                propuestas[mejores[0]].append((puntaje, posicion))
+        for i, candidatas in propuestas.items():
+            candidatas.sort(reverse=True)
+            if len(candidatas) == 1 or candidatas[0][0] > candidatas[1][0]:
+                asignacion[candidatas[0][1]] = i
+        return asignacion
+
+    def _buscar_por_codigo(self, normalizado, codigo):
+        if codigo is not None and _clave(codigo) in self.por_codigo:
+            return self.por_codigo[_clave(codigo)]
+        clave = normalizado.replace(' ', '')
+        if clave in self.por_codigo:
+            return self.por_codigo[clave]
+        for token in normalizado.split():
+            if token in self.por_codigo:
+                return self.por_codigo[token]
+        return None
+
+    def _buscar_por_tokens(self, tokens, usados):
+        # Recorre las palabras de la celda de la menos a la más frecuente y se queda con
+        # el primer grupo de candidatos que produce una coincidencia; palabras comunes
+        # ("dxn") solo se revisan si las específicas no alcanzaron, y con tope.
+        # Devuelve (mejor puntaje, [pedidos con ese puntaje])
+        indexados = sorted((t for t in tokens if t in self.por_token), key=lambda t: len(self.por_token[t]))
+        revisados = set(usados)
+        for posicion, token in enumerate(indexados):
+            if len(revisados) - len(usados) + len(self.por_token[token]) > MAX_CANDIDATOS:
+                return self._buscar_en_interseccion(indexados[posicion:], tokens, revisados)
+            puntaje, mejores = self._mejores_candidatos(self.por_token[token] - revisados, tokens)
+            revisados |= self.por_token[token]
+            if mejores:
+                return puntaje, mejores
+        return None, []
+
+    def _buscar_en_interseccion(self, indexados, tokens, revisados):
+        # Todas las palabras restantes son frecuentes: se reducen los candidatos con los
+        # pedidos que además tienen las siguientes palabras (sin dejar el grupo vacío)
+        # y se revisan como máximo MAX_CANDIDATOS, en orden
+        candidatos = self.por_token[indexados[0]] - revisados
+        for token in indexados[1:]:
+            if len(candidatos) <= MAX_CANDIDATOS:
+                break
+            comunes = candidatos & self.por_token[token]
+            if comunes:
+                candidatos = comunes
+        return self._mejores_candidatos(sorted(candidatos)[:MAX_CANDIDATOS], tokens)
+
+    def _mejores_candidatos(self, candidatos, tokens):
+        mejor_puntaje, mejores = None, []
+        for i in candidatos:
+            propios = self.tokens_pedido[i]
+            comunes = len(propios & tokens)
+            if not comunes or comunes < UMBRAL_TOKENS * len(propios):
+                continue
+            # Más palabras en común y, a igualdad, el nombre más específico y la celda
+            # con menos palabras de sobra
+            puntaje = (comunes, -len(propios - tokens), -len(tokens - propios))
+            if mejor_puntaje is None or puntaje > mejor_puntaje:
+                mejor_puntaje, mejores = puntaje, [i]
+            elif puntaje == mejor_puntaje:
+                mejores.append(i)
+        return mejor_puntaje, mejores
@@ -0,0 +1,173 @@
+from datetime import date, timedelta
+
+import numpy as np
+
+# Parámetros del pronóstico de demanda
+HISTORIA_DIAS = 365   # Días de historia usados para pronosticar
+VENTANA_MEDIA = 28    # Días de la media móvil
+ALFA_SUAVIZADO = 0.2  # Peso del último día en el suavizado exponencial
+
+
+def matriz_demanda(filas, codigos, fecha_inicio, fecha_fin):
+    """Convierte [(codigo, fecha, total)] en una matriz densa len(codigos) x días.
+
+    La fila i corresponde a codigos[i] y la columna d a fecha_inicio + d días.
+    Los días sin ventas de un producto valen 0; los días anteriores a su primera
+    venta y los días sin ningún archivo cargado (tienda cerrada, falta el Excel)
+    quedan en NaN para no contarse como demanda cero.
+    """
+    inicio = np.datetime64(fecha_inicio, 'D')
+    num_dias = int((np.datetime64(fecha_fin, 'D') - inicio).astype(int)) + 1
+    matriz = np.full((len(codigos), num_dias), np.nan)
+    if not filas or not codigos:
+        return matriz
+
+    indice = {codigo: i for i, codigo in enumerate(codigos)}
+    codigos_filas, fechas, totales = zip(*filas)
+    filas_matriz = np.fromiter((indice.get(c, -1) for c in codigos_filas), dtype=np.intp, count=len(filas))
+    columnas = (np.array(fechas, dtype='datetime64[D]') - inicio).astype(np.intp)
+    en_rango = (columnas >= 0) & (columnas < num_dias)
+    validas = en_rango & (filas_matriz >= 0)
+
+    ventas = np.zeros_like(matriz)
+    ventas[filas_matriz[validas], columnas[validas]] = np.asarray(totales, dtype=float)[validas]
+
+    # Un día tiene datos si algún producto (aunque no esté en codigos) vendió ese día
+    dia_con_datos = np.zeros(num_dias, dtype=bool)
+    dia_con_datos[columnas[en_rango]] = True
+    return marcar_no_observados(ventas, dia_con_datos)
+
+
+def marcar_no_observados(ventas, dia_con_datos):
+    """Pasa a NaN, en una matriz densa de ventas, los días que no cuentan como demanda.
+
+    Son los días anteriores a la primera venta de cada fila y los días en que
+    ningún producto vendió (dia_con_datos falso).
+    """
+    desde_primera_venta = np.logical_or.accumulate(ventas != 0, axis=1)
+    observado = dia_con_datos & desde_primera_venta
+    return np.where(observado, ventas, np.nan)
+
+
+def media_movil(matriz, ventana=VENTANA_MEDIA):
+    """Media de los últimos `ventana` días observados de cada fila (NaN si no hay ninguno)"""
+    reciente = matriz[:, -ventana:]
+    observados = (~np.isnan(reciente)).sum(axis=1)
+    suma = np.nansum(reciente, axis=1)
+    return np.divide(suma, observados, out=np.full(len(matriz), np.nan), where=observados > 0)
+
+
+def desviacion_demanda(matriz):
+    """Desviación estándar muestral de los días observados de cada fila (NaN con menos de dos)"""
+    observados = (~np.isnan(matriz)).sum(axis=1)
+    media = np.divide(np.nansum(matriz, axis=1), observados,
+                      out=np.zeros(len(matriz)), where=observados > 0)
+    cuadrados = np.nansum((matriz - media[:, np.newaxis]) ** 2, axis=1)
+    varianza = np.divide(cuadrados, observados - 1, out=np.full(len(matriz), np.nan), where=observados > 1)
+    return np.sqrt(varianza)
+
+
+def suavizado_exponencial(matriz, alfa=ALFA_SUAVIZADO):
+    """Nivel final del suavizado exponencial simple de cada fila.
+
+    Recorre los días una vez y actualiza todos los productos a la vez; los días
+    en NaN mantienen el nivel y el nivel arranca en la primera observación.
+    """
+    nivel = np.full(len(matriz), np.nan)
+    for columna in matriz.T:
+        observado = ~np.isnan(columna)
+        sin_nivel = np.isnan(nivel)
+        nivel = np.where(observado & sin_nivel, columna, nivel)
+        actualizar = observado & ~sin_nivel
+        nivel[actualizar] += alfa * (columna[actualizar] - nivel[actualizar])
+    return nivel
+
+
+def factores_dia_semana(matriz, fecha_inicio):
+    """Matriz len(filas) x 7 con el peso de cada día de la semana (lunes = 0).
+
+    El factor es la media del día de la semana entre la media general del producto.
+    Los días de la semana que nunca tienen datos (tienda cerrada) valen 0 y los
+    que el producto aún no ha observado valen 1.
+    """
+    primer_dia = date.fromisoformat(str(fecha_inicio)).weekday()
+    dias_semana = (primer_dia + np.arange(matriz.shape[1])) % 7
+    observado = ~np.isnan(matriz)
+    valores = np.where(observado, matriz, 0.0)
+
+    suma = np.zeros((len(matriz), 7))
+    cuenta = np.zeros((len(matriz), 7))
+    for dia in range(7):
+        columnas = dias_semana == dia
+        suma[:, dia] = valores[:, columnas].sum(axis=1)
+        cuenta[:, dia] = observado[:, columnas].sum(axis=1)
+
+    media_dia = np.divide(suma, cuenta, out=np.zeros_like(suma), where=cuenta > 0)
+    total_observado = cuenta.sum(axis=1, keepdims=True)
+    media = np.divide(suma.sum(axis=1, keepdims=True), total_observado,
+                      out=np.zeros((len(matriz), 1)), where=total_observado > 0)
+    factores = np.divide(media_dia, media, out=np.ones_like(suma), where=media > 0)
+    factores[cuenta == 0] = 1.0
+    factores[:, cuenta.sum(axis=0) == 0] = 0.0
+    return factores
+
+
+def pronosticar_demanda(matriz, fecha_inicio, horizonte, alfa=ALFA_SUAVIZADO, ventana=VENTANA_MEDIA):
+    """Demanda diaria media esperada de cada fila para los próximos `horizonte` días.
+
+    `horizonte` puede ser un entero o un arreglo con un horizonte por fila.
+
+    Desestacionaliza la serie con los factores por día de la semana, la suaviza
+    exponencialmente y vuelve a aplicar los factores de los días pronosticados.
+    Las filas con menos de `ventana` días observados usan la media móvil, porque
+    su suavizado aún pesa demasiado la primera venta. Las filas sin ninguna
+    observación devuelven NaN.
+    """
+    factores = factores_dia_semana(matriz, fecha_inicio)
+    primer_dia = date.fromisoformat(str(fecha_inicio)).weekday()
+    dias_semana = (primer_dia + np.arange(matriz.shape[1])) % 7
+
+    factor_diario = factores[:, dias_semana]
+    desestacionalizada = np.divide(matriz, factor_diario, out=np.full_like(matriz, np.nan),
+                                   where=factor_diario > 0)
+    suavizado = suavizado_exponencial(desestacionalizada, alfa)
+    media = media_movil(desestacionalizada, ventana)
+    historia_corta = (~np.isnan(desestacionalizada)).sum(axis=1) < ventana
+    nivel = np.where(historia_corta & ~np.isnan(media), media, suavizado)
+    nivel = np.where(np.isnan(nivel), media, nivel)
+
+    # Media de los factores de los próximos h días de cada fila (h >= 1)
+    horizonte = np.maximum(np.broadcast_to(np.ceil(horizonte).astype(np.intp), nivel.shape), 1)
+    maximo = int(horizonte.max()) if len(horizonte) else 1
+    dias_futuros = (primer_dia + matriz.shape[1] + np.arange(maximo)) % 7
+    acumulado = np.cumsum(factores[:, dias_futuros], axis=1)
+    factor_futuro = acumulado[np.arange(len(nivel)), horizonte - 1] / horizonte
+    return nivel * factor_futuro
+
+
+def demanda_pronosticada(db, codigos, horizonte, historia=HISTORIA_DIAS, almacen=None):
+    """Pronostica la demanda diaria de los códigos indicados con la historia reciente de la base.
+
+    `horizonte` es un entero o un arreglo alineado con `codigos` (tiempo de entrega de cada uno).
+    Con un AlmacenSeries la historia se corta de su matriz en lugar de consultar ventas_diarias.
+    Devuelve (demanda, desviacion), dos arreglos alineados con `codigos`: la demanda
+    diaria pronosticada y la desviación estándar de la demanda diaria en la misma
+    historia. Ambos son NaN para los códigos sin ventas.
+    """
+    if almacen is not None:
+        almacen.actualizar(db)
+        ultima = almacen.ultima_fecha()
+    else:
+        ultima = db.ultima_fecha_ventas()
+    if ultima is None:
+        vacio = np.full(len(codigos), np.nan)
+        return vacio, vacio.copy()
+    fecha_fin = date.fromisoformat(ultima)
+    fecha_inicio = fecha_fin - timedelta(days=historia - 1)
+    if almacen is not None:
+        ventas, dia_con_datos = almacen.ventas(list(codigos), fecha_inicio.isoformat(), ultima)
+        matriz = marcar_no_observados(ventas, dia_con_datos)
+    else:
+        filas = db.ventas_diarias_desde(fecha_inicio.isoformat())
+        matriz = matriz_demanda(filas, list(codigos), fecha_inicio, fecha_fin)
+    return pronosticar_demanda(matriz, fecha_inicio, horizonte), desviacion_demanda(matriz)
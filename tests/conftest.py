@@ -0,0 +1,16 @@
+import os
+import sys
+
+import pytest
+
+# Los módulos de la aplicación viven en la raíz del repositorio
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database  # noqa: E402
+
+
+@pytest.fixture
+def db(tmp_path):
+    base = Database(str(tmp_path / 'ventas.db'))
+    yield base
+    base.cerrar()
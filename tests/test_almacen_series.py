@@ -0,0 +1,58 @@
+import json
+
+from almacen_series import AlmacenSeries
+
+
+def _series_sql(db):
+    return {(codigo, fecha): total for codigo, fecha, total in db.ventas_diarias_desde('0000-00-00')}
+
+
+def _series_almacen(almacen, codigos):
+    return {(codigo, fecha): total
+            for codigo in codigos
+            for fecha, total in almacen.serie(codigo, '0000-01-01', '9999-12-31')}
+
+
+def test_dos_instancias_no_corrompen_el_almacen(db):
+    db.insertar_venta('FB007', 'DXN Morinzhi', 4, '2025-02-10')
+    primera = AlmacenSeries(db.db_name)
+    segunda = AlmacenSeries(db.db_name)
+    primera.actualizar(db)
+    segunda.actualizar(db)
+
+    # Una fecha anterior obliga a reescribir la matriz; después ambas siguen escribiendo
+    db.insertar_venta('FB027', 'DXN Morinzyme', 2, '2025-01-05')
+    primera.actualizar(db)
+    segunda.actualizar(db)
+    db.insertar_venta('FB063', 'DXN Zhi Café Classic', 9, '2025-02-11')
+    segunda.actualizar(db)
+    db.insertar_venta('FB063', 'DXN Zhi Café Classic', 1, '2025-02-12')
+    primera.actualizar(db)
+
+    nueva = AlmacenSeries(db.db_name)
+    assert nueva.generacion == db.generacion_datos()
+    esperado = _series_sql(db)
+    codigos = {codigo for codigo, _ in esperado}
+    assert _series_almacen(nueva, codigos) == esperado
+    assert not nueva.actualizar(db)
+    for almacen in (primera, segunda):
+        almacen.actualizar(db)
+        assert _series_almacen(almacen, codigos) == esperado
+
+
+def test_indice_y_matriz_que_no_concuerdan_se_reconstruyen(db):
+    db.insertar_venta('FB007', 'DXN Morinzhi', 4, '2025-02-10')
+    almacen = AlmacenSeries(db.db_name)
+    almacen.actualizar(db)
+
+    # Índice que nombra una matriz más chica que la que describe
+    with open(almacen.ruta_indice, encoding='utf-8') as f:
+        meta = json.load(f)
+    meta['num_dias'] = 10_000
+    with open(almacen.ruta_indice, 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+
+    dañado = AlmacenSeries(db.db_name)
+    assert dañado.matriz is None
+    assert dañado.actualizar(db)
+    assert dañado.serie('FB007', '2025-01-01', '2025-12-31') == [('2025-02-10', 4)]
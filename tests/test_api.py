@@ -0,0 +1,110 @@
+import asyncio
+import io
+import json
+
+import openpyxl
+import pandas as pd
+import pytest
+
+from api import ServicioVentas
+
+
+def test_cambios_de_catalogo_invalidan_la_cache(tmp_path):
+    servicio = ServicioVentas(str(tmp_path / 'ventas.db'), hilos=1)
+    try:
+        calculos = []
+
+        def calcular():
+            calculos.append(1)
+            return {'calculo': len(calculos)}
+        clave = ('recomendaciones', 'inventario', None, None)
+
+        assert servicio._cacheada(clave, calcular) == servicio._cacheada(clave, calcular)
+        assert len(calculos) == 1
+
+        servicio.db.registrar_productos([('FB001', 'Producto', 12)])
+        servicio._cacheada(clave, calcular)
+        servicio.db.guardar_proveedor('Norte', tiempo_entrega=5)
+        servicio._cacheada(clave, calcular)
+        servicio.db.actualizar_parametros_producto('FB001', proveedor='Norte')
+        servicio._cacheada(clave, calcular)
+        servicio.db.actualizar_prioridad('FB001', 'alta')
+        servicio._cacheada(clave, calcular)
+        assert len(calculos) == 5
+    finally:
+        servicio.cerrar()
+
+
+def test_meses_de_un_producto(tmp_path):
+    servicio = ServicioVentas(str(tmp_path / 'ventas.db'), hilos=1)
+    try:
+        for fecha in ['2025-01-05', '2025-03-10', '2025-03-11']:
+            servicio.db.insertar_ventas_bulk(
+                pd.DataFrame({'Codigo': ['FB001'], 'Nombre': ['Producto'], 'Cantidad': [2]}), fecha)
+        assert json.loads(servicio.meses('FB001', {}, b'')) == {'codigo': 'FB001', 'meses': ['2025-01', '2025-03']}
+    finally:
+        servicio.cerrar()
+
+
+def test_estadisticas_de_las_caches(tmp_path):
+    servicio = ServicioVentas(str(tmp_path / 'ventas.db'), hilos=1)
+    try:
+        for _ in range(3):
+            servicio.meses('FB001', {}, b'')
+        servicio.db.meses_producto('FB001')
+        estado, cuerpo = servicio.despachar('GET', '/estadisticas', b'')
+        estadisticas = json.loads(cuerpo)
+        assert estado == 200
+        assert (estadisticas['respuestas']['aciertos'], estadisticas['respuestas']['fallos']) == (2, 1)
+        assert (estadisticas['consultas']['aciertos'], estadisticas['consultas']['fallos']) == (1, 1)
+    finally:
+        servicio.cerrar()
+
+
+def libro_subido(filas):
+    wb = openpyxl.Workbook(write_only=True)
+    hoja = wb.create_sheet()
+    hoja.append(['Codigo', 'Nombre', 'Cantidad'])
+    for fila in filas:
+        hoja.append(fila)
+    salida = io.BytesIO()
+    wb.save(salida)
+    return salida.getvalue()
+
+
+def test_ingesta_omite_el_mismo_libro(tmp_path):
+    servicio = ServicioVentas(str(tmp_path / 'ventas.db'), hilos=1)
+    try:
+        libro = libro_subido([('FB001', 'Uno', 3), ('FB002', 'Dos', 4)])
+        estado, cuerpo = servicio.despachar('POST', '/ingesta?fecha=2025-01-15', libro)
+        primera = json.loads(cuerpo)
+        assert estado == 200
+        assert (primera['filas'], primera['omitido']) == (2, False)
+
+        estado, cuerpo = servicio.despachar('POST', '/ingesta?fecha=2025-01-15', libro)
+        assert estado == 200
+        assert json.loads(cuerpo) == {'fecha': '2025-01-15', 'filas': 0, 'omitido': True}
+        assert servicio.db.consultar_valor('SELECT SUM(cantidad) FROM ventas') == 7
+    finally:
+        servicio.cerrar()
+
+
+@pytest.mark.parametrize('largo', ['-1', 'abc'])
+def test_content_length_invalido_responde_400(tmp_path, largo):
+    servicio = ServicioVentas(str(tmp_path / 'ventas.db'), hilos=1)
+
+    async def pedir():
+        servidor = await asyncio.start_server(servicio.atender, '127.0.0.1', 0)
+        async with servidor:
+            reader, writer = await asyncio.open_connection(*servidor.sockets[0].getsockname()[:2])
+            writer.write(f"POST /ingesta?fecha=2025-01-15 HTTP/1.1\r\nContent-Length: {largo}\r\n\r\n".encode())
+            await writer.drain()
+            respuesta = await reader.read()
+            writer.close()
+            return respuesta
+    try:
+        respuesta = asyncio.run(pedir())
+        assert respuesta.startswith(b'HTTP/1.1 400 ')
+        assert 'Content-Length inválido' in respuesta.decode('utf-8')
+    finally:
+        servicio.cerrar()
@@ -0,0 +1,147 @@
+import sqlite3
+
+import pandas as pd
+
+from database import Database
+
+
+def insertar_dia(db, fecha, filas, archivo=None):
+    df = pd.DataFrame(filas, columns=['Codigo', 'Nombre', 'Cantidad'])
+    return db.insertar_ventas_bulk(df, fecha, archivo=archivo)
+
+
+def test_paginas_por_clave_no_retienen_la_lectura(db):
+    insertar_dia(db, '2025-01-15', [(f"SKU{i:03d}", f"Producto {i}", i + 1) for i in range(25)])
+    paginas = db.paginas_ventas_del_dia('2025-01-15', 10)
+    primera = next(paginas)
+    assert len(primera) == 10
+
+    # Con la búsqueda a medias, un checkpoint completo del WAL no encuentra lectores
+    insertar_dia(db, '2025-01-16', [('SKU000', 'Producto 0', 1)])
+    ocupado, _, _ = db.conn.execute('PRAGMA wal_checkpoint(TRUNCATE)').fetchone()
+    assert ocupado == 0
+
+    resto = [fila for pagina in paginas for fila in pagina]
+    ids = [fila[0] for fila in primera + resto]
+    assert ids == sorted(ids) and len(ids) == 25
+    assert [fila[3] for fila in primera + resto] == list(range(1, 26))
+
+
+def test_busqueda_por_paginas_coincide_con_la_busqueda_completa(db):
+    insertar_dia(db, '2025-01-15', [(f"SKU{i:03d}", f"Cafe {i}", i % 7) for i in range(30)])
+    paginas = list(db.paginas_busqueda_ventas('cafe', '2025-01-15', 7))
+    assert [len(pagina) for pagina in paginas] == [7, 7, 7, 7, 2]
+    assert [fila for pagina in paginas for fila in pagina] == sorted(db.buscar_ventas('cafe', '2025-01-15'))
+
+
+def test_cache_por_producto_se_invalida_con_sus_ventas(db):
+    insertar_dia(db, '2025-01-15', [('FB001', 'Uno', 1), ('FB002', 'Dos', 1)])
+    assert db.meses_producto('FB001') == ['2025-01']
+    assert db.meses_producto('FB002') == ['2025-01']
+    insertar_dia(db, '2025-02-03', [('FB001', 'Uno', 1)])
+    assert db.meses_producto('FB001') == ['2025-01', '2025-02']
+    assert db.meses_producto('FB002') == ['2025-01']
+    estadisticas = db.estadisticas_cache()
+    assert (estadisticas['aciertos'], estadisticas['fallos'], estadisticas['invalidaciones']) == (1, 3, 1)
+
+
+def totales_por_dia(db):
+    # SUM(cantidad) de ventas por código y día, en el formato de ventas_diarias
+    return sorted(db.consultar('''
+    SELECT p.codigo, date(v.fecha * 86400, 'unixepoch'), SUM(v.cantidad)
+    FROM ventas v JOIN productos p ON p.id = v.producto_id
+    GROUP BY p.codigo, v.fecha
+    '''))
+
+
+def resumen(db):
+    return sorted(db.consultar('SELECT codigo, fecha, total FROM ventas_diarias'))
+
+
+def test_resumen_diario_sigue_a_las_ventas(db):
+    archivo = {'ruta': 'ventas_15.xlsx', 'tamano': 1, 'mtime': 1, 'hash': 'a'}
+    insertar_dia(db, '2025-01-15', [('FB001', 'Uno', 2), ('FB001', 'Uno', 3), ('FB002', 'Dos', 4)], archivo)
+    insertar_dia(db, '2025-01-16', [('FB001', 'Uno', 1)])
+    insertar_dia(db, '2025-01-16', [('FB002', 'Dos', 6)])  # Sin archivo: se suma al día
+    assert resumen(db) == totales_por_dia(db)
+    assert ('FB001', '2025-01-15', 5) in resumen(db)
+
+    # Reemplazo del día: FB002 desaparece de ese día y FB001 cambia
+    insertar_dia(db, '2025-01-15', [('FB001', 'Uno', 9)], dict(archivo, hash='b'))
+    assert resumen(db) == totales_por_dia(db)
+    assert [fila for fila in resumen(db) if fila[1] == '2025-01-15'] == [('FB001', '2025-01-15', 9)]
+
+    db.conn.execute('DELETE FROM ventas_diarias')
+    db.conn.commit()
+    db.reconstruir_ventas_diarias()
+    assert resumen(db) == totales_por_dia(db)
+
+
+def test_busqueda_con_digitos_unicode(db):
+    insertar_dia(db, '2025-01-15', [('FB001', 'Uno', 2)])
+    assert db.buscar_ventas('²', '2025-01-15') == []
+    assert [fila[1] for fila in db.buscar_ventas('٢', '2025-01-15')] == ['FB001']  # Dos en arábigo-índico
+
+
+def test_indice_fts_sigue_a_productos(db):
+    def codigos(busqueda):
+        return [fila[0] for fila in db.buscar_productos(busqueda)]
+
+    db.registrar_productos([('ZZ001', 'Té de jengibre', 12)])
+    assert codigos('jengi') == ['ZZ001']
+    db.registrar_productos([('ZZ001', 'Té de manzanilla', 12)])
+    assert codigos('jengi') == []
+    assert codigos('te manza') == ['ZZ001']
+    with db.transaccion():
+        db.conn.execute("DELETE FROM productos WHERE codigo = 'ZZ001'")
+    assert codigos('manzanilla') == []
+
+
+def crear_base_version_6(db_name, monkeypatch, filas):
+    # Aplica las migraciones 1 a 6 (7 y 8 quedan en blanco y se deja la versión en 6)
+    # y carga ventas con el formato anterior: codigo, nombre y fecha_carga en cada línea
+    with monkeypatch.context() as parche:
+        parche.setattr(Database, '_migracion_ventas_normalizadas', lambda self: None)
+        parche.setattr(Database, '_migracion_version_catalogo', lambda self: None)
+        Database(db_name).cerrar()
+    conn = sqlite3.connect(db_name)
+    with conn:
+        conn.execute('UPDATE version_esquema SET version = 6')
+        conn.executemany('INSERT INTO ventas (codigo, nombre, cantidad, fecha_carga) VALUES (?, ?, ?, ?)', filas)
+    conn.close()
+
+
+def test_migracion_ventas_normalizadas_conserva_las_ventas(tmp_path, monkeypatch):
+    db_name = str(tmp_path / 'ventas.db')
+    filas = [
+        ('FB126', 'DXN Zhi Mocha', 3, '2025-01-15'),
+        ('FB126', 'DXN Zhi Mocha', 4, '2025-01-16'),
+        ('FB128', 'DXN Vita Café', 5, '2025-01-15'),
+        ('ZZ999', 'Sin catálogo', 2, '2025-01-15'),
+        ('ZZ999', 'Sin catálogo', 7, '2025-02-01'),
+    ]
+    crear_base_version_6(db_name, monkeypatch, filas)
+
+    conn = sqlite3.connect(db_name)
+    antes = sorted(conn.execute('SELECT codigo, COUNT(*), SUM(cantidad) FROM ventas GROUP BY codigo'))
+    lineas_antes = sorted(conn.execute('SELECT id, codigo, fecha_carga, cantidad FROM ventas'))
+    conn.close()
+
+    db = Database(db_name)
+    try:
+        assert db.version_esquema() == 8
+        despues = sorted(db.consultar('''
+        SELECT p.codigo, COUNT(*), SUM(v.cantidad)
+        FROM ventas v JOIN productos p ON p.id = v.producto_id
+        GROUP BY p.codigo
+        '''))
+        assert despues == antes
+        # Cada línea conserva su id, su producto y su día
+        assert sorted(db.consultar('''
+        SELECT v.id, p.codigo, date(v.fecha * 86400, 'unixepoch'), v.cantidad
+        FROM ventas v JOIN productos p ON p.id = v.producto_id
+        ''')) == lineas_antes
+        assert db.consultar("SELECT auto_registrado FROM productos WHERE codigo IN ('FB126', 'ZZ999') "
+                            "ORDER BY codigo") == [(0,), (1,)]
+    finally:
+        db.cerrar()
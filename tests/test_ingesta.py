@@ -0,0 +1,127 @@
+import os
+import queue
+import threading
+
+import openpyxl
+import pandas as pd
+import pytest
+
+import ingesta
+from benchmarks.datos_sinteticos import escribir_mes
+
+LIBRO = pd.DataFrame({'Codigo': ['FB001', 'FB002'], 'Nombre': ['Uno', 'Dos'], 'Cantidad': [3, 4]})
+
+
+@pytest.fixture
+def sin_excel(monkeypatch):
+    # El contenido del libro no importa aquí: se cuenta cuántas veces se parsea
+    lecturas = []
+
+    def leer_libro(ruta):
+        lecturas.append(ruta)
+        return LIBRO.copy()
+    monkeypatch.setattr(ingesta, 'leer_libro', leer_libro)
+    return lecturas
+
+
+def test_cache_ilegible_se_vuelve_a_parsear(tmp_path, sin_excel):
+    ruta_cache = tmp_path / 'abc.parquet'
+    ruta_cache.write_bytes(b'PAR1 truncado')
+    df = ingesta.leer_libro_con_cache('ventas_01.xlsx', 'abc', str(tmp_path))
+    pd.testing.assert_frame_equal(df, LIBRO)
+    assert sin_excel == ['ventas_01.xlsx']
+    pd.testing.assert_frame_equal(pd.read_parquet(ruta_cache), LIBRO)
+
+    ingesta.leer_libro_con_cache('ventas_01.xlsx', 'abc', str(tmp_path))
+    assert len(sin_excel) == 1
+
+
+def test_libro_que_pyarrow_no_convierte_queda_sin_cache(tmp_path, monkeypatch):
+    mezclado = pd.DataFrame({'Codigo': ['FB001', 7], 'Nombre': ['Uno', 'Dos'], 'Cantidad': [3, 4]})
+    monkeypatch.setattr(ingesta, 'leer_libro', lambda ruta: mezclado)
+    assert ingesta.leer_libro_con_cache('ventas_01.xlsx', 'abc', str(tmp_path)) is mezclado
+    assert os.listdir(tmp_path) == []
+
+
+def test_error_de_disco_se_propaga_sin_dejar_temporales(tmp_path, sin_excel, monkeypatch):
+    def sin_espacio(self, ruta, **kwargs):
+        with open(ruta, 'wb') as f:
+            f.write(b'PAR1')
+        raise OSError(28, 'No space left on device')
+    monkeypatch.setattr(pd.DataFrame, 'to_parquet', sin_espacio)
+    with pytest.raises(OSError):
+        ingesta.leer_libro_con_cache('ventas_01.xlsx', 'abc', str(tmp_path))
+    assert os.listdir(tmp_path) == []
+
+
+def test_escritor_con_error_sigue_vaciando_la_cola(db):
+    cola = queue.Queue(maxsize=2)
+    resultado = {'archivos': 0, 'filas': 0}
+    db.conn.close()  # Toda escritura falla
+    hilo = threading.Thread(target=ingesta._escritor, args=(db, cola, resultado), daemon=True)
+    hilo.start()
+    for dia in range(1, 6):
+        cola.put((f"2025-01-0{dia}", LIBRO, {'ruta': f"ventas_0{dia}.xlsx"}), timeout=5)
+    cola.put(None, timeout=5)
+    hilo.join(timeout=5)
+    assert not hilo.is_alive()
+    assert resultado['archivos'] == 0 and 'error' in resultado
+
+
+def test_carga_con_la_database_de_la_aplicacion(db, tmp_path):
+    carpeta = escribir_mes(str(tmp_path / 'ventas'), '2025-01', filas_por_dia=20, num_productos=10, dias=3)
+    resultado = ingesta.cargar_meses(db, [carpeta], workers=1, usar_cache=False)
+    assert resultado['archivos'] == 3 and resultado['filas'] == 60
+    # La Database sigue abierta y es la que ve las ventas
+    assert db.consultar_valor('SELECT COUNT(*) FROM ventas') == 60
+
+
+def escribir_libro(ruta, filas):
+    wb = openpyxl.Workbook(write_only=True)
+    hoja = wb.create_sheet()
+    hoja.append(['Codigo', 'Nombre', 'Cantidad'])
+    for fila in filas:
+        hoja.append(fila)
+    wb.save(ruta)
+
+
+@pytest.fixture
+def carpeta_mes(tmp_path):
+    carpeta = tmp_path / 'ventas' / '2025-01'
+    carpeta.mkdir(parents=True)
+    escribir_libro(carpeta / 'ventas_01.xlsx', [('FB001', 'Uno', 2), ('FB002', 'Dos', 3)])
+    escribir_libro(carpeta / 'ventas_02.xlsx', [('FB001', 'Uno', 5)])
+    return carpeta
+
+
+def test_carpeta_sin_cambios_se_omite(db, carpeta_mes):
+    ingesta.cargar_meses(db, [str(carpeta_mes)], workers=1, usar_cache=False)
+    resultado = ingesta.cargar_meses(db, [str(carpeta_mes)], workers=1, usar_cache=False)
+    assert (resultado['archivos'], resultado['omitidos'], resultado['filas']) == (0, 2, 0)
+    assert db.consultar_valor('SELECT COUNT(*) FROM ventas') == 3
+
+
+def test_mtime_nuevo_con_el_mismo_contenido_solo_actualiza_la_firma(db, carpeta_mes):
+    ingesta.cargar_meses(db, [str(carpeta_mes)], workers=1, usar_cache=False)
+    ruta = carpeta_mes / 'ventas_01.xlsx'
+    os.utime(ruta, ns=(ruta.stat().st_atime_ns, ruta.stat().st_mtime_ns + 10**9))
+    generacion = db.generacion_datos()
+
+    resultado = ingesta.cargar_meses(db, [str(carpeta_mes)], workers=1, usar_cache=False)
+    assert (resultado['archivos'], resultado['omitidos'], resultado['filas']) == (0, 2, 0)
+    assert db.obtener_manifiesto()[str(ruta.resolve())][1] == ruta.stat().st_mtime_ns
+    assert db.generacion_datos() == generacion
+    assert db.consultar_valor('SELECT COUNT(*) FROM ventas') == 3
+
+
+def test_libro_modificado_reemplaza_las_ventas_de_su_dia(db, carpeta_mes):
+    ingesta.cargar_meses(db, [str(carpeta_mes)], workers=1, usar_cache=False)
+    ruta = carpeta_mes / 'ventas_01.xlsx'
+    mtime = ruta.stat().st_mtime_ns
+    escribir_libro(ruta, [('FB001', 'Uno', 7)])
+    os.utime(ruta, ns=(mtime + 10**9, mtime + 10**9))  # Aunque el sistema de archivos tenga poca resolución
+
+    resultado = ingesta.cargar_meses(db, [str(carpeta_mes)], workers=1, usar_cache=False)
+    assert (resultado['archivos'], resultado['omitidos'], resultado['filas']) == (1, 1, 1)
+    assert sorted(db.ventas_diarias_desde('2025-01-01')) == [('FB001', '2025-01-01', 7), ('FB001', '2025-01-02', 5)]
+    assert sorted(fila[1:4] for fila in db.ventas_del_dia('2025-01-01')) == [('FB001', 'Uno', 7)]
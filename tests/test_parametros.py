@@ -0,0 +1,42 @@
+import pytest
+
+import cli
+
+
+def parametros(db, codigo):
+    return next(fila[1:] for fila in db.parametros_reposicion() if fila[0] == codigo)
+
+
+def test_actualizaciones_parciales_no_borran_otros_campos(db):
+    db.registrar_productos([('FB001', 'Producto', 12)])
+    db.guardar_proveedor('Norte', tiempo_entrega=7, costo_pedido=30, costo_almacenamiento=69)
+    db.guardar_proveedor('Norte', costo_pedido=45)
+    assert db.consultar('SELECT tiempo_entrega, costo_pedido, costo_almacenamiento FROM proveedores') == [(7, 45, 69)]
+
+    assert db.actualizar_parametros_producto('FB001', proveedor='Norte', tiempo_entrega=3)
+    assert db.actualizar_parametros_producto('FB001', costo_pedido=10)
+    assert parametros(db, 'FB001') == (3, 10, 69)
+
+
+def test_limpiar_vuelve_a_heredar(db):
+    db.registrar_productos([('FB001', 'Producto', 12)])
+    db.guardar_proveedor('Norte', tiempo_entrega=7, costo_pedido=30)
+    db.actualizar_parametros_producto('FB001', proveedor='Norte', tiempo_entrega=3, costo_pedido=10)
+
+    assert db.actualizar_parametros_producto('FB001', limpiar=['tiempo_entrega'])
+    assert parametros(db, 'FB001') == (7, 10, None)
+    db.guardar_proveedor('Norte', limpiar=['costo_pedido'])
+    db.actualizar_parametros_producto('FB001', limpiar=['proveedor', 'costo_pedido'])
+    assert parametros(db, 'FB001') == (None, None, None)
+
+    with pytest.raises(ValueError):
+        db.actualizar_parametros_producto('FB001', costo_pedido=5, limpiar=['costo_pedido'])
+    assert not db.actualizar_parametros_producto('NOEXISTE', limpiar=['costo_pedido'])
+
+
+def test_cli_limpiar(db):
+    db.registrar_productos([('FB001', 'Producto', 12)])
+    assert cli.main(['--db', db.db_name, 'product-params', 'FB001', '--tiempo-entrega', '4',
+                     '--costo-pedido', '20']) == 0
+    assert cli.main(['--db', db.db_name, 'product-params', 'FB001', '--limpiar', 'costo-pedido']) == 0
+    assert parametros(db, 'FB001') == (4, None, None)
@@ -0,0 +1,17 @@
+import pytest
+
+from pedidos import hoja_de_inventario, rutas_por_hoja
+
+HOJAS = ['Lima', 'Lima Norte', 'Arequipa']
+
+
+def test_cada_inventario_va_a_su_hoja():
+    archivos = ['inv/inventario_Lima.xlsx', 'inv/inventario_Lima_Norte.xlsx', 'inv/Arequipa.xlsx']
+    rutas = rutas_por_hoja((hoja_de_inventario(archivo, HOJAS), archivo) for archivo in archivos)
+    assert rutas == {'Lima': archivos[0], 'Lima Norte': archivos[1], 'Arequipa': archivos[2]}
+
+
+def test_dos_inventarios_para_la_misma_hoja_se_rechazan():
+    archivos = ['inv/Lima Norte.xlsx', 'inv/lima_norte_copia.xlsx', 'inv/Arequipa.xlsx']
+    with pytest.raises(ValueError, match='Lima Norte: Lima Norte.xlsx, lima_norte_copia.xlsx'):
+        rutas_por_hoja((hoja_de_inventario(archivo, HOJAS), archivo) for archivo in archivos)
@@ -0,0 +1,26 @@
+import database
+
+
+def test_consultas_de_la_app_usan_indices(db):
+    assert db.consultas_sin_indice() == []
+
+
+def test_todas_las_consultas_sql_se_verifican():
+    verificadas = {query for query, _ in database.CONSULTAS_INDEXADAS.values()}
+    verificadas |= {query for query, _, _ in database.LECTURAS_COMPLETAS.values()}
+    # Una constante puede ser parte de una consulta verificada (ej: el sufijo de paginación)
+    constantes = {nombre for nombre, valor in vars(database).items()
+                  if nombre.startswith('SQL_') and not any(valor in query for query in verificadas)}
+    assert constantes == set()
+
+
+def test_lectura_completa_sin_su_indice_se_reporta(db):
+    db.conn.execute('DROP INDEX idx_ventas_producto_fecha_cantidad')
+    assert {nombre for nombre, _ in db.consultas_sin_indice()} == {'recalcular_ventas_diarias'}
+
+
+def test_cada_indice_del_esquema_aparece_en_algun_plan(db):
+    indices = {fila[0] for fila in db.consultar(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL")}
+    detalles = ' '.join(detalle for detalles in db.planes_de_consulta().values() for detalle in detalles)
+    assert {indice for indice in indices if indice not in detalles} == set()
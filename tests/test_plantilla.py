@@ -0,0 +1,44 @@
+from plantilla import IndicePedidos, MAX_CANDIDATOS
+
+
+def asignar(productos, celdas):
+    # {texto de la celda: producto del pedido asignado}
+    indice = IndicePedidos({'producto': producto} for producto in productos)
+    asignacion = indice.asignar([(celda, None) for celda in celdas])
+    return {celdas[posicion]: productos[i] for posicion, i in asignacion.items()}
+
+
+def test_cada_pedido_llena_una_sola_fila():
+    productos = ["DXN Oozhi Tea", "DXN Lingzhi Coffee 3 in 1"]
+    celdas = ["DXN Oozhi Tea 30g", "DXN Oozhi Tea", "DXN Oozhi Tea (30's)",
+              "DXN Lingzhi Coffee 3 in 1 Lite", "DXN Ootea Lingzhi Coffee Mix 3 in 1", "DXN Lingzhi Coffee 3 in 1"]
+    assert asignar(productos, celdas) == {
+        "DXN Oozhi Tea": "DXN Oozhi Tea",
+        "DXN Lingzhi Coffee 3 in 1": "DXN Lingzhi Coffee 3 in 1",
+    }
+
+
+def test_empate_en_la_coincidencia_aproximada_deja_el_pedido_sin_fila():
+    assert asignar(["DXN Oozhi Tea"], ["DXN Oozhi Tea 30g", "DXN Oozhi Tea 60g"]) == {}
+    # Sin empate gana la celda con menos palabras de sobra ("30 s" son dos)
+    assert asignar(["DXN Oozhi Tea"], ["DXN Oozhi Tea (30's)", "DXN Oozhi Tea 30g"]) == {
+        "DXN Oozhi Tea 30g": "DXN Oozhi Tea"}
+
+
+def test_codigo_gana_a_la_coincidencia_por_nombre():
+    indice = IndicePedidos([{'codigo': 'FB007', 'producto': 'Cafe'}, {'codigo': 'FB008', 'producto': 'Te'}])
+    assert indice.asignar([('Cafe', 'FB008'), ('Otra cosa FB007', None)]) == {0: 1, 1: 0}
+
+
+def test_palabras_todas_frecuentes_buscan_en_la_interseccion():
+    # "cafe", "negro" y "dxn" superan MAX_CANDIDATOS cada una, pero no juntas
+    productos = ([f"DXN Cafe sabor {i}" for i in range(MAX_CANDIDATOS + 100)]
+                 + [f"DXN Negro tono {i}" for i in range(MAX_CANDIDATOS + 100)]
+                 + [f"DXN Cafe Negro lote {i}" for i in range(MAX_CANDIDATOS - 50)]
+                 + ["DXN Café Negro"])
+    assert asignar(productos, ["Cafe negro DXN premium"]) == {"Cafe negro DXN premium": "DXN Café Negro"}
+
+
+def test_sin_coincidencia_suficiente_no_asigna():
+    productos = [f"DXN Cafe sabor {i}" for i in range(MAX_CANDIDATOS + 100)]
+    assert asignar(productos, ["DXN cafe"]) == {}
@@ -0,0 +1,21 @@
+import numpy as np
+
+from pronostico import pronosticar_demanda, suavizado_exponencial, VENTANA_MEDIA
+
+
+def test_historia_corta_usa_la_media_movil():
+    # Dos semanas: 10 diarios y luego 2 diarios (mismo factor para cada día de la semana)
+    matriz = np.array([[10.0] * 7 + [2.0] * 7])
+    demanda = pronosticar_demanda(matriz, '2025-01-06', horizonte=7)
+    assert np.allclose(demanda, [6.0])
+
+
+def test_historia_larga_usa_el_suavizado():
+    semanas = VENTANA_MEDIA // 7 + 2
+    matriz = np.array([[10.0] * 7 * (semanas - 1) + [2.0] * 7])
+    demanda = pronosticar_demanda(matriz, '2025-01-06', horizonte=7)
+    assert np.allclose(demanda, suavizado_exponencial(matriz))
+
+
+def test_fila_sin_observaciones_es_nan():
+    assert np.isnan(pronosticar_demanda(np.full((1, 14), np.nan), '2025-01-06', horizonte=7)).all()
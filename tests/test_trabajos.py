@@ -0,0 +1,36 @@
+from trabajos import TrabajadorBD, TrabajoCancelado
+
+
+class RaizFalsa:
+    """Sustituye a Tk: los callbacks se toman de la cola de resultados a mano"""
+
+    def after(self, ms, funcion):
+        return None
+
+    def after_cancel(self, id_sondeo):
+        pass
+
+
+def callback_entregado(tarea):
+    trabajador = TrabajadorBD(RaizFalsa(), db=None, hilos=1)
+    try:
+        trabajador.enviar(tarea, al_terminar=lambda r: ('al_terminar', r), al_error=lambda e: ('al_error', e),
+                          al_cancelar=lambda: ('al_cancelar',))
+        callback, args = trabajador._resultados.get(timeout=5)
+        return callback(*args)
+    finally:
+        trabajador.detener()
+
+
+def test_tarea_cancelada_a_mitad_que_termina_entrega_al_terminar():
+    def tarea(db, trabajo):
+        trabajo.cancelar()  # Como el botón Cancelar mientras corre
+        return {'cancelado': trabajo.cancelado()}
+    assert callback_entregado(tarea) == ('al_terminar', {'cancelado': True})
+
+
+def test_tarea_que_lanza_trabajo_cancelado_entrega_al_cancelar():
+    def tarea(db, trabajo):
+        trabajo.cancelar()
+        trabajo.verificar_cancelacion()
+    assert callback_entregado(tarea) == ('al_cancelar',)
@@ -0,0 +1,103 @@
+import queue
+import threading
+
+
+class TrabajoCancelado(Exception):
+    pass
+
+
+class Trabajo:
+    """Una tarea enviada al TrabajadorBD. Permite cancelarla y reportar su progreso."""
+
+    def __init__(self, funcion, args, al_terminar=None, al_error=None, al_progreso=None, al_cancelar=None):
+        self.funcion = funcion
+        self.args = args
+        self.al_terminar = al_terminar
+        self.al_error = al_error
+        self.al_progreso = al_progreso
+        self.al_cancelar = al_cancelar
+        self._cancelado = threading.Event()
+        self._resultados = None  # Cola de resultados del trabajador que lo ejecuta
+
+    def cancelar(self):
+        self._cancelado.set()
+
+    def cancelado(self):
+        return self._cancelado.is_set()
+
+    def verificar_cancelacion(self):
+        """Lanza TrabajoCancelado si se pidió cancelar; llamar entre pasos largos"""
+        if self._cancelado.is_set():
+            raise TrabajoCancelado()
+
+    def reportar_progreso(self, hechos, total, mensaje=''):
+        # Se llama desde el hilo del trabajador; el callback se ejecuta en el hilo de Tk
+        if self.al_progreso is not None:
+            self._resultados.put((self.al_progreso, (hechos, total, mensaje)))
+
+
+class TrabajadorBD:
+    """Ejecuta tareas de base de datos fuera del hilo de Tk.
+
+    Los hilos comparten la Database de la aplicación (segura entre hilos: las
+    lecturas usan su pool y las escrituras se serializan) y las tareas se llaman
+    como funcion(db, trabajo, *args). Los callbacks (al_terminar, al_error, al_progreso,
+    al_cancelar) se entregan en el hilo principal mediante root.after. Una tarea que
+    termina entrega al_terminar aunque se haya pedido cancelarla a mitad (la función
+    decide qué devolver); al_cancelar se entrega cuando la tarea lanza TrabajoCancelado.
+    """
+
+    def __init__(self, root, db, hilos=2, intervalo_ms=50):
+        self.root = root
+        self.db = db
+        self.intervalo_ms = intervalo_ms
+        self._tareas = queue.Queue()
+        self._resultados = queue.Queue()
+        self._hilos = [
+            threading.Thread(target=self._ejecutar, daemon=True, name=f"TrabajadorBD-{i}")
+            for i in range(hilos)
+        ]
+        for hilo in self._hilos:
+            hilo.start()
+        self._id_sondeo = self.root.after(self.intervalo_ms, self._entregar_resultados)
+
+    def enviar(self, funcion, *args, al_terminar=None, al_error=None, al_progreso=None, al_cancelar=None):
+        """Encola una tarea y devuelve su Trabajo (para cancelarla)"""
+        trabajo = Trabajo(funcion, args, al_terminar, al_error, al_progreso, al_cancelar)
+        trabajo._resultados = self._resultados
+        self._tareas.put(trabajo)
+        return trabajo
+
+    def detener(self):
+        for _ in self._hilos:
+            self._tareas.put(None)
+        self.root.after_cancel(self._id_sondeo)
+
+    def _ejecutar(self):
+        while True:
+            trabajo = self._tareas.get()
+            if trabajo is None:
+                break
+            try:
+                trabajo.verificar_cancelacion()
+                resultado = trabajo.funcion(self.db, trabajo, *trabajo.args)
+                if trabajo.al_terminar is not None:
+                    self._resultados.put((trabajo.al_terminar, (resultado,)))
+            except TrabajoCancelado:
+                if trabajo.al_cancelar is not None:
+                    self._resultados.put((trabajo.al_cancelar, ()))
+            except Exception as e:
+                if trabajo.al_error is not None:
+                    self._resultados.put((trabajo.al_error, (e,)))
+
+    def _entregar_resultados(self):
+        # Corre en el hilo de Tk: ejecuta los callbacks pendientes y se reprograma
+        try:
+            while True:
+                try:
+                    callback, args = self._resultados.get_nowait()
+                except queue.Empty:
+                    break
+                callback(*args)
+        finally:
+            self._id_sondeo = self.root.after(self.intervalo_ms, self._entregar_resultados)